@@ -0,0 +1,103 @@
+import argparse
+from typing import Optional
+
+from qdrant_client import QdrantClient
+
+from core.config import settings
+from services.vector_profiles import (
+    PROFILES,
+    dense_vector_config,
+    estimate_memory,
+    get_profile,
+    measured_memory,
+    profile_from_collection,
+    update_options,
+)
+from services.vector_service import DENSE_VECTOR
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1 << 20):,.1f} MB"
+
+
+def _report(title: str, memory: dict):
+    print(f"   {title}")
+    print(f"      Vectors in RAM: {_mb(memory['vectors_ram'])}")
+    print(f"      Vectors on disk: {_mb(memory['vectors_disk'])}")
+    print(f"      HNSW graph: {_mb(memory['hnsw_ram'])}")
+    print(f"      Total RAM: {_mb(memory['total_ram'])}")
+
+
+def _measure(client: QdrantClient, collection: str) -> Optional[dict]:
+    """Memory Qdrant reports for the collection, or None if it can't tell."""
+    # Telemetry lists collections, not the aliases serving them
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == collection:
+            collection = alias.collection_name
+    try:
+        telemetry = client.http.service_api.telemetry(details_level=3).result
+    except Exception:
+        return None
+    return measured_memory(telemetry, collection)
+
+
+def _report_measured(memory: Optional[dict]):
+    if memory is None:
+        print("   Measured: not reported by this Qdrant server")
+        return
+    print("   Measured by Qdrant (all vectors, indexes and payloads):")
+    print(f"      RAM: {_mb(memory['ram'])}")
+    print(f"      Disk: {_mb(memory['disk'])}")
+    print(f"      Vector data: {_mb(memory['vectors'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply a vector storage profile to an existing Qdrant collection."
+    )
+    parser.add_argument("profile", choices=list(PROFILES))
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only report the memory figures"
+    )
+    args = parser.parse_args()
+
+    client = QdrantClient(url=settings.QDRANT_URL)
+    info = client.get_collection(args.collection)
+    points = info.points_count or 0
+    # Hybrid collections name their vectors; legacy ones have a single unnamed one
+    named = isinstance(info.config.params.vectors, dict)
+    vector_name = DENSE_VECTOR if named else ""
+    dimensions = dense_vector_config(info, vector_name).size
+
+    current = profile_from_collection(info, vector_name)
+    target = get_profile(args.profile)
+
+    print(f"📦 Collection '{args.collection}': {points} points\n")
+    print("1. Memory")
+    _report_measured(_measure(client, args.collection))
+    # Qdrant can't tell what another profile would use: that part is a formula
+    print("   Estimated from the profile (dense vectors + HNSW graph only):")
+    _report("Current:", estimate_memory(points, dimensions, current))
+    _report(f"With '{args.profile}':", estimate_memory(points, dimensions, target))
+
+    if args.dry_run:
+        return
+
+    print(f"\n2. Applying profile '{args.profile}'...")
+    client.update_collection(args.collection, **update_options(target, vector_name))
+    # Qdrant rebuilds quantized vectors and the HNSW graph in the background
+    print("   ✅ Profile applied; Qdrant optimizes the collection in the background")
+
+    applied = profile_from_collection(client.get_collection(args.collection), vector_name)
+    _report("Estimated now:", estimate_memory(points, dimensions, applied))
+    print(
+        "   Run again with --dry-run once optimization finishes for measured figures."
+    )
+    print(
+        f"\n   Set QDRANT_PROFILE={args.profile} so new collections and searches match."
+    )
+
+
+if __name__ == "__main__":
+    main()
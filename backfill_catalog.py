@@ -0,0 +1,34 @@
+import argparse
+
+from core.config import settings
+from db import models
+from db.database import SessionLocal, engine
+from services.document_catalog import DocumentCatalog
+from services.vector_service import VectorService
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Add catalog entries for documents indexed in Qdrant before the catalog existed."
+    )
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+
+    service = VectorService()
+    service.collection_name = args.collection
+    print(f"📦 Reading sources of '{args.collection}' from Qdrant...")
+    chunk_counts = service.source_counts()
+    print(f"   {len(chunk_counts)} documents, {sum(chunk_counts.values())} chunks")
+
+    db = SessionLocal()
+    try:
+        added = DocumentCatalog(db).backfill(args.collection, chunk_counts)
+    finally:
+        db.close()
+    print(f"   ✅ {added} catalog entries added")
+
+
+if __name__ == "__main__":
+    main()
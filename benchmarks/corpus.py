@@ -0,0 +1,117 @@
+"""Deterministic text corpora and PDFs for the benchmarks."""
+
+import random
+import textwrap
+from typing import List
+
+WORDS = (
+    "el la los las de del en por para con sin sobre entre contrato ley artículo "
+    "norma derecho obligación persona empresa trabajador empleador plazo pago "
+    "salario jornada vacaciones seguridad social tribunal sentencia recurso "
+    "procedimiento administración pública documento registro información datos "
+    "protección responsabilidad daño perjuicio indemnización cláusula acuerdo "
+    "parte partes notificación resolución apelación código civil penal laboral "
+    "establece dispone señala podrá deberá corresponde aplicará conforme según "
+    "mediante durante cuando donde cual cuyo dicho presente anterior siguiente"
+).split()
+
+# Sizes shared by every benchmark: characters of text, pages of PDF
+TEXT_SIZES = {"small": 10_000, "medium": 100_000, "large": 1_000_000}
+PDF_PAGES = {"small": 5, "medium": 25, "large": 100}
+
+LINE_WIDTH = 90
+LINES_PER_PAGE = 60
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 24))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), str(rng.randint(1, 2024)))
+    return " ".join(words).capitalize() + rng.choice(".....?!")
+
+
+def generate_text(chars: int, seed: int = 0) -> str:
+    """
+    Spanish-like legal prose of about chars characters, shaped like PDF
+    extraction output: paragraphs, hard line breaks and stray control
+    characters.
+    """
+    rng = random.Random(seed)
+    paragraphs: List[str] = []
+    size = 0
+    while size < chars:
+        paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(2, 7)))
+        lines = textwrap.wrap(paragraph, LINE_WIDTH)
+        if rng.random() < 0.1:
+            lines.append(rng.choice(["\x0c", "\t", "\x07"]))
+        paragraphs.append("\n".join(lines))
+        size += len(paragraphs[-1]) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def generate_chunks(count: int, seed: int = 0) -> List[str]:
+    """Chunk-sized passages (200-1200 characters), some too short or noisy."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(count):
+        text = " ".join(_sentence(rng) for _ in range(rng.randint(1, 8)))
+        if i % 10 == 0:
+            text = text[:30]
+        elif i % 10 == 1:
+            text = " ".join(str(rng.randint(0, 999)) for _ in range(60))
+        chunks.append(text)
+    return chunks
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, seed: int = 0) -> None:
+    """
+    Writes a text PDF of the given page count. Hand-built (Helvetica,
+    WinAnsi) so the benchmarks need no PDF-writing dependency.
+    """
+    rng = random.Random(seed)
+    streams = []
+    for _ in range(pages):
+        lines: List[str] = []
+        while len(lines) < LINES_PER_PAGE:
+            paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+            lines.extend(textwrap.wrap(paragraph, LINE_WIDTH))
+            lines.append("")
+        text = " Tj T* ".join(f"({_escape(line)})" for line in lines[:LINES_PER_PAGE])
+        streams.append(f"BT /F1 9 Tf 11 TL 40 800 Td {text} Tj ET".encode("latin-1"))
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    for i, stream in enumerate(streams):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
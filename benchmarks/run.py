@@ -0,0 +1,349 @@
+"""
+Microbenchmarks for the ingest and retrieval hot paths.
+
+    python -m benchmarks.run                  # compare against baselines.json
+    python -m benchmarks.run --save           # record new baselines
+    python -m benchmarks.run -k chunk_text --sizes small medium
+
+Each benchmark reports its median time, its run-to-run spread,
+throughput and the peak memory allocated by one run (tracemalloc).
+Results that get slower or allocate more than --threshold relative to
+the stored baseline are flagged, and the run exits with status 1. The
+slowdown allowed grows with the spread of both measurements, so noisy
+benchmarks aren't flagged for noise.
+
+Vector benchmarks use Qdrant's in-memory mode and the fake embedding
+provider, and token counts are estimated, so no server, network or API
+key is needed. Runs with settings that change the work done (see
+WORKLOAD_SETTINGS) refuse to compare against baselines recorded with
+others.
+"""
+
+import os
+
+# Before anything reads the settings
+os.environ.setdefault("EMBEDDING_PROVIDER", "fake")
+os.environ.setdefault("EMBEDDING_TOKENIZER", "estimate")
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+
+import argparse
+import json
+import logging
+import math
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from qdrant_client import QdrantClient
+
+from benchmarks.corpus import PDF_PAGES, TEXT_SIZES, generate_chunks, generate_text, write_pdf
+from core.config import settings
+from core.logging_config import logger
+from services.document_processor import ChunkValidator, DocumentProcessor
+from services.tokenizer import load_tokenizer
+from services.vector_service import VectorService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Environment entries that change what the benchmarks do, not just how
+# fast: results recorded with other values aren't comparable
+WORKLOAD_SETTINGS = ("tokenizer", "embedding_provider", "embedding_dimensions", "hybrid_search")
+
+# Points stored before searching, and queries per timed run
+SEARCH_POINTS = {"small": 500, "medium": 2_000, "large": 8_000}
+SEARCH_QUERIES = 20
+ADD_CHUNKS = {"small": 100, "medium": 500, "large": 2_000}
+VALIDATE_CHUNKS = {"small": 1_000, "medium": 10_000, "large": 100_000}
+
+# The in-memory Qdrant warns that payload indexes have no effect
+warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+# Per-call INFO logs would be part of the timings
+logger.setLevel(logging.WARNING)
+
+
+@dataclass
+class Case:
+    """
+    One benchmark at one size. setup() runs once, untimed, and returns the
+    function to time; reset(), if given, runs untimed before each timing.
+    """
+
+    name: str
+    size: str
+    unit: str
+    units: float
+    setup: Callable[[], Callable[[], object]]
+    reset: Optional[Callable[[], None]] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+def _text_cases(tmp: str) -> List[Case]:
+    cases = []
+    for size, chars in TEXT_SIZES.items():
+        text = generate_text(chars, seed=1)
+        megabytes = len(text.encode("utf-8")) / 1e6
+        processor = DocumentProcessor()
+        cases.append(
+            Case("clean_text", size, "MB", megabytes, lambda t=text, p=processor: lambda: p.clean_text(t))
+        )
+        cases.append(
+            Case("chunk_text", size, "MB", megabytes, lambda t=text, p=processor: lambda: p.chunk_text(t))
+        )
+
+    for size, count in VALIDATE_CHUNKS.items():
+        chunks = generate_chunks(count, seed=2)
+        cases.append(
+            Case(
+                "is_valid",
+                size,
+                "chunks",
+                count,
+                lambda c=chunks: lambda: [ChunkValidator.is_valid(chunk) for chunk in c],
+            )
+        )
+
+    for size, pages in PDF_PAGES.items():
+        path = os.path.join(tmp, f"{size}.pdf")
+        write_pdf(path, pages, seed=3)
+        processor = DocumentProcessor()
+        cases.append(
+            Case(
+                "extract_text_from_pdf",
+                size,
+                "pages",
+                pages,
+                lambda p=processor, f=path: lambda: p.extract_text_from_pdf(f),
+            )
+        )
+    return cases
+
+
+def _documents(count: int, seed: int) -> List[dict]:
+    return [
+        {"text": text, "metadata": {"source": f"bench-{i % 20}.pdf", "chunk_index": i}}
+        for i, text in enumerate(
+            " ".join(generate_text(600, seed=seed + i).split()) for i in range(count)
+        )
+    ]
+
+
+def _vector_cases() -> List[Case]:
+    cases = []
+    for size, count in ADD_CHUNKS.items():
+        service = VectorService(client=QdrantClient(":memory:"))
+        documents = _documents(count, seed=4)
+
+        def reset(s=service):
+            # A fresh collection each run, so every point is an insert
+            s.collection_name = f"bench_add_{uuid.uuid4().hex}"
+            s.create_collection_if_not_exists()
+
+        cases.append(
+            Case(
+                "add_documents_batch",
+                size,
+                "chunks",
+                count,
+                lambda s=service, d=documents: lambda: s.add_documents_batch(d),
+                reset,
+            )
+        )
+
+    for size, count in SEARCH_POINTS.items():
+        queries = [" ".join(generate_text(80, seed=5 + i).split()) for i in range(SEARCH_QUERIES)]
+
+        def setup(count=count, queries=queries):
+            service = VectorService(client=QdrantClient(":memory:"))
+            service.collection_name = "bench_search"
+            service.create_collection_if_not_exists()
+            documents = _documents(count, seed=6)
+            for start in range(0, count, 500):
+                service.add_documents_batch(documents[start : start + 500])
+            return lambda: [service.search(query) for query in queries]
+
+        cases.append(Case("search", size, "queries", SEARCH_QUERIES, setup))
+    return cases
+
+
+def spread(timings: List[float]) -> float:
+    """
+    Run-to-run noise relative to the median: the median absolute deviation,
+    scaled to estimate a standard deviation.
+    """
+    median = statistics.median(timings)
+    deviation = statistics.median(abs(t - median) for t in timings)
+    return 1.4826 * deviation / median if median else 0.0
+
+
+def measure(case: Case, min_time: float, min_runs: int) -> Dict[str, float]:
+    """Median seconds and spread over repeated runs, and the peak allocation of one."""
+    fn = case.setup()
+    timings: List[float] = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or time.perf_counter() - started < min_time:
+        if case.reset:
+            case.reset()
+        begin = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - begin)
+
+    # A separate run: tracing slows the code down several times
+    if case.reset:
+        case.reset()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "spread": spread(timings),
+        "throughput": case.units / seconds,
+        "unit": f"{case.unit}/s",
+        "peak_bytes": peak,
+        "runs": len(timings),
+    }
+
+
+def environment() -> Dict[str, str]:
+    """What the numbers depend on besides the code."""
+    return {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": str(os.cpu_count()),
+        "tokenizer": load_tokenizer(),
+        "embedding_provider": settings.EMBEDDING_PROVIDER,
+        "embedding_dimensions": str(settings.EMBEDDING_DIMENSIONS),
+        "hybrid_search": str(settings.HYBRID_SEARCH),
+    }
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:,.0f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GB"
+
+
+def _change(current: float, baseline: float) -> str:
+    return f"{(current / baseline - 1) * 100:+.1f}%" if baseline else "n/a"
+
+
+def tolerance(result: dict, baseline: dict, threshold: float) -> float:
+    """
+    Allowed throughput drop: threshold plus two standard deviations of the
+    combined noise of both measurements (baselines without a spread count
+    as noiseless).
+    """
+    noise = math.hypot(result.get("spread", 0.0), baseline.get("spread", 0.0))
+    return threshold + 2 * noise
+
+
+def compare(results: Dict[str, dict], baselines: Dict[str, dict], threshold: float) -> List[str]:
+    """Keys whose throughput dropped or peak memory grew beyond threshold."""
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+        allowed = tolerance(result, baseline, threshold)
+        slower = result["throughput"] < baseline["throughput"] * (1 - allowed)
+        heavier = result["peak_bytes"] > baseline["peak_bytes"] * (1 + threshold)
+        if slower or heavier:
+            regressions.append(key)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument("-k", "--filter", help="Only benchmarks whose name contains this")
+    parser.add_argument("--sizes", nargs="+", choices=list(TEXT_SIZES), default=list(TEXT_SIZES))
+    parser.add_argument("--save", action="store_true", help="Store the results as baselines")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to run each benchmark")
+    # Enough runs to estimate the spread of the slow benchmarks
+    parser.add_argument("--min-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    stored: dict = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    baselines = stored.get("results", {})
+
+    env = environment()
+    mismatched = {k: v for k, v in stored.get("environment", {}).items() if env.get(k) != v}
+    incomparable = {k: v for k, v in mismatched.items() if k in WORKLOAD_SETTINGS}
+    if incomparable and not args.save:
+        current = {k: env.get(k) for k in incomparable}
+        print(
+            f"❌ Baselines were recorded with {incomparable} but this run uses {current}; "
+            "match those settings or record new baselines with --save"
+        )
+        return 2
+    if mismatched and not args.save:
+        print(f"⚠️  Baselines were recorded with {mismatched}; differences may not be regressions\n")
+
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = _text_cases(tmp) + _vector_cases()
+        cases = [
+            c for c in cases
+            if c.size in args.sizes and (not args.filter or args.filter in c.name)
+        ]
+        print(
+            f"{'benchmark':<34} {'median':>10} {'spread':>7} {'throughput':>20} "
+            f"{'peak alloc':>12}  vs baseline"
+        )
+        for case in cases:
+            result = measure(case, args.min_time, args.min_runs)
+            results[case.key] = result
+            baseline = baselines.get(case.key)
+            versus = ""
+            if baseline:
+                versus = (
+                    f"{_change(result['throughput'], baseline['throughput'])} throughput, "
+                    f"{_change(result['peak_bytes'], baseline['peak_bytes'])} memory"
+                )
+            print(
+                f"{case.key:<34} {result['seconds'] * 1000:>8.2f}ms "
+                f"{result['spread']:>6.1%} "
+                f"{result['throughput']:>12,.1f} {result['unit']:<7} "
+                f"{_format_bytes(result['peak_bytes']):>12}  {versus}"
+            )
+
+    if args.save:
+        # Keep baselines of benchmarks that were filtered out of this run
+        baselines.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": env, "results": baselines}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n✅ Saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    if regressions:
+        print(
+            f"\n❌ Regressions beyond {args.threshold:.0%} plus noise: "
+            f"{', '.join(regressions)}"
+        )
+        return 1
+    print("\n✅ No regressions" if baselines else "\nNo baselines yet, run with --save")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,9 @@ class Settings(BaseSettings):
     SQLALCHEMY_DATABASE_URL: str = os.getenv(
         "SQLALCHEMY_DATABASE_URL", "sqlite:///./sql_app.db"
     )
+    # Async driver URL for the API; empty = derived from SQLALCHEMY_DATABASE_URL
+    # (sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
 
     # OPENAI API KEY
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -29,12 +32,128 @@ class Settings(BaseSettings):
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
     QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION", "aprendizaje")
 
+    # Embeddings: openrouter (EMBEDDING_MODEL over HTTP), local (ONNX model
+    # on the CPU, needs onnxruntime + tokenizers) or fake (deterministic, tests)
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openrouter")
+    # Directory with model.onnx and tokenizer.json, for EMBEDDING_PROVIDER=local
+    EMBEDDING_LOCAL_MODEL_DIR: str = os.getenv(
+        "EMBEDDING_LOCAL_MODEL_DIR", "./models/embedding"
+    )
+    EMBEDDING_LOCAL_MAX_TOKENS: int = int(os.getenv("EMBEDDING_LOCAL_MAX_TOKENS", "256"))
+    # onnxruntime intra-op threads; 0 uses every core
+    EMBEDDING_LOCAL_THREADS: int = int(os.getenv("EMBEDDING_LOCAL_THREADS", "0"))
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-small")
+    # Output size requested from the model and stored in Qdrant. The
+    # text-embedding-3 models accept any size up to 1536 (-small) / 3072 (-large);
+    # reindex_collection.py migrates an existing collection after a change.
+    EMBEDDING_DIMENSIONS: int = int(os.getenv("EMBEDDING_DIMENSIONS", "1536"))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+    # Tokenizer matching EMBEDDING_MODEL, used to size chunks
+    EMBEDDING_TOKENIZER: str = os.getenv("EMBEDDING_TOKENIZER", "cl100k_base")
+
+    # Chunking (in EMBEDDING_TOKENIZER tokens)
+    CHUNK_TOKENS: int = int(os.getenv("CHUNK_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+
+    # Embedding cache (in-process LRU in front of SQLite on disk)
+    EMBEDDING_CACHE_ENABLED: bool = (
+        os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    )
+    EMBEDDING_CACHE_PATH: str = os.getenv(
+        "EMBEDDING_CACHE_PATH", "./embedding_cache.db"
+    )
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = int(
+        os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000")
+    )
+    EMBEDDING_CACHE_MAX_ITEMS: int = int(
+        os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "500000")
+    )
+
+    # Connection pool sizes of the app-wide HTTP clients
+    OPENROUTER_POOL_SIZE: int = int(os.getenv("OPENROUTER_POOL_SIZE", "20"))
+    QDRANT_POOL_SIZE: int = int(os.getenv("QDRANT_POOL_SIZE", "20"))
+
     # OpenRouter Model (format: "provider/model", e.g., "openai/gpt-3.5-turbo")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "openai/gpt-3.5-turbo")
 
+    # Conversation memory: recent turns sent verbatim up to this many tokens,
+    # older turns folded into a rolling per-session summary
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+    HISTORY_SUMMARY_MAX_TOKENS: int = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+    # Safety cap on unsummarized messages loaded per turn
+    HISTORY_MAX_MESSAGES: int = int(os.getenv("HISTORY_MAX_MESSAGES", "200"))
+
+    # Context packing: token budget for retrieved chunks in the prompt and the
+    # word-set similarity above which a chunk counts as a duplicate
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_DUPLICATE_SIMILARITY: float = float(
+        os.getenv("CONTEXT_DUPLICATE_SIMILARITY", "0.9")
+    )
+
+    # Hybrid retrieval: new collections also store BM25-style sparse vectors
+    # and searches fuse dense + sparse rankings. Existing collections keep
+    # the mode they were created with.
+    HYBRID_SEARCH: bool = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # Candidates fetched per ranking, as a multiple of the result limit
+    HYBRID_PREFETCH: int = int(os.getenv("HYBRID_PREFETCH", "4"))
+
+    # Vector storage profile of new collections: default | balanced | compact
+    # (see services/vector_profiles.py; apply_vector_profile.py migrates one)
+    QDRANT_PROFILE: str = os.getenv("QDRANT_PROFILE", "default")
+    # Per-query HNSW search breadth; 0 uses the profile's value
+    QDRANT_HNSW_EF: int = int(os.getenv("QDRANT_HNSW_EF", "0"))
+    # Quantized candidates rescored per result; 0 uses the profile's value
+    QDRANT_OVERSAMPLING: float = float(os.getenv("QDRANT_OVERSAMPLING", "0"))
+
+    # Semantic answer cache (in-process, per collection)
+    ANSWER_CACHE_ENABLED: bool = (
+        os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    )
+    # Max cosine distance between queries to reuse an answer
+    ANSWER_CACHE_MAX_DISTANCE: float = float(
+        os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0.05")
+    )
+    ANSWER_CACHE_TTL: int = int(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+    ANSWER_CACHE_MAX_ENTRIES: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+    # Chat turn writes: with write-behind, turns from concurrent requests are
+    # committed together (each request still waits for its commit)
+    CHAT_WRITE_BEHIND: bool = os.getenv("CHAT_WRITE_BEHIND", "false").lower() == "true"
+    CHAT_WRITE_BATCH_SIZE: int = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "50"))
+    CHAT_WRITE_DELAY_MS: int = int(os.getenv("CHAT_WRITE_DELAY_MS", "10"))
+
+    # Background ingestion
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))
+    # Seconds without a heartbeat before another process takes over a job
+    INGEST_JOB_LEASE_SECONDS: int = int(os.getenv("INGEST_JOB_LEASE_SECONDS", "120"))
+    # Processes for PDF page extraction, shared by all ingest workers (0 = one per CPU core)
+    PDF_EXTRACTION_WORKERS: int = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))
+
+    # Authenticated users cached per token until it expires (or for TTL
+    # seconds, if non-zero); deactivations reach every worker through a
+    # revocation generation in the database
+    PRINCIPAL_CACHE_TTL: int = int(os.getenv("PRINCIPAL_CACHE_TTL", "0"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(
+        os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000")
+    )
+
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
     RATE_LIMIT_WINDOW: int = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # seconds
+    # "memory" (per worker process) or "sqlite" (shared by all workers on the host)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "./rate_limit.db")
+    # "ip" or "user" (authenticated requests limited per user ID)
+    RATE_LIMIT_KEY: str = os.getenv("RATE_LIMIT_KEY", "ip")
+    # Seconds between evictions of idle keys (0 = once per window)
+    RATE_LIMIT_EVICT_INTERVAL: int = int(os.getenv("RATE_LIMIT_EVICT_INTERVAL", "0"))
+
+    # Prometheus metrics on /metrics; set PROMETHEUS_MULTIPROC_DIR to
+    # aggregate them across workers (see core/metrics.py)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
     class Config:
         env_file: str = ".env"
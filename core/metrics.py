@@ -0,0 +1,129 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Latency buckets in seconds, from cache lookups to slow LLM answers
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# Prompt context sizes in tokens, around the default CONTEXT_TOKEN_BUDGET
+TOKEN_BUCKETS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+# With several workers, PROMETHEUS_MULTIPROC_DIR makes every process write
+# its metrics there so any worker can serve the totals of all of them.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def render() -> bytes:
+    """The metrics of every worker, in Prometheus text format."""
+    if not MULTIPROCESS:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead() -> None:
+    """Drops this worker's live gauges from the totals when it exits."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def count_retry(operation: str):
+    """tenacity before_sleep callback counting retries of an operation."""
+
+    def before_sleep(retry_state) -> None:
+        RETRIES.labels(operation=operation).inc()
+
+    return before_sleep
+
+
+# Counter names get their _total suffix from prometheus_client.
+
+CHAT_STAGE_SECONDS = Histogram(
+    "chatbot_chat_stage_duration_seconds",
+    "Time spent in each stage of a chat turn.",
+    ["stage"],
+    buckets=DEFAULT_BUCKETS,
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "chatbot_ingest_stage_duration_seconds",
+    "Time spent in each stage of a document ingest.",
+    ["stage"],
+    buckets=DEFAULT_BUCKETS,
+)
+EMBEDDING_SECONDS = Histogram(
+    "chatbot_embedding_request_duration_seconds",
+    "Time to embed one batch of texts with the embedding provider.",
+    ["provider"],
+    buckets=DEFAULT_BUCKETS,
+)
+QDRANT_SECONDS = Histogram(
+    "chatbot_qdrant_request_duration_seconds",
+    "Time of Qdrant calls by operation.",
+    ["operation"],
+    buckets=DEFAULT_BUCKETS,
+)
+CONTEXT_TOKENS = Histogram(
+    "chatbot_context_tokens",
+    "Tokens of the retrieved chunks per chat turn, before and after packing.",
+    ["stage"],
+    buckets=TOKEN_BUCKETS,
+)
+CONTEXT_CHUNKS_DROPPED = Counter(
+    "chatbot_context_chunks_dropped",
+    "Retrieved chunks left out of the context by reason (duplicate, over_budget).",
+    ["reason"],
+)
+CACHE_LOOKUPS = Counter(
+    "chatbot_cache_lookups",
+    "Cache lookups by cache (answer, embedding, principal) and result (hit, miss).",
+    ["cache", "result"],
+)
+FALLBACK_SEARCHES = Counter(
+    "chatbot_fallback_searches",
+    "Chat turns that fell back to the broad keyword search.",
+)
+NO_CONTEXT_RESPONSES = Counter(
+    "chatbot_no_context_responses",
+    "Chat turns answered without document context.",
+)
+LLM_FAILURES = Counter(
+    "chatbot_llm_failures",
+    "LLM calls that failed after their retries and used the fallback answer.",
+)
+RETRIES = Counter(
+    "chatbot_retries",
+    "Retried calls by operation (llm, embedding).",
+    ["operation"],
+)
+INGEST_JOBS = Counter(
+    "chatbot_ingest_jobs",
+    "Finished ingest jobs by status (indexed, failed).",
+    ["status"],
+)
+INGEST_CHUNKS = Counter(
+    "chatbot_ingest_chunks",
+    "Chunks handled by ingest jobs by result (added, kept, removed).",
+    ["result"],
+)
+# livesum: the sum over the workers that are still running
+REQUESTS_IN_PROGRESS = Gauge(
+    "chatbot_requests_in_progress",
+    "Requests being handled, by endpoint.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+INGEST_JOBS_IN_PROGRESS = Gauge(
+    "chatbot_ingest_jobs_in_progress",
+    "Ingest jobs being processed by the workers.",
+    multiprocess_mode="livesum",
+)
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import Select, Update, select, update
+
+from core.config import settings
+from core.metrics import CACHE_LOOKUPS
+from db import models
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Usuario autenticado, inmutable y desligado de la sesión de base de datos.
+    """
+
+    id: int
+    email: str
+    username: str
+    is_active: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            is_active=bool(user.is_active),
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+def revocation_query(user_id: int) -> Select:
+    """
+    Generación de revocación del usuario (sin fila es 0). Una sentencia para
+    poder ejecutarla en sesiones async.
+    """
+    return select(models.UserRevocation.generation).where(
+        models.UserRevocation.user_id == user_id
+    )
+
+
+def revoke_statement(user_id: int) -> Update:
+    return (
+        update(models.UserRevocation)
+        .where(models.UserRevocation.user_id == user_id)
+        .values(
+            generation=models.UserRevocation.generation + 1,
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def first_revocation(user_id: int) -> models.UserRevocation:
+    return models.UserRevocation(
+        user_id=user_id, generation=1, updated_at=datetime.utcnow()
+    )
+
+
+class PrincipalCache:
+    """
+    Caché en memoria de usuarios ya verificados, por (user_id, token).
+
+    Cada entrada vive hasta que expira el token (o ttl segundos, si es menor).
+    Es por proceso, así que guarda la generación de revocación con la que se
+    verificó el usuario (en la base de datos, ver revoke_statement): quien
+    consulta pasa la generación actual y las entradas anteriores se descartan,
+    de modo que una desactivación se ve en todos los workers en la siguiente
+    petición.
+    """
+
+    def __init__(self, ttl: int = 0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[Principal, float, int]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, token: str, generation: int = 0) -> Optional[Principal]:
+        principal = self._lookup((user_id, token), generation)
+        CACHE_LOOKUPS.labels(
+            cache="principal", result="miss" if principal is None else "hit"
+        ).inc()
+        return principal
+
+    def _lookup(self, key: Tuple[int, str], generation: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at, cached_generation = entry
+            if expires_at <= time.time() or cached_generation < generation:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(
+        self,
+        token: str,
+        principal: Principal,
+        token_expires_at: float,
+        generation: int = 0,
+    ) -> None:
+        """Guarda el principal, verificado con la generación de revocación dada."""
+        expires_at = token_expires_at
+        if self.ttl:
+            expires_at = min(expires_at, time.time() + self.ttl)
+        with self._lock:
+            self._entries[(principal.id, token)] = (principal, expires_at, generation)
+            self._entries.move_to_end((principal.id, token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta todas las entradas del usuario en este proceso."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL, max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES
+)
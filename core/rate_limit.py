@@ -1,66 +1,233 @@
+import asyncio
+import sqlite3
+import threading
 import time
-from collections import defaultdict
-from typing import Dict, List, Tuple
-from fastapi import Request, HTTPException, status
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
 from starlette.middleware.base import BaseHTTPMiddleware
 from core.config import settings
 from core.logging_config import logger
 
+# Per-key state: (window index, requests in that window, requests in the previous one)
+WindowState = Tuple[int, int, int]
+
+
+class RateLimitBackend(ABC):
+    """
+    Sliding-window counter storage.
+
+    Each key holds two counters (current and previous fixed window), so
+    memory per key is constant. The request rate is estimated by weighting
+    the previous window by how much of it still overlaps the sliding window.
+    Idle keys are evicted every evict_interval seconds.
+    """
+
+    # Whether hit() does blocking I/O and should run off the event loop
+    blocking = False
+
+    def __init__(self, max_requests: int, window: int, evict_interval: int):
+        self.max_requests = max_requests
+        self.window = window
+        self.evict_interval = evict_interval
+        self._next_eviction = time.time() + evict_interval
+
+    def _slide(self, state: Optional[WindowState], now: float) -> Tuple[WindowState, float]:
+        """Advances a key's counters to now and returns them with the estimate."""
+        window_index = int(now // self.window)
+        if state is None or state[0] < window_index - 1:
+            current, previous = 0, 0
+        elif state[0] == window_index - 1:
+            current, previous = 0, state[1]
+        else:
+            current, previous = state[1], state[2]
+
+        overlap = 1 - (now % self.window) / self.window
+        return (window_index, current, previous), previous * overlap + current
+
+    def _decide(self, state: Optional[WindowState], now: float) -> Tuple[WindowState, bool, int]:
+        """Counts the request if allowed; returns (new state, allowed, remaining)."""
+        state, estimate = self._slide(state, now)
+        if estimate >= self.max_requests:
+            return state, False, 0
+        state = (state[0], state[1] + 1, state[2])
+        return state, True, max(0, int(self.max_requests - estimate - 1))
+
+    def _eviction_due(self, now: float) -> bool:
+        if now < self._next_eviction:
+            return False
+        self._next_eviction = now + self.evict_interval
+        return True
+
+    @abstractmethod
+    def hit(self, key: str) -> Tuple[bool, int]:
+        """Records a request for key; returns (allowed, remaining)."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process counters; each worker enforces its own limit."""
+
+    def __init__(self, max_requests: int, window: int, evict_interval: int):
+        super().__init__(max_requests, window, evict_interval)
+        self._states: Dict[str, WindowState] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Tuple[bool, int]:
+        now = time.time()
+        with self._lock:
+            if self._eviction_due(now):
+                self._evict(now)
+            state, allowed, remaining = self._decide(self._states.get(key), now)
+            self._states[key] = state
+            return allowed, remaining
+
+    def _evict(self, now: float):
+        # Keys without requests in the current or previous window count as zero
+        stale = int(now // self.window) - 1
+        for key in [k for k, s in self._states.items() if s[0] < stale]:
+            del self._states[key]
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Counters in a SQLite file, shared by every worker process on the host.
+
+    Each check is one short write transaction; BEGIN IMMEDIATE serializes
+    concurrent workers so no request is counted twice or missed.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, max_requests: int, window: int, evict_interval: int):
+        super().__init__(max_requests, window, evict_interval)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=5
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, "
+            "current INTEGER NOT NULL, previous INTEGER NOT NULL)"
+        )
+
+    def hit(self, key: str) -> Tuple[bool, int]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._eviction_due(now):
+                    self._conn.execute(
+                        "DELETE FROM rate_limits WHERE window_index < ?",
+                        (int(now // self.window) - 1,),
+                    )
+                row = self._conn.execute(
+                    "SELECT window_index, current, previous FROM rate_limits WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                state, allowed, remaining = self._decide(row, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?)",
+                    (key, *state),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return allowed, remaining
+
+
+def create_backend() -> RateLimitBackend:
+    """Builds the backend selected by RATE_LIMIT_BACKEND."""
+    evict_interval = settings.RATE_LIMIT_EVICT_INTERVAL or settings.RATE_LIMIT_WINDOW
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(
+            settings.RATE_LIMIT_DB_PATH,
+            settings.RATE_LIMIT_REQUESTS,
+            settings.RATE_LIMIT_WINDOW,
+            evict_interval,
+        )
+    if settings.RATE_LIMIT_BACKEND != "memory":
+        logger.warning(
+            f"Unknown RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}', using memory"
+        )
+    return MemoryRateLimitBackend(
+        settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW, evict_interval
+    )
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
-    Simple in-memory rate limiting middleware.
-    Tracks requests per client IP within a time window.
+    Sliding-window rate limiting middleware.
+    Limits requests per client IP, or per authenticated user when
+    RATE_LIMIT_KEY is "user" (anonymous requests fall back to the IP).
     """
 
-    def __init__(self, app):
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None):
         super().__init__(app)
-        # Store: {client_ip: [(timestamp1), (timestamp2), ...]}
-        self.requests: Dict[str, List[float]] = defaultdict(list)
+        self.backend = backend or create_backend()
         self.max_requests = settings.RATE_LIMIT_REQUESTS
         self.window = settings.RATE_LIMIT_WINDOW
+        self.key_by_user = settings.RATE_LIMIT_KEY == "user"
 
-    def _clean_old_requests(self, client_ip: str):
-        """Remove requests outside the time window."""
-        current_time = time.time()
-        self.requests[client_ip] = [
-            req_time
-            for req_time in self.requests[client_ip]
-            if current_time - req_time < self.window
-        ]
+    @staticmethod
+    def _client_ip(request: Request) -> str:
+        client_ip = request.headers.get("X-Forwarded-For", request.client.host)
+        if client_ip and "," in client_ip:
+            client_ip = client_ip.split(",")[0].strip()
+        return client_ip
 
-    def _is_rate_limited(self, client_ip: str) -> bool:
-        """Check if client has exceeded rate limit."""
-        self._clean_old_requests(client_ip)
-        return len(self.requests[client_ip]) >= self.max_requests
+    def _client_key(self, request: Request) -> str:
+        if self.key_by_user:
+            token = request.cookies.get("access_token")
+            if token:
+                try:
+                    payload = jwt.decode(
+                        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+                    )
+                    if payload.get("user_id"):
+                        return f"user:{payload['user_id']}"
+                except JWTError:
+                    pass
+        return f"ip:{self._client_ip(request)}"
 
     async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health checks and documentation
+        # Skip rate limiting for health checks, metrics scrapes and documentation
         path = request.url.path
-        if path in ["/", "/health", "/docs", "/redoc", "/openapi.json"]:
+        if path in ["/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"]:
+            return await call_next(request)
+        # Ingest job polls are a primary-key read; counting them would lock
+        # out a client that watches a long ingest
+        if request.method == "GET" and path.startswith("/documents/jobs/"):
             return await call_next(request)
 
-        # Get client IP
-        client_ip = request.headers.get("X-Forwarded-For", request.client.host)
-        if client_ip and "," in client_ip:
-            client_ip = client_ip.split(",")[0].strip()
+        key = self._client_key(request)
+        if self.backend.blocking:
+            allowed, remaining = await asyncio.to_thread(self.backend.hit, key)
+        else:
+            allowed, remaining = self.backend.hit(key)
 
-        # Check rate limit
-        if self._is_rate_limited(client_ip):
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            raise HTTPException(
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {key}")
+            # Exceptions raised in middleware bypass FastAPI's handlers
+            return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded. Maximum {self.max_requests} requests per {self.window} seconds.",
+                content={
+                    "detail": f"Rate limit exceeded. Maximum {self.max_requests} requests per {self.window} seconds."
+                },
+                headers={
+                    "X-RateLimit-Limit": str(self.max_requests),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Window": str(self.window),
+                },
             )
 
-        # Record request
-        self.requests[client_ip].append(time.time())
-
         # Process request
         response = await call_next(request)
 
         # Add rate limit headers
-        remaining = max(0, self.max_requests - len(self.requests[client_ip]))
         response.headers["X-RateLimit-Limit"] = str(self.max_requests)
         response.headers["X-RateLimit-Remaining"] = str(remaining)
         response.headers["X-RateLimit-Window"] = str(self.window)
@@ -3,9 +3,11 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from core.config import settings
+from core.principal_cache import Principal, principal_cache, revocation_query
 from db import models
-from db.database import get_db
-from sqlalchemy.orm import Session
+from db.database import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -54,9 +56,15 @@ def decode_refresh_token(token: str):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de actualización inválido o expirado.")
     
 
-def get_current_user(access_token: str = Cookie(None), db: Session = Depends(get_db)):
+async def get_current_user(
+    access_token: str = Cookie(None), db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     """
-    Extraer y validar token de acceso desde la cookie
+    Extraer y validar token de acceso desde la cookie.
+
+    El usuario verificado se guarda en caché hasta que expira el token, así
+    que la tabla de usuarios solo se consulta la primera vez por token; en
+    cada petición solo se lee su generación de revocación.
     """
     if not access_token:
         raise HTTPException(status_code=401, detail="Token invalido")
@@ -72,11 +80,21 @@ def get_current_user(access_token: str = Cookie(None), db: Session = Depends(get
     """
      Obtener el usuario desde la base de datos usando SQLAlchemy
     """
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Una desactivación en cualquier proceso incrementa la generación
+    generation = await db.scalar(revocation_query(user_id)) or 0
+    principal = principal_cache.get(user_id, access_token, generation)
+    if principal:
+        return principal
+
+    user = await db.scalar(select(models.User).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="Usuario inactivo")
+
+    principal = Principal.from_user(user)
+    principal_cache.put(access_token, principal, payload["exp"], generation)
+    return principal
 
 
     
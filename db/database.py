@@ -1,9 +1,26 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from core.config import settings
 
+# Drivers asíncronos para cada dialecto síncrono
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Convierte la URL síncrona de la base de datos a su driver asíncrono.
+    """
+    scheme, _, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
 # Crear el motor de SQLAlchemy con la URL de la base de datos
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URL,
@@ -13,6 +30,17 @@ engine = create_engine(
 # Configurar la sesión local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono para los handlers de la API (chat y autenticación)
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.SQLALCHEMY_DATABASE_URL),
+    pool_pre_ping=True,
+)
+
+# Sin expirar tras commit: los objetos se siguen leyendo fuera de la sesión
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, expire_on_commit=False, autoflush=False
+)
+
 # Clase base para los modelos
 Base = declarative_base()
 
@@ -27,4 +55,15 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency injection para obtener una sesión asíncrona de base de datos.
+
+    Yields:
+        AsyncSession: Sesión asíncrona de SQLAlchemy.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -49,3 +58,74 @@ class ChatSession(Base):
     # Relaciones
     user = relationship("User", back_populates="chat_sessions")
     messages = relationship("Message", back_populates="session")
+
+
+class SessionSummary(Base):
+    __tablename__ = "session_summaries"
+
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), primary_key=True)
+    summary = Column(Text)
+    # Last message folded into the summary; later ones are sent verbatim
+    last_message_id = Column(Integer, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    filename = Column(String)
+    file_path = Column(String)
+    collection = Column(String)
+    # queued -> extracting -> embedding -> indexed | failed
+    status = Column(String, default="queued", index=True)
+    # Lease token of the claim running the job; updates from a process
+    # whose lease was taken over match no row
+    claimed_by = Column(String, nullable=True)
+    chunks_total = Column(Integer, default=0)
+    chunks_embedded = Column(Integer, default=0)
+    # Re-ingest diff: chunks embedded anew / unchanged / deleted
+    chunks_added = Column(Integer, default=0)
+    chunks_kept = Column(Integer, default=0)
+    chunks_removed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)
+
+    # Relaciones
+    user = relationship("User")
+
+
+class Document(Base):
+    __tablename__ = "documents"
+    # Also the index behind per-collection listings ordered by source
+    __table_args__ = (UniqueConstraint("collection", "source"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    collection = Column(String, nullable=False)
+    source = Column(String, nullable=False)
+    chunk_count = Column(Integer, default=0)
+    byte_size = Column(Integer, default=0)
+    content_hash = Column(String(64))
+    ingested_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class CollectionGeneration(Base):
+    __tablename__ = "collection_generations"
+
+    collection = Column(String, primary_key=True)
+    # Bumped whenever the collection's documents change; cached answers from
+    # an older generation are discarded by every process
+    generation = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class UserRevocation(Base):
+    __tablename__ = "user_revocations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Se incrementa al desactivar al usuario; todos los procesos descartan
+    # los principals que cachearon con una generación anterior
+    generation = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
@@ -116,10 +116,9 @@ function setupEventListeners() {
             });
             
             if (res.ok) {
-                const data = await res.json();
-                statusDiv.innerHTML = `<span class="status-success">✅ ${data.filename} indexado (${data.chunks_indexed} chunks)</span>`;
+                const job = await res.json();
                 fileInput.value = '';
-                loadDocuments();
+                pollIngestJob(job.id, statusDiv);
             } else {
                 const data = await res.json();
                 statusDiv.innerHTML = `<span class="status-error">❌ ${data.detail || 'Error al subir'}</span>`;
@@ -150,25 +149,39 @@ function setupEventListeners() {
                 body.session_id = currentSessionId;
             }
             
-            const res = await fetch(`${API_URL}/chat/ask`, {
+            const res = await fetch(`${API_URL}/chat/ask/stream`, {
                 method: 'POST',
                 credentials: 'include',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(body)
             });
             
-            hideTyping();
-            
-            if (res.ok) {
-                const data = await res.json();
-                if (!currentSessionId && data.session_id) {
-                    currentSessionId = data.session_id;
-                }
-                addMessage(data.content, 'bot');
-            } else {
+            if (!res.ok) {
+                hideTyping();
                 const err = await res.json();
                 addMessage(`Error: ${err.detail || 'No se pudo obtener respuesta'}`, 'error');
+                return;
             }
+            
+            // Render tokens as they arrive
+            let botText = null;
+            await readEventStream(res, (event, data) => {
+                if (event === 'token') {
+                    if (!botText) {
+                        hideTyping();
+                        botText = addMessage('', 'bot');
+                    }
+                    botText.textContent += data.content;
+                    scrollChatToBottom();
+                } else if (event === 'done') {
+                    if (!currentSessionId && data.session_id) {
+                        currentSessionId = data.session_id;
+                    }
+                } else if (event === 'error') {
+                    addMessage(`Error: ${data.detail || 'No se pudo obtener respuesta'}`, 'error');
+                }
+            });
+            hideTyping();
         } catch (err) {
             hideTyping();
             addMessage('Error de conexión con el servidor', 'error');
@@ -176,6 +189,66 @@ function setupEventListeners() {
     });
 }
 
+// Parse a Server-Sent Events response body, calling onEvent(event, data) per message
+async function readEventStream(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+// Poll a background ingest job until it is indexed or failed
+async function pollIngestJob(jobId, statusDiv) {
+    // Poll quickly at first, then back off for long ingests
+    let delay = 1000;
+    while (true) {
+        const res = await fetch(`${API_URL}/documents/jobs/${jobId}`, {
+            credentials: 'include'
+        });
+        if (!res.ok) {
+            statusDiv.innerHTML = '<span class="status-error">❌ Error al consultar el estado</span>';
+            return;
+        }
+        
+        const job = await res.json();
+        if (job.status === 'indexed') {
+            statusDiv.innerHTML = `<span class="status-success">✅ ${escapeHtml(job.filename)} indexado (${job.chunks_added} nuevos, ${job.chunks_kept} sin cambios, ${job.chunks_removed} eliminados)</span>`;
+            loadDocuments();
+            return;
+        }
+        if (job.status === 'failed') {
+            statusDiv.innerHTML = `<span class="status-error">❌ ${escapeHtml(job.error || 'Error al indexar')}</span>`;
+            return;
+        }
+        
+        const progress = job.status === 'embedding'
+            ? ` (${job.chunks_embedded}/${job.chunks_added} chunks nuevos de ${job.chunks_total})`
+            : '';
+        statusDiv.innerHTML = `<span class="status-loading">⏳ ${job.status}${progress}...</span>`;
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 1.5, 10000);
+    }
+}
+
 // View Management
 function showAuthView() {
     document.getElementById('auth-view').classList.remove('hidden');
@@ -210,6 +283,7 @@ function showTab(tab) {
 }
 
 // Chat Functions
+// Returns the element holding the message text so callers can append to it
 function addMessage(content, type) {
     const container = document.getElementById('chat-messages');
     const messageDiv = document.createElement('div');
@@ -221,11 +295,17 @@ function addMessage(content, type) {
     });
     
     messageDiv.innerHTML = `
-        ${escapeHtml(content)}
+        <span class="content">${escapeHtml(content)}</span>
         <div class="timestamp">${timestamp}</div>
     `;
     
     container.appendChild(messageDiv);
+    scrollChatToBottom();
+    return messageDiv.querySelector('.content');
+}
+
+function scrollChatToBottom() {
+    const container = document.getElementById('chat-messages');
     container.scrollTop = container.scrollHeight;
 }
 
@@ -269,7 +349,7 @@ async function loadDocuments() {
         
         if (res.ok) {
             const data = await res.json();
-            renderDocuments(data.sources);
+            renderDocuments(data.documents);
         } else {
             listDiv.innerHTML = '<p class="empty">Error al cargar documentos</p>';
         }
@@ -278,21 +358,21 @@ async function loadDocuments() {
     }
 }
 
-function renderDocuments(sources) {
+function renderDocuments(documents) {
     const listDiv = document.getElementById('documents-list');
     
-    if (!sources || Object.keys(sources).length === 0) {
+    if (!documents || documents.length === 0) {
         listDiv.innerHTML = '<p class="empty">No hay documentos</p>';
         return;
     }
     
-    listDiv.innerHTML = Object.entries(sources).map(([name, info]) => `
+    listDiv.innerHTML = documents.map(doc => `
         <div class="document-item">
             <div class="info">
-                <div class="name" title="${escapeHtml(name)}">${escapeHtml(name)}</div>
-                <div class="chunks">${info.count} chunks</div>
+                <div class="name" title="${escapeHtml(doc.source)}">${escapeHtml(doc.source)}</div>
+                <div class="chunks">${doc.chunk_count} chunks</div>
             </div>
-            <button class="delete-btn" onclick="deleteDocument('${escapeHtml(name)}')">🗑️</button>
+            <button class="delete-btn" onclick="deleteDocument('${escapeHtml(doc.source)}')">🗑️</button>
         </div>
     `).join('');
 }
@@ -1,4 +1,6 @@
 import asyncio
+from db.database import SessionLocal
+from services.document_catalog import DocumentCatalog, file_fingerprint
 from services.document_processor import DocumentProcessor, ChunkValidator
 from services.vector_service import VectorService
 
@@ -9,7 +11,7 @@ def main():
     print(f"📄 Processing: {pdf_path}\n")
 
     # 1. Extract text
-    processor = DocumentProcessor(chunk_size=500, overlap=50)
+    processor = DocumentProcessor()
     print("1. Extracting text from PDF...")
     text = processor.extract_text_from_pdf(pdf_path)
     print(f"   ✅ Text extracted: {len(text)} characters")
@@ -23,7 +25,7 @@ def main():
     valid_chunks = [
         {"text": processor.clean_text(c["text"]), "metadata": c["metadata"]}
         for c in chunks_data
-        if ChunkValidator.is_valid(c["text"])
+        if ChunkValidator.is_valid(c["text"], processor.max_length)
     ]
     print(f"   ✅ Valid chunks: {len(valid_chunks)}")
 
@@ -32,13 +34,28 @@ def main():
     vector_service = VectorService()
     vector_service.create_collection_if_not_exists()
 
-    # Clear previous document if exists
-    deleted = vector_service.delete_by_source("lf_S.pdf")
-    if deleted > 0:
-        print(f"   🗑️ Deleted {deleted} previous chunks")
+    # Re-embed only chunks that changed since the last run
+    counts = vector_service.sync_source("lf_S.pdf", valid_chunks)
+    print(
+        f"   ✅ Added: {counts['added']}, kept: {counts['kept']}, "
+        f"removed: {counts['removed']} chunks"
+    )
 
-    point_ids = vector_service.add_documents_batch(valid_chunks)
-    print(f"   ✅ Indexed: {len(point_ids)} chunks")
+    byte_size, content_hash = file_fingerprint(pdf_path)
+    db = SessionLocal()
+    try:
+        catalog = DocumentCatalog(db)
+        catalog.record(
+            vector_service.collection_name,
+            "lf_S.pdf",
+            counts["added"] + counts["kept"],
+            byte_size,
+            content_hash,
+        )
+        # Running servers drop their cached answers about this collection
+        catalog.bump_generation(vector_service.collection_name)
+    finally:
+        db.close()
 
     # 5. Verify
     print("\n4. Verifying...")
@@ -1,12 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from routers.document_router import router as document_router
 from routers.chat_router import router as chat_router
 from routers.auth_router import router as auth_router
 from routers.ai_router import router as ai_router
+from core.config import settings
 from core.logging_config import logger
+from core.metrics import mark_process_dead, render
 from core.rate_limit import RateLimitMiddleware
+from db import models
+from db.database import async_engine, engine
+from services.clients import SharedClients
+from services.document_catalog import backfill_if_empty
+from services.document_processor import shutdown_extraction_pool
+from services.ingest_service import ingest_queue
+from services.tokenizer import load_tokenizer
+from services.turn_writer import turn_writer
+from services.vector_service import AsyncVectorService
+
+
+async def backfill_catalog(clients: SharedClients):
+    """Fills an empty document catalog from Qdrant, in the background."""
+    try:
+        await backfill_if_empty(AsyncVectorService(clients), settings.QDRANT_COLLECTION)
+    except Exception as e:
+        logger.warning(
+            f"Could not backfill the document catalog: {e}; run python backfill_catalog.py"
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create any missing tables (e.g. ingest_jobs)
+    models.Base.metadata.create_all(bind=engine)
+    # Chunking and token budgets need it; fail here rather than on first use
+    await asyncio.to_thread(load_tokenizer)
+    # OpenRouter and Qdrant clients live as long as the app so connections are reused
+    app.state.clients = SharedClients()
+    await ingest_queue.start(app.state.clients)
+    # Deployments indexed before the document catalog existed
+    backfill = asyncio.create_task(backfill_catalog(app.state.clients))
+    if settings.CHAT_WRITE_BEHIND:
+        turn_writer.start()
+    yield
+    backfill.cancel()
+    await ingest_queue.stop()
+    shutdown_extraction_pool()
+    # Commit the chat turns still queued before closing the database
+    await turn_writer.stop()
+    await app.state.clients.close()
+    await async_engine.dispose()
+    mark_process_dead()
+
 
 app = FastAPI(
     title="Document ChatBot API",
@@ -25,6 +76,7 @@ app = FastAPI(
     - **Búsqueda**: `/search/*` - Búsqueda directa en Qdrant
     """,
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -63,3 +115,11 @@ async def root():
         "docs": "/docs",
         "redoc": "/redoc",
     }
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Per-stage latencies, cache and fallback counters in Prometheus text format."""
+        return Response(render(), media_type=CONTENT_TYPE_LATEST)
@@ -88,6 +88,37 @@ class UserLogin(BaseSchema):
     password: str
 
 
+class IngestJobResponse(BaseSchema):
+    id: str
+    filename: str
+    collection: str
+    status: str
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    chunks_added: int = 0
+    chunks_kept: int = 0
+    chunks_removed: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class DocumentResponse(BaseSchema):
+    source: str
+    collection: str
+    chunk_count: int = 0
+    byte_size: int = 0
+    content_hash: Optional[str] = None
+    ingested_at: datetime
+
+
+class DocumentListResponse(BaseSchema):
+    documents: List[DocumentResponse]
+    limit: int
+    offset: int
+    has_more: bool
+
+
 __all__ = [
     "UserBase",
     "UserCreate",
@@ -103,4 +134,7 @@ __all__ = [
     "TokenData",
     "UserLogin",
     "ChatRequest",
+    "IngestJobResponse",
+    "DocumentResponse",
+    "DocumentListResponse",
 ]
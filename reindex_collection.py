@@ -0,0 +1,314 @@
+import argparse
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from qdrant_client.models import (
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    PointIdsList,
+    PointStruct,
+)
+
+from core.config import settings
+from db import models
+from db.database import SessionLocal, engine
+from services.document_catalog import DocumentCatalog
+from services.sparse_encoder import encode_document
+from services.vector_profiles import dense_vector_config
+from services.vector_service import DENSE_VECTOR, SPARSE_VECTOR, VectorService
+
+SCROLL_BATCH = 256
+
+
+def shorten(vectors: List[List[float]], size: int) -> List[List[float]]:
+    """
+    Truncates embeddings to size and renormalizes them. For the
+    text-embedding-3 models this equals requesting `dimensions=size`.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)[:, :size]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1, norms)).tolist()
+
+
+def copy_points(service: VectorService, source: str, target: str, reembed: bool) -> int:
+    """
+    Copies every point of source into target, keeping IDs and payloads.
+
+    Dense vectors are shortened to EMBEDDING_DIMENSIONS, or embedded again
+    from the stored text with reembed. Sparse vectors are rebuilt from the
+    text when target is a hybrid collection. Points already in target are
+    skipped, so an interrupted copy resumes where it stopped.
+    """
+    source_info = service.client.get_collection(source)
+    source_vector = (
+        DENSE_VECTOR if isinstance(source_info.config.params.vectors, dict) else ""
+    )
+    hybrid = service.is_hybrid_collection(service.client.get_collection(target))
+
+    copied = 0
+    offset = None
+    while True:
+        records, offset = service.client.scroll(
+            collection_name=source,
+            limit=SCROLL_BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=[source_vector] if source_vector else True,
+        )
+        if records:
+            present = service.client.retrieve(
+                target, ids=[r.id for r in records], with_payload=False
+            )
+            present_ids = {p.id for p in present}
+            records = [r for r in records if r.id not in present_ids]
+        if records:
+            texts = [r.payload.get("text", "") for r in records]
+            if reembed:
+                vectors = service.get_embeddings(texts)
+            else:
+                vectors = shorten(
+                    [
+                        r.vector[source_vector] if source_vector else r.vector
+                        for r in records
+                    ],
+                    settings.EMBEDDING_DIMENSIONS,
+                )
+            points = [
+                PointStruct(
+                    id=r.id,
+                    vector=(
+                        {DENSE_VECTOR: vector, SPARSE_VECTOR: encode_document(text)}
+                        if hybrid
+                        else vector
+                    ),
+                    payload=r.payload,
+                )
+                for r, text, vector in zip(records, texts, vectors)
+            ]
+            service.client.upsert(collection_name=target, points=points)
+            copied += len(points)
+            print(f"   ... {copied} points", end="\r")
+        if offset is None:
+            return copied
+
+
+def reconcile(service: VectorService, source: str, target: str) -> int:
+    """
+    Replays onto target what changed in source since the copy: points
+    deleted from source are deleted, and payloads updated there (a re-ingest
+    moves kept chunks to new positions) are copied over. Returns the number
+    of points changed.
+    """
+    changed = 0
+    offset = None
+    while True:
+        records, offset = service.client.scroll(
+            collection_name=target,
+            limit=SCROLL_BATCH,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if records:
+            current = {
+                p.id: p.payload
+                for p in service.client.retrieve(
+                    source, ids=[r.id for r in records], with_payload=True
+                )
+            }
+            deleted = [r.id for r in records if r.id not in current]
+            if deleted:
+                service.client.delete(
+                    collection_name=target, points_selector=PointIdsList(points=deleted)
+                )
+            for r in records:
+                if r.id in current and current[r.id] != r.payload:
+                    service.client.overwrite_payload(
+                        collection_name=target, payload=current[r.id], points=[r.id]
+                    )
+                    changed += 1
+            changed += len(deleted)
+        if offset is None:
+            return changed
+
+
+def dense_size(service: VectorService, collection: str) -> int:
+    info = service.client.get_collection(collection)
+    vector_name = DENSE_VECTOR if isinstance(info.config.params.vectors, dict) else ""
+    return dense_vector_config(info, vector_name).size
+
+
+def point_count(service: VectorService, collection: str) -> int:
+    return service.client.count(collection, exact=True).count
+
+
+def versions(service: VectorService, name: str) -> Dict[int, str]:
+    """Versioned collections built for name, as {version: collection}."""
+    pattern = re.compile(rf"{re.escape(name)}_v(\d+)")
+    found = {}
+    for collection in service.client.get_collections().collections:
+        match = pattern.fullmatch(collection.name)
+        if match:
+            found[int(match.group(1))] = collection.name
+    return found
+
+
+def live_collection(service: VectorService, name: str) -> Optional[str]:
+    """The collection name serves: the alias target, name itself, or None."""
+    for alias in service.client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    if name in {c.name for c in service.client.get_collections().collections}:
+        return name
+    return None
+
+
+def switch_alias(service: VectorService, name: str, target: str, live: Optional[str]):
+    """
+    Points the alias name at target in one atomic operation. The first
+    migration has to drop the original collection called name before the
+    alias can take its name: searches fail for the moment in between, and
+    target already holds every point.
+    """
+    if live == name:
+        service.client.delete_collection(name)
+    operations = []
+    if live is not None and live != name:
+        operations.append(
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=name))
+        )
+    operations.append(
+        CreateAliasOperation(
+            create_alias=CreateAlias(collection_name=target, alias_name=name)
+        )
+    )
+    service.client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def bump_generation(collection: str):
+    """The swap changes the points behind the name: drop cached answers."""
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        DocumentCatalog(db).bump_generation(collection)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild a Qdrant collection at EMBEDDING_DIMENSIONS."
+    )
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION)
+    parser.add_argument(
+        "--reembed",
+        action="store_true",
+        help="Embed the stored texts again instead of shortening the stored vectors",
+    )
+    parser.add_argument(
+        "--discard-staging",
+        action="store_true",
+        help="Delete an unfinished rebuild built at another size instead of stopping",
+    )
+    args = parser.parse_args()
+    name = args.collection
+
+    service = VectorService()
+    live = live_collection(service, name)
+    if live is None:
+        # A crash between dropping the original and creating the alias
+        built = versions(service, name)
+        if not built:
+            raise SystemExit(f"❌ Collection '{name}' not found")
+        latest = built[max(built)]
+        print(f"⚠️  '{name}' is missing, serving it from '{latest}'")
+        switch_alias(service, name, latest, None)
+        live = latest
+
+    current = dense_size(service, live)
+    target = settings.EMBEDDING_DIMENSIONS
+    total = point_count(service, live)
+
+    print(f"📦 Collection '{name}' (served by '{live}'): {total} points")
+    print(f"   Dimensions: {current} -> {target}\n")
+
+    # Rebuilds newer than the live collection were left unfinished
+    built = versions(service, name)
+    live_version = next((v for v, c in built.items() if c == live), 0)
+    pending = [built[v] for v in sorted(built) if v > live_version]
+
+    reembed = args.reembed
+    if current == target and not reembed:
+        print("   ✅ Already at the configured size, nothing to do")
+        for staging in pending:
+            print(f"   Unfinished rebuild '{staging}' left untouched")
+        return
+    if target > current and not reembed:
+        # Shortened vectors can't be lengthened again
+        print("   Target is larger than the stored vectors, embedding texts again")
+        reembed = True
+    if settings.EMBEDDING_PROVIDER != "openrouter" and not reembed:
+        # Only text-embedding-3 vectors stay meaningful when truncated
+        print(f"   Provider '{settings.EMBEDDING_PROVIDER}' needs the texts embedded again")
+        reembed = True
+
+    staging = None
+    for candidate in pending:
+        if dense_size(service, candidate) == target:
+            staging = candidate
+        elif args.discard_staging:
+            print(f"   Deleting unfinished rebuild '{candidate}' at another size")
+            service.client.delete_collection(candidate)
+        else:
+            raise SystemExit(
+                f"❌ '{candidate}' is an unfinished rebuild at "
+                f"{dense_size(service, candidate)} dimensions; pass --discard-staging "
+                "to delete it"
+            )
+    if staging is None:
+        staging = f"{name}_v{max(versions(service, name), default=live_version) + 1}"
+        service.client.create_collection(staging, **service.collection_config())
+    else:
+        print(f"   Resuming '{staging}' ({point_count(service, staging)} points)")
+
+    # 1. Build the resized vectors next to the live collection, which keeps
+    # serving searches. Points ingested meanwhile are picked up by the
+    # second pass.
+    print(f"1. Writing resized vectors to '{staging}'...")
+    for _ in range(2):
+        copied = copy_points(service, live, staging, reembed)
+        print(f"   ✅ {copied} points copied")
+        if point_count(service, staging) >= point_count(service, live):
+            break
+
+    # 2. Replay deletes and re-ingests made meanwhile, so the swap doesn't
+    # bring back removed chunks
+    print(f"\n2. Replaying changes made to '{live}' during the copy...")
+    changed = reconcile(service, live, staging)
+    print(f"   ✅ {changed} points updated or removed")
+
+    # 3. Switch only once the copy holds every point
+    copied, total = point_count(service, staging), point_count(service, live)
+    if copied < total:
+        raise SystemExit(
+            f"❌ '{staging}' has {copied} of {total} points; run again to resume"
+        )
+    service.collection_name = staging
+    service.ensure_payload_indexes()
+
+    print(f"\n3. Pointing '{name}' at '{staging}'...")
+    switch_alias(service, name, staging, live)
+    service.collection_name = name
+    service.refresh_hybrid()
+    # Even shortened vectors rank differently, and the point set changed
+    bump_generation(name)
+    print(f"   ✅ {copied} points at {target} dimensions")
+    if live != name:
+        print(f"   '{live}' is kept for rollback; delete it once '{name}' checks out")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from db.database import get_db
+from db.database import AsyncSessionLocal, get_async_db
 from db import models
-from services.ai_service import AIService
+from services.ai_service import AIService, get_ai_service
+from services.clients import SharedClients, get_clients
 from models.schemas import ChatRequest, MessageResponse, ChatSession
+from core.metrics import REQUESTS_IN_PROGRESS
 from core.security import get_current_user
-from db.models import User
+from core.principal_cache import Principal
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-def verify_session_ownership(session_id: int, user_id: int, db: Session):
+async def verify_session_ownership(session_id: int, user_id: int, db: AsyncSession):
     """Verify that the user owns the session."""
-    session = (
-        db.query(models.ChatSession).filter(models.ChatSession.id == session_id).first()
-    )
+    session = await db.get(models.ChatSession, session_id)
 
     if not session:
         raise HTTPException(
@@ -34,7 +35,8 @@ def verify_session_ownership(session_id: int, user_id: int, db: Session):
 
 @router.post("/sessions", response_model=ChatSession)
 async def create_chat_session(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Crea una nueva sesión de chat sobre documentos.
@@ -42,22 +44,21 @@ async def create_chat_session(
     El chatbot responderá preguntas basándose únicamente en los documentos
     indexados en Qdrant (no tiene conocimiento general).
     """
-    ai_service = AIService(db)
     return await ai_service.create_chat_session(current_user.id)
 
 
 @router.post("/sessions/{session_id}/end")
 async def end_chat_session(
     session_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Finaliza una sesión de chat.
     """
-    verify_session_ownership(session_id, current_user.id, db)
+    await verify_session_ownership(session_id, current_user.id, db)
 
-    ai_service = AIService(db)
     await ai_service.end_chat_session(session_id)
     return {"message": "Sesión finalizada correctamente"}
 
@@ -65,23 +66,24 @@ async def end_chat_session(
 @router.get("/sessions/{session_id}/messages", response_model=List[MessageResponse])
 async def get_chat_history(
     session_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Obtiene el historial de mensajes de una sesión de chat.
     """
-    verify_session_ownership(session_id, current_user.id, db)
+    await verify_session_ownership(session_id, current_user.id, db)
 
-    ai_service = AIService(db)
     return await ai_service.get_chat_history(session_id)
 
 
 @router.post("/ask", response_model=MessageResponse)
 async def ask_question(
     message: ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Hace una pregunta al chatbot sobre los documentos indexados.
@@ -91,21 +93,73 @@ async def ask_question(
 
     Si no encuentra información relevante, indicará que no puede responder.
     """
-    if message.session_id:
-        verify_session_ownership(message.session_id, current_user.id, db)
+    with REQUESTS_IN_PROGRESS.labels(endpoint="ask").track_inprogress():
+        if message.session_id:
+            await verify_session_ownership(message.session_id, current_user.id, db)
+
+        return await ai_service.process_message(
+            user_id=current_user.id,
+            content=message.content,
+            session_id=message.session_id,
+        )
+
 
-    ai_service = AIService(db)
-    return await ai_service.process_message(
-        user_id=current_user.id, content=message.content, session_id=message.session_id
+@router.post("/ask/stream")
+async def ask_question_stream(
+    message: ChatRequest,
+    current_user: Principal = Depends(get_current_user),
+    clients: SharedClients = Depends(get_clients),
+):
+    """
+    Igual que `/chat/ask`, pero transmite la respuesta como Server-Sent Events.
+
+    Emite eventos `token` con cada fragmento generado y un evento `done` con
+    el mensaje guardado (mismo formato que `/chat/ask`) al terminar.
+    """
+    # Las dependencias con yield se cierran antes de transmitir la respuesta,
+    # así que la sesión de BD vive dentro del propio stream.
+    db = AsyncSessionLocal()
+    ai_service = AIService(db, clients)
+    # Counted until the stream ends, not just until the response starts
+    REQUESTS_IN_PROGRESS.labels(endpoint="ask_stream").inc()
+
+    try:
+        if message.session_id:
+            await verify_session_ownership(message.session_id, current_user.id, db)
+
+        turn = await ai_service.prepare_turn(
+            user_id=current_user.id,
+            content=message.content,
+            session_id=message.session_id,
+        )
+    except Exception:
+        REQUESTS_IN_PROGRESS.labels(endpoint="ask_stream").dec()
+        await db.close()
+        raise
+
+    async def event_stream():
+        try:
+            async for event in ai_service.process_message_stream(
+                current_user.id, turn
+            ):
+                yield event
+        finally:
+            REQUESTS_IN_PROGRESS.labels(endpoint="ask_stream").dec()
+            await db.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/sessions/active", response_model=Optional[ChatSession])
 async def get_active_session(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Obtiene la sesión activa del usuario si existe.
     """
-    ai_service = AIService(db)
     return await ai_service.get_active_session(current_user.id)
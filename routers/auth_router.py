@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Response, HTTPException, status
-from sqlalchemy.orm import Session
-from db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_async_db
 from models.schemas import UserCreate, UserResponse, UserLogin, Token
 from services.auth_service import AuthService
 from core.security import get_current_user
@@ -9,23 +9,23 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)) -> UserResponse:
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)) -> UserResponse:
     """
     Registra un nuevo usuario en el sistema.
     """
     auth_service = AuthService(db)
-    return auth_service.register_user(user_data)
+    return await auth_service.register_user(user_data)
 
 
 @router.post("/login", response_model=Token)
-def login(
-    user_data: UserLogin, response: Response, db: Session = Depends(get_db)
+async def login(
+    user_data: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)
 ) -> Token:
     """
     Autentica un usuario y retorna los tokens.
     """
     auth_service = AuthService(db)
-    tokens = auth_service.authenticate_user(user_data)
+    tokens = await auth_service.authenticate_user(user_data)
 
     # Configurar cookies seguras
     # Nota: secure=False para desarrollo local (HTTP)
@@ -61,8 +61,25 @@ def logout(response: Response):
     return {"message": "Sesión cerrada exitosamente"}
 
 
+@router.post("/deactivate")
+async def deactivate(
+    response: Response,
+    current_user: UserResponse = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Desactiva la cuenta del usuario autenticado y cierra su sesión.
+    Sus tokens dejan de aceptarse en todos los workers.
+    """
+    auth_service = AuthService(db)
+    await auth_service.deactivate_user(current_user.id)
+    response.delete_cookie(key="access_token")
+    response.delete_cookie(key="refresh_token")
+    return {"message": "Cuenta desactivada"}
+
+
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(
+async def get_current_user_info(
     current_user: UserResponse = Depends(get_current_user),
 ) -> UserResponse:
     """
@@ -72,16 +89,16 @@ def get_current_user_info(
 
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
+async def refresh_token(
     response: Response,
     current_user: UserResponse = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> Token:
     """
     Renueva el token de acceso usando el token de actualización.
     """
     auth_service = AuthService(db)
-    tokens = auth_service.refresh_access_token(current_user.id)
+    tokens = await auth_service.refresh_access_token(current_user.id)
 
     # Actualizar cookies seguras
     response.set_cookie(
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Query, Depends
 from typing import List, Optional
 
-from qdrant_client import QdrantClient
-from core.config import settings
 from core.security import get_current_user
-from services.vector_service import VectorService
-from db.models import User
+from services.vector_service import AsyncVectorService, get_vector_service
+from services.answer_cache import get_answer_cache
+from services.embedding_cache import get_embedding_cache
+from core.principal_cache import Principal
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -14,38 +14,49 @@ router = APIRouter(prefix="/search", tags=["search"])
 async def search_knowledge(
     q: str = Query(..., description="Search query"),
     limit: int = Query(5, description="Number of results"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    vector_service: AsyncVectorService = Depends(get_vector_service),
 ):
     """
     Search in the vector knowledge base.
     """
-    vector_service = VectorService()
-    results = vector_service.search(q, limit=limit)
+    results = await vector_service.search(q, limit=limit)
 
     return {"query": q, "results": results, "total": len(results)}
 
 
 @router.get("/collections")
-async def list_collections(current_user: User = Depends(get_current_user)):
+async def list_collections(
+    current_user: Principal = Depends(get_current_user),
+    vector_service: AsyncVectorService = Depends(get_vector_service),
+):
     """
     List available collections in Qdrant.
     """
-    client = QdrantClient(url=settings.QDRANT_URL)
-    collections = client.get_collections()
+    collections = await vector_service.client.get_collections()
 
     return {"collections": [c.name for c in collections.collections]}
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(
+    vector_service: AsyncVectorService = Depends(get_vector_service),
+):
     """
     Check service status.
     """
     try:
-        client = QdrantClient(url=settings.QDRANT_URL)
-        collections = client.get_collections()
+        await vector_service.client.get_collections()
         qdrant_status = "ok"
     except Exception as e:
         qdrant_status = f"error: {str(e)}"
 
-    return {"status": "ok", "services": {"qdrant": qdrant_status}}
+    embedding_cache = get_embedding_cache()
+    answer_cache = get_answer_cache()
+
+    return {
+        "status": "ok",
+        "services": {"qdrant": qdrant_status},
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+    }
@@ -1,28 +1,43 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+import asyncio
 import os
+import uuid
 from pathlib import Path
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import INGEST_STAGE_SECONDS, REQUESTS_IN_PROGRESS
 from core.security import get_current_user
-from services.document_processor import DocumentProcessor, ChunkValidator
-from services.vector_service import VectorService
-from db.models import User
+from services.answer_cache import get_answer_cache
+from services.document_catalog import AsyncDocumentCatalog
+from services.ingest_service import ingest_queue
+from services.vector_service import AsyncVectorService, get_vector_service
+from db import models
+from db.database import get_async_db
+from core.principal_cache import Principal
+from models.schemas import (
+    DocumentListResponse,
+    DocumentResponse,
+    IngestJobResponse,
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 DOCUMENTS_FOLDER = "documents"
 
 
-@router.post("/ingest")
+@router.post("/ingest", status_code=202, response_model=IngestJobResponse)
 async def ingest_document(
     file: UploadFile = File(...),
     collection: str = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
-    Uploads a PDF, processes it and indexes it in Qdrant.
+    Uploads a PDF and queues it for background indexing in Qdrant.
+
+    Returns the ingest job right away; poll `/documents/jobs/{id}` for progress.
     """
     logger.info(f"User {current_user.id} uploading document: {file.filename}")
 
@@ -33,81 +48,84 @@ async def ingest_document(
     if collection is None:
         collection = settings.QDRANT_COLLECTION
 
-    file_path = os.path.join(DOCUMENTS_FOLDER, file.filename)
+    # One folder per upload: a job still reading an earlier upload of the
+    # same file name never sees it overwritten. The file name is kept, as
+    # it becomes the chunks' source.
+    upload_folder = os.path.join(DOCUMENTS_FOLDER, uuid.uuid4().hex)
+    file_path = os.path.join(upload_folder, os.path.basename(file.filename))
 
     try:
-        # Ensure documents folder exists
-        Path(DOCUMENTS_FOLDER).mkdir(parents=True, exist_ok=True)
-
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-
-        logger.info(f"Processing PDF: {file.filename}")
+        with REQUESTS_IN_PROGRESS.labels(endpoint="ingest").track_inprogress():
+            Path(upload_folder).mkdir(parents=True, exist_ok=True)
+
+            # Extraction and indexing run in the ingest queue, timed there
+            with INGEST_STAGE_SECONDS.labels(stage="upload").time():
+                content = await file.read()
+                await asyncio.to_thread(Path(file_path).write_bytes, content)
+
+            with INGEST_STAGE_SECONDS.labels(stage="enqueue").time():
+                job = await ingest_queue.submit(
+                    user_id=current_user.id,
+                    filename=file.filename,
+                    file_path=file_path,
+                    collection=collection,
+                )
+            return IngestJobResponse.model_validate(job)
 
-        processor = DocumentProcessor(chunk_size=500, overlap=50)
-        chunks_data = processor.process_pdf(file_path)
-
-        valid_chunks = [
-            {"text": processor.clean_text(c["text"]), "metadata": c["metadata"]}
-            for c in chunks_data
-            if ChunkValidator.is_valid(c["text"])
-        ]
-
-        if not valid_chunks:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid chunks could be extracted from the document",
-            )
-
-        vector_service = VectorService()
-        vector_service.collection_name = collection
-        vector_service.create_collection_if_not_exists()
+    except Exception as e:
+        logger.error(f"Error queuing document {file.filename}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error processing document: {str(e)}"
+        )
 
-        point_ids = vector_service.add_documents_batch(valid_chunks)
 
-        logger.info(
-            f"Document indexed successfully: {file.filename} ({len(point_ids)} chunks)"
-        )
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Reports the status of an ingest job and its progress (chunks embedded / total).
+    """
+    job = await db.get(models.IngestJob, job_id)
 
-        return {
-            "message": "Document processed and indexed successfully",
-            "filename": file.filename,
-            "chunks_indexed": len(point_ids),
-            "collection": collection,
-        }
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
 
-    except Exception as e:
-        logger.error(f"Error processing document {file.filename}: {str(e)}")
+    if job.user_id != current_user.id:
         raise HTTPException(
-            status_code=500, detail=f"Error processing document: {str(e)}"
+            status_code=403, detail="Not allowed to access this ingest job"
         )
 
+    return IngestJobResponse.model_validate(job)
+
 
-@router.get("/list")
+@router.get("/list", response_model=DocumentListResponse)
 async def list_documents(
-    collection: str = None, current_user: User = Depends(get_current_user)
+    collection: str = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     """
-    Lists indexed documents in the collection.
+    Lists indexed documents in the collection, one page at a time.
     """
     # Use default collection from settings if not provided
     if collection is None:
         collection = settings.QDRANT_COLLECTION
 
     try:
-        vector_service = VectorService()
-        vector_service.collection_name = collection
-        docs = vector_service.get_all_documents(limit=1000)
-
-        sources = {}
-        for doc in docs:
-            source = doc.get("metadata", {}).get("source", "unknown")
-            if source not in sources:
-                sources[source] = {"count": 0, "chunks": []}
-            sources[source]["count"] += 1
-
-        return {"total_documents": len(docs), "sources": sources}
+        documents, has_more = await AsyncDocumentCatalog(db).list(
+            collection, limit, offset
+        )
+        return DocumentListResponse(
+            documents=[DocumentResponse.model_validate(d) for d in documents],
+            limit=limit,
+            offset=offset,
+            has_more=has_more,
+        )
     except Exception as e:
         logger.error(f"Error listing documents: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -115,7 +133,11 @@ async def list_documents(
 
 @router.delete("/{source}")
 async def delete_document(
-    source: str, collection: str = None, current_user: User = Depends(get_current_user)
+    source: str,
+    collection: str = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+    vector_service: AsyncVectorService = Depends(get_vector_service),
 ):
     """
     Deletes a document from the collection by filename.
@@ -125,9 +147,17 @@ async def delete_document(
         collection = settings.QDRANT_COLLECTION
 
     try:
-        vector_service = VectorService()
         vector_service.collection_name = collection
-        deleted_count = vector_service.delete_by_source(source)
+        deleted_count = await vector_service.delete_by_source(source)
+        catalog = AsyncDocumentCatalog(db)
+        await catalog.remove(collection, source)
+
+        if deleted_count:
+            # Drops cached answers about the document in every process
+            await catalog.bump_generation(collection)
+            answer_cache = get_answer_cache()
+            if answer_cache:
+                answer_cache.invalidate(collection)
 
         logger.info(
             f"User {current_user.id} deleted document: {source} ({deleted_count} chunks)"
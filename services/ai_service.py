@@ -1,36 +1,58 @@
+import json
+import time
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from openai import OpenAI
-from fastapi import HTTPException, status
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from fastapi import Depends, HTTPException, status
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import (
+    CHAT_STAGE_SECONDS,
+    CONTEXT_CHUNKS_DROPPED,
+    CONTEXT_TOKENS,
+    FALLBACK_SEARCHES,
+    LLM_FAILURES,
+    NO_CONTEXT_RESPONSES,
+    count_retry,
+)
 from db import models
+from db.database import get_async_db
 from models.schemas import MessageCreate, MessageResponse, ChatSession
-from services.vector_service import VectorService
+from services.answer_cache import get_answer_cache
+from services.clients import SharedClients, get_clients
+from services.context_packer import ContextPacker
+from services.conversation_memory import ConversationMemory
+from services.document_catalog import DocumentCatalog
+from services.turn_writer import ChatTurn, turn_writer, write_turns
+from services.vector_service import AsyncVectorService
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 class AIService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, clients: SharedClients):
         self.db = db
-        # Usar OpenRouter en lugar de OpenAI directamente
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=settings.OPENROUTER_API_KEY,
-            default_headers={
-                "HTTP-Referer": "http://localhost:8000",
-                "X-Title": "Document ChatBot",
-            },
-        )
+        # Cliente de OpenRouter compartido por toda la aplicación
+        self.client = clients.llm
         # Modelo debe estar en formato "provider/model" para OpenRouter
         # Ejemplo: "openai/gpt-3.5-turbo", "anthropic/claude-3-haiku", etc.
         self.model = settings.OPENAI_MODEL
-        self.vector_service = VectorService()
+        self.vector_service = AsyncVectorService(clients)
+        # Fragmentos sin solapes ni duplicados, dentro del presupuesto de tokens
+        self.context_packer = ContextPacker()
+        # Historial acotado por tokens con resumen de los turnos anteriores
+        self.memory = ConversationMemory(db, clients.llm)
         # Mínimo score de similitud para considerar un resultado relevante (0-1)
         # Bajamos el threshold para ser más permisivo y encontrar más contexto relevante
         self.similarity_threshold = 0.3
+        self.answer_cache = get_answer_cache()
 
     async def create_chat_session(self, user_id: int) -> ChatSession:
         """
@@ -40,12 +62,13 @@ class AIService:
 
         try:
             self.db.add(db_session)
-            self.db.commit()
-            self.db.refresh(db_session)
+            await self.db.commit()
+            # Cargar la relación ahora: en sesiones asíncronas no hay carga perezosa
+            await self.db.refresh(db_session, ["messages"])
             logger.info(f"Created chat session {db_session.id} for user {user_id}")
             return ChatSession.model_validate(db_session)
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error creating chat session: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -56,11 +79,7 @@ class AIService:
         """
         Finaliza una sesión de chat existente.
         """
-        session = (
-            self.db.query(models.ChatSession)
-            .filter(models.ChatSession.id == session_id)
-            .first()
-        )
+        session = await self.db.get(models.ChatSession, session_id)
 
         if not session:
             raise HTTPException(
@@ -69,10 +88,10 @@ class AIService:
 
         session.ended_at = datetime.utcnow()
         try:
-            self.db.commit()
+            await self.db.commit()
             logger.info(f"Ended chat session {session_id}")
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error ending chat session {session_id}: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -84,11 +103,12 @@ class AIService:
         Obtiene el historial de mensajes de una sesión de chat.
         """
         messages = (
-            self.db.query(models.Message)
-            .filter(models.Message.session_id == session_id)
-            .order_by(models.Message.created_at.asc())
-            .all()
-        )
+            await self.db.scalars(
+                select(models.Message)
+                .where(models.Message.session_id == session_id)
+                .order_by(models.Message.created_at.asc())
+            )
+        ).all()
 
         return [MessageResponse.model_validate(msg) for msg in messages]
 
@@ -102,98 +122,223 @@ class AIService:
         2. Si encuentra contexto relevante, genera respuesta basada SOLO en ese contexto
         3. Si NO encuentra contexto relevante, indica que no tiene información
         """
-        # 1. BUSCAR EN QDRANT (RAG)
-        logger.info(f"Searching Qdrant for: {content[:50]}...")
+        with CHAT_STAGE_SECONDS.labels(stage="total").time():
+            turn = await self.prepare_turn(user_id, content, session_id)
+
+            # 5. LLAMAR A OPENAI CON HISTORIAL Y CONTEXTO
+            if turn["request"] is None:
+                bot_response = turn["fallback"]
+            else:
+                try:
+                    with CHAT_STAGE_SECONDS.labels(stage="llm").time():
+                        response = await self._create_completion(turn)
+                    bot_response = response.choices[0].message.content
+                    self._cache_answer(turn, bot_response)
+                except Exception as e:
+                    LLM_FAILURES.inc()
+                    logger.error(f"Error calling OpenRouter: {str(e)}")
+                    bot_response = turn["fallback"]
+
+            # 6. GUARDAR PREGUNTA Y RESPUESTA JUNTAS Y DEVOLVER RESPUESTA
+            return await self.save_turn(turn, bot_response)
+
+    async def process_message_stream(
+        self, user_id: int, turn: dict
+    ) -> AsyncIterator[str]:
+        """
+        Genera la respuesta de un turno preparado como eventos Server-Sent Events.
+
+        Emite un evento "token" por cada fragmento recibido de OpenRouter y, al
+        terminar, guarda el mensaje del bot y lo emite en un evento "done".
+        """
+        parts: List[str] = []
+
+        if turn["request"] is None:
+            parts.append(turn["fallback"])
+            yield sse_event("token", {"content": turn["fallback"]})
+        else:
+            started = time.perf_counter()
+            try:
+                stream = await self._create_completion(turn, stream=True)
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not parts:
+                            CHAT_STAGE_SECONDS.labels(stage="llm_first_token").observe(
+                                time.perf_counter() - started
+                            )
+                        parts.append(delta)
+                        yield sse_event("token", {"content": delta})
+                CHAT_STAGE_SECONDS.labels(stage="llm").observe(time.perf_counter() - started)
+                self._cache_answer(turn, "".join(parts))
+            except Exception as e:
+                LLM_FAILURES.inc()
+                logger.error(f"Error streaming from OpenRouter: {str(e)}")
+                # Solo usar el fallback si aún no se envió ningún token
+                if not parts:
+                    parts.append(turn["fallback"])
+                    yield sse_event("token", {"content": turn["fallback"]})
 
         try:
-            search_results = self.vector_service.search(content, limit=5)
-        except Exception as e:
-            logger.error(f"Error searching Qdrant: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al buscar en la base de conocimiento",
-            )
+            bot_message = await self.save_turn(turn, "".join(parts))
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+            return
 
-        # Filtrar solo resultados relevantes (score >= threshold)
-        relevant_chunks = [
-            r for r in search_results if r["score"] >= self.similarity_threshold
-        ]
+        yield sse_event("done", bot_message.model_dump(mode="json"))
+
+    async def prepare_turn(
+        self, user_id: int, content: str, session_id: Optional[int] = None
+    ) -> dict:
+        """
+        Prepara un turno de chat: recupera contexto y arma la petición al LLM.
+
+        No escribe en la base de datos: la pregunta se guarda junto con la
+        respuesta en save_turn, en una sola transacción.
+
+        Retorna un dict con:
+        - session_id: sesión del turno (None si se creará al guardarlo)
+        - user_id, question, asked_at: la pregunta a guardar
+        - request: argumentos para chat.completions.create, o None si la
+          respuesta no requiere LLM
+        - attempts: intentos permitidos para la llamada al LLM
+        - fallback: respuesta a usar si no hay petición o si el LLM falla
+        - cache_vector: embedding de la pregunta si la respuesta generada debe
+          guardarse en la caché de respuestas, o None
+        - collection: colección consultada
+        - fold_history: si hay que actualizar el resumen de la sesión tras responder
+        """
+        asked_at = datetime.utcnow()
 
-        # 1.5 CREAR SESIÓN SI NO EXISTE
-        if not session_id:
+        # 1. OBTENER HISTORIAL DE CONVERSACIÓN (si hay sesión)
+        # Turnos recientes dentro del presupuesto de tokens + resumen de los anteriores
+        conversation_history = []
+        conversation_summary = None
+        fold_history = False
+        if session_id:
             try:
-                new_session = models.ChatSession(
-                    user_id=user_id, started_at=datetime.utcnow()
+                with CHAT_STAGE_SECONDS.labels(stage="history").time():
+                    (
+                        conversation_summary,
+                        conversation_history,
+                        fold_history,
+                    ) = await self.memory.build(session_id)
+                logger.info(
+                    f"Retrieved {len(conversation_history)} messages from session {session_id}"
+                    f"{' plus summary' if conversation_summary else ''}"
                 )
-                self.db.add(new_session)
-                self.db.commit()
-                self.db.refresh(new_session)
-                session_id = new_session.id
-                logger.info(f"Created new session {session_id} for user {user_id}")
             except Exception as e:
-                self.db.rollback()
-                logger.error(f"Error creating session: {str(e)}")
-
-        # Guardar la pregunta del usuario en la base de datos
-        user_message = models.Message(
-            content=content,
-            is_bot=False,
-            created_at=datetime.utcnow(),
+                logger.warning(f"Could not retrieve conversation history: {e}")
+
+        turn = await self._plan_turn(
+            content, session_id, conversation_history, conversation_summary
+        )
+        turn.update(
             user_id=user_id,
-            session_id=session_id,
+            question=content,
+            asked_at=asked_at,
+            fold_history=fold_history,
         )
+        return turn
+
+    async def _plan_turn(
+        self,
+        content: str,
+        session_id: Optional[int],
+        conversation_history: List[dict],
+        conversation_summary: Optional[str],
+    ) -> dict:
+        """
+        Busca contexto y arma la petición al LLM del turno.
+        """
+        # 2. BUSCAR EN CACHÉ DE RESPUESTAS Y EN QDRANT (RAG)
+        logger.info(f"Searching Qdrant for: {content[:50]}...")
 
         try:
-            self.db.add(user_message)
-            self.db.commit()
-            self.db.refresh(user_message)
+            with CHAT_STAGE_SECONDS.labels(stage="embed_query").time():
+                query_vector = await self.vector_service.get_embedding(content)
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error saving user message: {str(e)}")
+            logger.error(f"Error embedding query: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al guardar el mensaje",
+                detail="Error al buscar en la base de conocimiento",
             )
 
-        # 2. OBTENER HISTORIAL DE CONVERSACIÓN (si hay sesión)
-        conversation_history = []
-        if session_id:
+        # Solo las preguntas sin historial son independientes de la sesión,
+        # así que solo esas se sirven desde la caché o se guardan en ella
+        collection = self.vector_service.collection_name
+        cache_vector = (
+            query_vector
+            if self.answer_cache and not conversation_history and not conversation_summary
+            else None
+        )
+        cached_answer = None
+        generation = 0
+        if cache_vector is not None:
             try:
-                # Excluir el mensaje actual que acabamos de guardar
-                previous_messages = (
-                    self.db.query(models.Message)
-                    .filter(
-                        models.Message.session_id == session_id,
-                        models.Message.id != user_message.id,
-                    )
-                    .order_by(models.Message.created_at.asc())
-                    .limit(10)  # Últimos 10 mensajes para contexto
-                    .all()
+                # Generación de la colección: cambia con cada ingesta o borrado,
+                # en cualquier proceso
+                generation = (
+                    await self.db.scalar(DocumentCatalog.generation_query(collection))
+                    or 0
                 )
-                for msg in previous_messages:
-                    role = "assistant" if msg.is_bot else "user"
-                    conversation_history.append({"role": role, "content": msg.content})
-                logger.info(
-                    f"Retrieved {len(conversation_history)} messages from session {session_id}"
+                cached_answer = self.answer_cache.lookup(
+                    collection, cache_vector, generation
                 )
             except Exception as e:
-                logger.warning(f"Could not retrieve conversation history: {e}")
+                logger.warning(f"Could not check the answer cache: {e}")
+                cache_vector = None
+
+        relevant_chunks = []
+        if cached_answer is not None:
+            logger.info(f"Answer cache hit for query: {content[:50]}...")
+        else:
+            try:
+                with CHAT_STAGE_SECONDS.labels(stage="search").time():
+                    search_results = await self.vector_service.search_vector(
+                        query_vector, limit=5, query_text=content
+                    )
+            except Exception as e:
+                logger.error(f"Error searching Qdrant: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Error al buscar en la base de conocimiento",
+                )
+
+            # Filtrar solo resultados relevantes (score >= threshold)
+            relevant_chunks = [
+                r for r in search_results if r["score"] >= self.similarity_threshold
+            ]
+
+        if cached_answer is not None:
+            return {
+                "session_id": session_id,
+                "request": None,
+                "attempts": 0,
+                "fallback": cached_answer,
+                "cache_vector": None,
+                "collection": collection,
+            }
 
         # 3. SI NO HAY CONTEXTO RELEVANTE, INTENTAR RECUPERAR CON BÚSQUEDA AMPLIA
         if not relevant_chunks:
             logger.info(f"No relevant context found for query: {content[:50]}...")
 
             # Intentar búsqueda más amplia con palabras clave individuales
-            search_terms = content.lower().split()
+            # Primeros 3 términos, solo los significativos, en una sola búsqueda por lotes
+            search_terms = [t for t in content.lower().split()[:3] if len(t) > 3]
             all_chunks = []
 
-            for term in search_terms[:3]:  # Buscar con primeros 3 términos
-                if len(term) > 3:  # Solo términos significativos
-                    try:
-                        results = self.vector_service.search(term, limit=3)
-                        all_chunks.extend(results)
-                    except:
-                        pass
+            if search_terms:
+                FALLBACK_SEARCHES.inc()
+                try:
+                    with CHAT_STAGE_SECONDS.labels(stage="fallback_search").time():
+                        results = await self.vector_service.search_batch(
+                            search_terms, limit=3
+                        )
+                    all_chunks = [chunk for result in results for chunk in result]
+                except Exception as e:
+                    logger.warning(f"Broad search failed: {str(e)}")
 
             # Si encontramos algo relacionado, usarlo
             if all_chunks:
@@ -212,125 +357,29 @@ class AIService:
 
             # Si aún no hay nada, hacer respuesta perspicaz
             if not relevant_chunks:
-                # Obtener temas disponibles en los documentos
-                try:
-                    all_docs = self.vector_service.get_all_documents(limit=50)
-                    available_topics = list(
-                        set(
-                            [
-                                doc.get("metadata", {}).get("source", "")
-                                for doc in all_docs
-                                if doc.get("metadata", {}).get("source")
-                            ]
-                        )
-                    )[:5]
-                except:
-                    available_topics = []
-
-                # Respuesta perspicaz basada en el historial
-                if conversation_history:
-                    # Si es seguimiento de conversación anterior
-                    no_context_prompt = f"""Eres un asistente amigable. El usuario ha hecho una pregunta sobre la que NO tienes información específica en los documentos.
-                    
-HISTORIAL RECIENTE:
-{chr(10).join([f"{'Usuario' if msg['role'] == 'user' else 'Asistente'}: {msg['content']}" for msg in conversation_history[-4:]])}
-
-PREGUNTA ACTUAL: {content}
-
-INSTRUCCIONES:
-1. NO digas directamente "no tengo información"
-2. Intenta entender qué busca el usuario basándote en el contexto de la conversación
-3. Sugiere temas relacionados que podrías tener información (si los hay)
-4. Mantén un tono conversacional y útil
-5. NO termines cada respuesta con "¿Te gustaría saber más?" - varía tus despedidas
-6. Puedes terminar con una pregunta, una afirmación amigable, o simplemente cerrar la respuesta de forma natural
-
-Respuesta:"""
-
-                    try:
-                        response = self.client.chat.completions.create(
-                            model=self.model,
-                            messages=[
-                                {
-                                    "role": "system",
-                                    "content": "Eres un asistente perspicaz y conversacional.",
-                                },
-                                {"role": "user", "content": no_context_prompt},
-                            ],
-                            temperature=0.8,
-                            max_tokens=200,
-                            timeout=30,
-                        )
-                        no_context_response = response.choices[0].message.content
-                    except:
-                        # Fallback si falla el LLM
-                        if available_topics:
-                            topics_str = ", ".join(
-                                [t.replace(".pdf", "") for t in available_topics if t]
-                            )
-                            no_context_response = (
-                                f"Buena pregunta. En mis documentos tengo información sobre {topics_str}. "
-                                f"¿Sobre alguno de estos temas te gustaría que conversemos?"
-                            )
-                        else:
-                            no_context_response = (
-                                "Interesante pregunta. Cuéntame un poco más sobre lo que buscas, "
-                                "así puedo orientarte mejor con la información que tengo disponible."
-                            )
-                else:
-                    # Primera interacción sin contexto
-                    if available_topics:
-                        topics_str = ", ".join(
-                            [t.replace(".pdf", "") for t in available_topics if t]
-                        )
-                        no_context_response = (
-                            f"¡Hola! Veo que tienes documentos sobre {topics_str}. "
-                            f"Estoy listo para conversar sobre cualquiera de estos temas."
-                        )
-                    else:
-                        no_context_response = (
-                            "¡Hola! Estoy listo para ayudarte. Cuando subas documentos, podré conversar contigo "
-                            "sobre su contenido de forma natural."
-                        )
-
-                bot_message = models.Message(
-                    content=no_context_response,
-                    is_bot=True,
-                    created_at=datetime.utcnow(),
-                    user_id=user_id,
-                    session_id=session_id,
+                return await self._no_context_turn(
+                    content, session_id, conversation_history, conversation_summary
                 )
 
-                try:
-                    self.db.add(bot_message)
-                    self.db.commit()
-                    self.db.refresh(bot_message)
-                    return MessageResponse.model_validate(bot_message)
-                except Exception as e:
-                    self.db.rollback()
-                    logger.error(f"Error saving bot response: {str(e)}")
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail="Error al guardar la respuesta",
-                    )
-
         # 4. CONSTRUIR CONTEXTO Y PROMPT CONVERSACIONAL
+        with CHAT_STAGE_SECONDS.labels(stage="pack_context").time():
+            passages, pack_stats = self.context_packer.pack(relevant_chunks)
+        # Cuánto contexto recorta el empaquetado, para ajustar CONTEXT_TOKEN_BUDGET
+        CONTEXT_TOKENS.labels(stage="retrieved").observe(pack_stats["tokens_in"])
+        CONTEXT_TOKENS.labels(stage="packed").observe(pack_stats["tokens_out"])
+        CONTEXT_CHUNKS_DROPPED.labels(reason="duplicate").inc(
+            pack_stats["duplicates_dropped"]
+        )
+        CONTEXT_CHUNKS_DROPPED.labels(reason="over_budget").inc(
+            pack_stats["over_budget_dropped"]
+        )
         context_text = "\n\n".join(
             [
-                f"[Fragmento {i + 1}]:\n{chunk['text']}"
-                for i, chunk in enumerate(relevant_chunks)
+                f"[Fragmento {i + 1}]:\n{passage['text']}"
+                for i, passage in enumerate(passages)
             ]
         )
 
-        sources = list(
-            set(
-                [
-                    chunk["metadata"].get("source", "Desconocido")
-                    for chunk in relevant_chunks
-                ]
-            )
-        )
-
         # Prompt conversacional pero manteniendo RAG
         system_prompt = f"""Eres un asistente amigable, empático y conversacional. Mantén conversaciones naturales como lo haría una persona.
 
@@ -369,55 +418,192 @@ Evita decir "según el fragmento 1" o "en el documento se dice". Integra la info
             f"Generating conversational RAG response using {len(relevant_chunks)} chunks"
         )
 
+        if conversation_summary:
+            system_prompt += (
+                f"\n\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{conversation_summary}"
+            )
+
         # Construir mensajes incluyendo historial
         messages = [{"role": "system", "content": system_prompt}]
         messages.extend(conversation_history)
         messages.append({"role": "user", "content": content})
 
-        # 5. LLAMAR A OPENAI CON HISTORIAL Y CONTEXTO
+        return {
+            "session_id": session_id,
+            "request": {
+                "messages": messages,
+                "temperature": 0.7,  # Más alto para respuestas más naturales/conversacionales
+                "max_tokens": 1500,
+                "timeout": 60,
+            },
+            "attempts": 3,
+            "fallback": "Ups, parece que tuve un pequeño problema al procesar tu mensaje. ¿Podrías intentarlo de nuevo?",
+            "cache_vector": cache_vector,
+            "collection": collection,
+            "generation": generation,
+        }
+
+    async def _no_context_turn(
+        self,
+        content: str,
+        session_id: Optional[int],
+        conversation_history: List[dict],
+        conversation_summary: Optional[str] = None,
+    ) -> dict:
+        """
+        Arma el turno cuando no hay contexto relevante en los documentos.
+        """
+        NO_CONTEXT_RESPONSES.inc()
+        # Obtener temas disponibles en el catálogo de documentos
+        try:
+            available_topics = (
+                await self.db.scalars(
+                    DocumentCatalog.recent_sources_query(
+                        self.vector_service.collection_name, limit=5
+                    )
+                )
+            ).all()
+        except Exception as e:
+            logger.warning(f"Could not load document topics: {str(e)}")
+            available_topics = []
+
+        topics_str = ", ".join([t.replace(".pdf", "") for t in available_topics if t])
+
+        # Respuesta perspicaz basada en el historial
+        if conversation_history or conversation_summary:
+            # Si es seguimiento de conversación anterior
+            summary_section = (
+                f"RESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{conversation_summary}\n\n"
+                if conversation_summary
+                else ""
+            )
+            no_context_prompt = f"""Eres un asistente amigable. El usuario ha hecho una pregunta sobre la que NO tienes información específica en los documentos.
+                    
+{summary_section}HISTORIAL RECIENTE:
+{chr(10).join([f"{'Usuario' if msg['role'] == 'user' else 'Asistente'}: {msg['content']}" for msg in conversation_history[-4:]])}
+
+PREGUNTA ACTUAL: {content}
+
+INSTRUCCIONES:
+1. NO digas directamente "no tengo información"
+2. Intenta entender qué busca el usuario basándote en el contexto de la conversación
+3. Sugiere temas relacionados que podrías tener información (si los hay)
+4. Mantén un tono conversacional y útil
+5. NO termines cada respuesta con "¿Te gustaría saber más?" - varía tus despedidas
+6. Puedes terminar con una pregunta, una afirmación amigable, o simplemente cerrar la respuesta de forma natural
+
+Respuesta:"""
+
+            # Fallback si falla el LLM
+            if available_topics:
+                fallback = (
+                    f"Buena pregunta. En mis documentos tengo información sobre {topics_str}. "
+                    f"¿Sobre alguno de estos temas te gustaría que conversemos?"
+                )
+            else:
+                fallback = (
+                    "Interesante pregunta. Cuéntame un poco más sobre lo que buscas, "
+                    "así puedo orientarte mejor con la información que tengo disponible."
+                )
+
+            return {
+                "session_id": session_id,
+                "request": {
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": "Eres un asistente perspicaz y conversacional.",
+                        },
+                        {"role": "user", "content": no_context_prompt},
+                    ],
+                    "temperature": 0.8,
+                    "max_tokens": 200,
+                    "timeout": 30,
+                },
+                "attempts": 1,
+                "fallback": fallback,
+                "cache_vector": None,
+            }
+
+        # Primera interacción sin contexto
+        if available_topics:
+            fallback = (
+                f"¡Hola! Veo que tienes documentos sobre {topics_str}. "
+                f"Estoy listo para conversar sobre cualquiera de estos temas."
+            )
+        else:
+            fallback = (
+                "¡Hola! Estoy listo para ayudarte. Cuando subas documentos, podré conversar contigo "
+                "sobre su contenido de forma natural."
+            )
+
+        return {
+            "session_id": session_id,
+            "request": None,
+            "attempts": 0,
+            "fallback": fallback,
+            "cache_vector": None,
+        }
+
+    def _cache_answer(self, turn: dict, answer: str) -> None:
+        """
+        Guarda una respuesta generada en la caché de respuestas si el turno lo permite.
+        """
+        if self.answer_cache and turn["cache_vector"] is not None and answer:
+            self.answer_cache.store(
+                turn["collection"], turn["cache_vector"], answer, turn["generation"]
+            )
+
+    async def _create_completion(self, turn: dict, stream: bool = False):
+        """
+        Llama al LLM con la petición del turno, reintentando según turn["attempts"].
+        """
+
         @retry(
-            stop=stop_after_attempt(3),
+            stop=stop_after_attempt(turn["attempts"]),
             wait=wait_exponential(multiplier=1, min=2, max=10),
+            before_sleep=count_retry("llm"),
             reraise=True,
         )
-        def generate_response():
-            return self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,  # Más alto para respuestas más naturales/conversacionales
-                max_tokens=1500,
-                timeout=60,
+        async def generate_response():
+            return await self.client.chat.completions.create(
+                model=self.model, stream=stream, **turn["request"]
             )
 
-        try:
-            response = generate_response()
-            bot_response = response.choices[0].message.content
+        return await generate_response()
 
-        except Exception as e:
-            logger.error(f"Error calling OpenRouter: {str(e)}")
-            bot_response = "Ups, parece que tuve un pequeño problema al procesar tu mensaje. ¿Podrías intentarlo de nuevo?"
-
-        # 5. GUARDAR Y DEVOLVER RESPUESTA
-        bot_message = models.Message(
-            content=bot_response,
-            is_bot=True,
-            created_at=datetime.utcnow(),
-            user_id=user_id,
-            session_id=session_id,
+    async def save_turn(self, turn: dict, content: str) -> MessageResponse:
+        """
+        Guarda la pregunta y la respuesta del turno (y la sesión, si es nueva)
+        en una sola transacción y devuelve el mensaje del bot.
+        """
+        chat_turn = ChatTurn(
+            user_id=turn["user_id"],
+            session_id=turn["session_id"],
+            question=turn["question"],
+            asked_at=turn["asked_at"],
+            answer=content,
         )
 
         try:
-            self.db.add(bot_message)
-            self.db.commit()
-            self.db.refresh(bot_message)
+            with CHAT_STAGE_SECONDS.labels(stage="save").time():
+                if turn_writer.running:
+                    # Agrupa el commit con los turnos concurrentes
+                    bot_message = await turn_writer.write(chat_turn)
+                else:
+                    bot_message = (await write_turns(self.db, [chat_turn]))[0]
+
+            logger.info(f"Generated RAG response for user {chat_turn.user_id}")
 
-            logger.info(f"Generated RAG response for user {user_id}")
+            # El resumen se actualiza en segundo plano, fuera de la latencia del turno
+            if turn.get("fold_history"):
+                self.memory.fold_later(turn["session_id"])
 
             return MessageResponse.model_validate(bot_message)
 
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error saving bot message: {str(e)}")
+            await self.db.rollback()
+            logger.error(f"Error saving chat turn: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error al guardar la respuesta",
@@ -427,15 +613,24 @@ Evita decir "según el fragmento 1" o "en el documento se dice". Integra la info
         """
         Obtiene la sesión activa del usuario si existe.
         """
-        session = (
-            self.db.query(models.ChatSession)
-            .filter(
+        session = await self.db.scalar(
+            select(models.ChatSession)
+            .where(
                 models.ChatSession.user_id == user_id,
                 models.ChatSession.ended_at.is_(None),
             )
-            .first()
+            .options(selectinload(models.ChatSession.messages))
+            .limit(1)
         )
 
         if session:
             return ChatSession.model_validate(session)
         return None
+
+
+def get_ai_service(
+    db: AsyncSession = Depends(get_async_db),
+    clients: SharedClients = Depends(get_clients),
+) -> AIService:
+    """FastAPI dependency returning an AIService over the shared clients."""
+    return AIService(db, clients)
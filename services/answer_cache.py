@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.logging_config import logger
+from core.metrics import CACHE_LOOKUPS
+
+
+class _CollectionEntries:
+    """Cached answers of one collection plus a lazily rebuilt vector matrix."""
+
+    def __init__(self, generation: int = 0):
+        # Content generation of the collection the answers were built from
+        self.generation = generation
+        # key -> (unit vector, answer, stored_at); ordered oldest -> most recently used
+        self.entries: "OrderedDict[int, Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[int] = []
+
+    def changed(self):
+        self._matrix = None
+
+    def matrix(self) -> Tuple[np.ndarray, List[int]]:
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[k][0] for k in self._keys])
+        return self._matrix, self._keys
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of LLM answers keyed on query embedding similarity.
+
+    An answer is served when a new query is within max_distance (cosine) of a
+    cached one in the same collection. Entries expire after ttl seconds, the
+    least recently used are evicted past max_entries per collection, and a
+    collection's entries are dropped whenever its documents change.
+
+    Callers pass the collection's content generation (kept in the database,
+    see DocumentCatalog.bump_generation), so changes made by other processes
+    also drop the entries here.
+    """
+
+    def __init__(self, max_distance: float, ttl: int, max_entries: int):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._collections: Dict[str, _CollectionEntries] = {}
+        self._lock = threading.Lock()
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def lookup(
+        self, collection: str, vector: List[float], generation: int = 0
+    ) -> Optional[str]:
+        """Returns the cached answer closest to vector, if close enough."""
+        with self._lock:
+            bucket = self._collections.get(collection)
+            if bucket is not None and bucket.generation < generation:
+                # The documents changed since these answers were cached
+                del self._collections[collection]
+                bucket = None
+            if bucket is not None:
+                self._expire(bucket)
+            if not bucket or not bucket.entries:
+                self.misses += 1
+                CACHE_LOOKUPS.labels(cache="answer", result="miss").inc()
+                return None
+
+            matrix, keys = bucket.matrix()
+            similarities = matrix @ self._unit(vector)
+            best = int(np.argmax(similarities))
+
+            if 1.0 - float(similarities[best]) > self.max_distance:
+                self.misses += 1
+                CACHE_LOOKUPS.labels(cache="answer", result="miss").inc()
+                return None
+
+            key = keys[best]
+            bucket.entries.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.labels(cache="answer", result="hit").inc()
+            return bucket.entries[key][1]
+
+    def store(
+        self, collection: str, vector: List[float], answer: str, generation: int = 0
+    ) -> None:
+        """Caches answer for a query vector, built from the given generation."""
+        with self._lock:
+            bucket = self._collections.get(collection)
+            if bucket is not None and bucket.generation > generation:
+                # Answered from documents that have changed since
+                return
+            if bucket is None or bucket.generation < generation:
+                bucket = self._collections[collection] = _CollectionEntries(generation)
+            self._next_key += 1
+            bucket.entries[self._next_key] = (self._unit(vector), answer, time.time())
+            while len(bucket.entries) > self.max_entries:
+                bucket.entries.popitem(last=False)
+            bucket.changed()
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        """Drops cached answers for a collection, or for all collections."""
+        with self._lock:
+            if collection is None:
+                self._collections.clear()
+            else:
+                self._collections.pop(collection, None)
+        logger.info(f"Answer cache invalidated for: {collection or 'all collections'}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters and entry count."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": sum(len(b.entries) for b in self._collections.values()),
+        }
+
+    def _expire(self, bucket: _CollectionEntries) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [k for k, (_, _, stored_at) in bucket.entries.items() if stored_at < cutoff]
+        for key in expired:
+            del bucket.entries[key]
+        if expired:
+            bucket.changed()
+
+
+_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Returns the process-wide answer cache, or None if disabled."""
+    global _cache
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = SemanticAnswerCache(
+            max_distance=settings.ANSWER_CACHE_MAX_DISTANCE,
+            ttl=settings.ANSWER_CACHE_TTL,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        )
+    return _cache
@@ -1,6 +1,9 @@
+import asyncio
 from datetime import datetime
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from core.security import (
     get_password_hash,
@@ -9,24 +12,23 @@ from core.security import (
     create_refresh_token,
 )
 from core.logging_config import logger
+from core.principal_cache import first_revocation, principal_cache, revoke_statement
 from db import models
 from models.schemas import UserCreate, UserResponse, UserLogin, Token
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def register_user(self, user_data: UserCreate) -> UserResponse:
+    async def register_user(self, user_data: UserCreate) -> UserResponse:
         """
         Registra un nuevo usuario en el sistema.
         Verifica que el email y username no existan previamente.
         """
         # Verificar si el email ya existe
-        if (
-            self.db.query(models.User)
-            .filter(models.User.email == user_data.email)
-            .first()
+        if await self.db.scalar(
+            select(models.User).where(models.User.email == user_data.email)
         ):
             logger.warning(
                 f"Registration attempt with existing email: {user_data.email}"
@@ -37,10 +39,8 @@ class AuthService:
             )
 
         # Verificar si el username ya existe
-        if (
-            self.db.query(models.User)
-            .filter(models.User.username == user_data.username)
-            .first()
+        if await self.db.scalar(
+            select(models.User).where(models.User.username == user_data.username)
         ):
             logger.warning(
                 f"Registration attempt with existing username: {user_data.username}"
@@ -51,35 +51,35 @@ class AuthService:
             )
 
         # Crear el nuevo usuario
+        # bcrypt tarda cientos de ms de CPU: fuera del event loop
+        hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
         db_user = models.User(
             email=user_data.email,
             username=user_data.username,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=hashed_password,
             is_active=True,
         )
 
         try:
             self.db.add(db_user)
-            self.db.commit()
-            self.db.refresh(db_user)
+            await self.db.commit()
+            await self.db.refresh(db_user)
             logger.info(f"User registered successfully: {user_data.email}")
             return UserResponse.model_validate(db_user)
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error creating user {user_data.email}: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error al crear el usuario",
             )
 
-    def authenticate_user(self, user_data: UserLogin) -> Token:
+    async def authenticate_user(self, user_data: UserLogin) -> Token:
         """
         Autentica un usuario y retorna los tokens de acceso y actualización.
         """
-        user = (
-            self.db.query(models.User)
-            .filter(models.User.email == user_data.email)
-            .first()
+        user = await self.db.scalar(
+            select(models.User).where(models.User.email == user_data.email)
         )
 
         if not user:
@@ -91,7 +91,10 @@ class AuthService:
                 detail="Credenciales incorrectas",
             )
 
-        if not verify_password(user_data.password, str(user.hashed_password)):
+        # bcrypt tarda cientos de ms de CPU: fuera del event loop
+        if not await asyncio.to_thread(
+            verify_password, user_data.password, str(user.hashed_password)
+        ):
             logger.warning(f"Failed authentication attempt for user: {user_data.email}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -106,41 +109,59 @@ class AuthService:
 
         return Token(access_token=access_token, refresh_token=refresh_token)
 
-    def get_user_by_id(self, user_id: int) -> Optional[UserResponse]:
+    async def get_user_by_id(self, user_id: int) -> Optional[UserResponse]:
         """
         Obtiene un usuario por su ID.
         """
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = await self.db.scalar(select(models.User).where(models.User.id == user_id))
         if not user:
             return None
         return UserResponse.model_validate(user)
 
-    def update_last_login(self, user_id: int) -> None:
+    async def update_last_login(self, user_id: int) -> None:
         """
         Actualiza la fecha del último login del usuario.
         """
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = await self.db.scalar(select(models.User).where(models.User.id == user_id))
         if user:
             user.updated_at = datetime.utcnow()
-            self.db.commit()
+            await self.db.commit()
             logger.info(f"Updated last login for user_id: {user_id}")
 
-    def deactivate_user(self, user_id: int) -> None:
+    async def deactivate_user(self, user_id: int) -> None:
         """
         Desactiva un usuario en el sistema.
         """
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = await self.db.scalar(select(models.User).where(models.User.id == user_id))
         if user:
             user.is_active = False
             user.updated_at = datetime.utcnow()
-            self.db.commit()
+            await self.db.commit()
+            # Revocar el acceso de inmediato en lugar de esperar a que expire
+            # el token: la nueva generación invalida las cachés de todos los procesos
+            await self._bump_revocation(user_id)
+            principal_cache.invalidate(user_id)
             logger.info(f"User deactivated: user_id {user_id}")
 
-    def refresh_access_token(self, user_id: int) -> Token:
+    async def _bump_revocation(self, user_id: int) -> None:
+        """
+        Incrementa la generación de revocación del usuario.
+        """
+        try:
+            if (await self.db.execute(revoke_statement(user_id))).rowcount == 0:
+                self.db.add(first_revocation(user_id))
+            await self.db.commit()
+        except IntegrityError:
+            # Otro proceso creó la fila antes
+            await self.db.rollback()
+            await self.db.execute(revoke_statement(user_id))
+            await self.db.commit()
+
+    async def refresh_access_token(self, user_id: int) -> Token:
         """
         Genera un nuevo token de acceso y de actualización.
         """
-        user = self.db.query(models.User).filter(models.User.id == user_id).first()
+        user = await self.db.scalar(select(models.User).where(models.User.id == user_id))
 
         if not user:
             logger.warning(f"Token refresh attempt for non-existent user: {user_id}")
@@ -0,0 +1,55 @@
+import httpx
+from fastapi import Request
+from openai import AsyncOpenAI
+from qdrant_client import AsyncQdrantClient
+
+from core.config import settings
+from services.embedding_providers import create_embedding_provider
+
+
+class SharedClients:
+    """
+    Network clients created once per application and shared by every request.
+
+    Embeddings and chat completions both go to OpenRouter, so they share one
+    httpx connection pool and reuse its TLS connections. The embedding
+    provider (EMBEDDING_PROVIDER) is built here too, so a local model is
+    loaded once.
+    """
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(
+                max_connections=settings.OPENROUTER_POOL_SIZE,
+                max_keepalive_connections=settings.OPENROUTER_POOL_SIZE,
+            ),
+        )
+        # Usar OpenRouter en lugar de OpenAI directamente
+        self.llm = AsyncOpenAI(
+            base_url="https://openrouter.ai/api/v1",
+            api_key=settings.OPENROUTER_API_KEY,
+            default_headers={
+                "HTTP-Referer": "http://localhost:8000",
+                "X-Title": "Document ChatBot",
+            },
+            http_client=self.http,
+        )
+        self.embeddings = create_embedding_provider(http=self.http)
+        self.qdrant = AsyncQdrantClient(
+            url=settings.QDRANT_URL,
+            limits=httpx.Limits(
+                max_connections=settings.QDRANT_POOL_SIZE,
+                max_keepalive_connections=settings.QDRANT_POOL_SIZE,
+            ),
+        )
+
+    async def close(self):
+        """Closes every connection pool."""
+        await self.http.aclose()
+        await self.qdrant.close()
+
+
+def get_clients(request: Request) -> SharedClients:
+    """FastAPI dependency returning the clients created in the app lifespan."""
+    return request.app.state.clients
@@ -0,0 +1,129 @@
+import re
+from typing import List, Optional, Set, Tuple
+
+from core.config import settings
+from core.logging_config import logger
+from services.tokenizer import count_tokens
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+class ContextPacker:
+    """
+    Turns retrieved chunks into the smallest prompt context that keeps them.
+
+    Near-duplicate chunks are dropped, the best-scoring chunks are kept up to
+    a token budget, and adjacent chunks of the same source are merged in
+    document order without repeating the text they share.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        duplicate_similarity: Optional[float] = None,
+    ):
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.duplicate_similarity = (
+            duplicate_similarity
+            if duplicate_similarity is not None
+            else settings.CONTEXT_DUPLICATE_SIMILARITY
+        )
+
+    @staticmethod
+    def _words(text: str) -> Set[str]:
+        return set(re.findall(r"\w+", text.lower()))
+
+    def _is_duplicate(self, words: Set[str], kept: List[Set[str]]) -> bool:
+        for other in kept:
+            union = len(words | other)
+            if union and len(words & other) / union >= self.duplicate_similarity:
+                return True
+        return False
+
+    @staticmethod
+    def _overlap(left: str, right: str) -> int:
+        """Length of the longest suffix of left that is a prefix of right."""
+        for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    @staticmethod
+    def _position(chunk: dict) -> Tuple[str, int]:
+        metadata = chunk.get("metadata", {})
+        return metadata.get("source", ""), metadata.get("chunk_index", -1)
+
+    def pack(self, chunks: List[dict]) -> Tuple[List[dict], dict]:
+        """
+        Packs search results ({"text", "metadata", "score"}).
+
+        Returns the passages, in document order, and stats with the tokens
+        before and after packing.
+        """
+        tokens_in = sum(count_tokens(c["text"]) for c in chunks)
+
+        # 1. Best chunks first, skipping near-duplicates and what doesn't fit
+        selected = []
+        kept_words: List[Set[str]] = []
+        used = 0
+        duplicates = 0
+        over_budget = 0
+        for chunk in sorted(chunks, key=lambda c: c.get("score", 0), reverse=True):
+            words = self._words(chunk["text"])
+            if self._is_duplicate(words, kept_words):
+                duplicates += 1
+                continue
+            tokens = count_tokens(chunk["text"])
+            if used + tokens > self.token_budget:
+                over_budget += 1
+                continue
+            selected.append(chunk)
+            kept_words.append(words)
+            used += tokens
+
+        # 2. Document order, merging consecutive chunks of the same source
+        passages: List[dict] = []
+        for chunk in sorted(selected, key=self._position):
+            source, index = self._position(chunk)
+            previous = passages[-1] if passages else None
+            if (
+                previous is not None
+                and index >= 0
+                and previous["source"] == source
+                and previous["last_index"] == index - 1
+            ):
+                overlap = self._overlap(previous["text"], chunk["text"])
+                previous["text"] = (
+                    previous["text"] + chunk["text"][overlap:]
+                    if overlap
+                    else f"{previous['text']} {chunk['text']}"
+                )
+                previous["last_index"] = index
+                previous["score"] = max(previous["score"], chunk.get("score", 0))
+                continue
+            passages.append(
+                {
+                    "text": chunk["text"],
+                    "source": source,
+                    "last_index": index,
+                    "metadata": chunk.get("metadata", {}),
+                    "score": chunk.get("score", 0),
+                }
+            )
+
+        tokens_out = sum(count_tokens(p["text"]) for p in passages)
+        stats = {
+            "chunks_in": len(chunks),
+            "passages": len(passages),
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "tokens_saved": tokens_in - tokens_out,
+        }
+        logger.info(
+            f"Packed {len(chunks)} chunks into {len(passages)} passages: "
+            f"{tokens_out} tokens ({stats['tokens_saved']} saved)"
+        )
+        return passages, stats
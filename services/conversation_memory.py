@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from openai import AsyncOpenAI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.logging_config import logger
+from db import models
+from db.database import AsyncSessionLocal
+from services.tokenizer import count_tokens, split_by_tokens
+
+# Per-message framing overhead of the chat format, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ConversationMemory:
+    """
+    Token-budgeted conversation history.
+
+    The most recent turns are sent verbatim up to HISTORY_TOKEN_BUDGET.
+    When the unsummarized turns outgrow the budget, the older ones are folded
+    into a rolling per-session summary, keeping only half the budget
+    verbatim so the next few turns don't need another summary call.
+
+    Folding takes an LLM call, so it never runs inside a turn: build() uses
+    the stored summary and reports that a fold is due, and fold_later()
+    runs it in the background once the turn's answer has been sent.
+    """
+
+    # Sessions with a fold in flight in this process, and the fold tasks
+    _folding: Set[int] = set()
+    _tasks: Set[asyncio.Task] = set()
+
+    def __init__(self, db: AsyncSession, llm: AsyncOpenAI):
+        self.db = db
+        self.llm = llm
+        self.token_budget = settings.HISTORY_TOKEN_BUDGET
+
+    @staticmethod
+    def _message_tokens(message: models.Message) -> int:
+        return count_tokens(message.content or "") + MESSAGE_OVERHEAD_TOKENS
+
+    @staticmethod
+    def _as_chat(messages: List[models.Message]) -> List[dict]:
+        return [
+            {"role": "assistant" if m.is_bot else "user", "content": m.content}
+            for m in messages
+        ]
+
+    def _split_recent(
+        self, messages: List[models.Message], budget: int
+    ) -> Tuple[List[models.Message], List[models.Message]]:
+        """Splits oldest-first messages into (older, most recent within budget)."""
+        used = 0
+        cut = len(messages)
+        while cut > 0:
+            tokens = self._message_tokens(messages[cut - 1])
+            if used + tokens > budget:
+                break
+            used += tokens
+            cut -= 1
+        return messages[:cut], messages[cut:]
+
+    async def _load(
+        self, session_id: int
+    ) -> Tuple[Optional[models.SessionSummary], List[models.Message]]:
+        """The session's summary record and its unsummarized messages, oldest first."""
+        record = await self.db.get(models.SessionSummary, session_id)
+        last_summarized = record.last_message_id if record else 0
+
+        # Newest first so the cap keeps the recent end of very long sessions
+        messages = list(
+            await self.db.scalars(
+                select(models.Message)
+                .where(
+                    models.Message.session_id == session_id,
+                    models.Message.id > last_summarized,
+                )
+                .order_by(models.Message.created_at.desc(), models.Message.id.desc())
+                .limit(settings.HISTORY_MAX_MESSAGES)
+            )
+        )
+        messages.reverse()
+        return record, messages
+
+    async def build(self, session_id: int) -> Tuple[Optional[str], List[dict], bool]:
+        """
+        Returns (summary of earlier turns or None, recent turns as chat
+        messages, whether a fold is due).
+
+        Turns past the budget that are not yet in the summary are left out
+        of this turn; fold_later() adds them to the summary.
+        """
+        record, messages = await self._load(session_id)
+        summary = record.summary if record else None
+
+        total = sum(self._message_tokens(m) for m in messages)
+        if total <= self.token_budget:
+            return summary, self._as_chat(messages), False
+
+        _, recent = self._split_recent(messages, self.token_budget)
+        return summary, self._as_chat(recent), True
+
+    def fold_later(self, session_id: int) -> None:
+        """
+        Folds the session's older turns into its summary in a background
+        task with its own database session. Call it after the response.
+        """
+        if session_id in self._folding:
+            return
+        self._folding.add(session_id)
+        task = asyncio.create_task(self._fold_session(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fold_session(self, session_id: int) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                memory = ConversationMemory(db, self.llm)
+                record, messages = await memory._load(session_id)
+                if sum(self._message_tokens(m) for m in messages) <= self.token_budget:
+                    return  # Folded meanwhile
+                older, _ = memory._split_recent(messages, self.token_budget // 2)
+                summary = await memory._fold(record.summary if record else None, older)
+                await memory._save(session_id, record, summary, older[-1].id)
+        except Exception as e:
+            # Keep the previous summary; the older turns are retried next turn
+            logger.warning(f"Could not update summary of session {session_id}: {e}")
+        finally:
+            self._folding.discard(session_id)
+
+    async def _fold(self, summary: Optional[str], older: List[models.Message]) -> str:
+        """Asks the LLM to merge older turns into the running summary."""
+        transcript = "\n".join(
+            f"{'Asistente' if m.is_bot else 'Usuario'}: {m.content}" for m in older
+        )
+        # Very long backlogs (e.g. sessions older than this feature) keep their tail
+        pieces = split_by_tokens(transcript, self.token_budget * 4)
+        transcript = pieces[-1] if pieces else ""
+
+        prompt = f"""Actualiza el resumen de una conversación entre un usuario y un asistente.
+
+RESUMEN ACTUAL:
+{summary or "(vacío)"}
+
+MENSAJES NUEVOS:
+{transcript}
+
+Escribe un único resumen breve que combine ambos: temas tratados, datos que dio el usuario, preguntas pendientes y respuestas importantes. Solo el resumen, sin introducción."""
+
+        response = await self.llm.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=settings.HISTORY_SUMMARY_MAX_TOKENS,
+            timeout=30,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def _save(
+        self,
+        session_id: int,
+        record: Optional[models.SessionSummary],
+        summary: str,
+        last_message_id: int,
+    ) -> models.SessionSummary:
+        if record is None:
+            record = models.SessionSummary(session_id=session_id)
+            self.db.add(record)
+        record.summary = summary
+        record.last_message_id = last_message_id
+        record.updated_at = datetime.utcnow()
+        await self.db.commit()
+        logger.info(f"Updated summary of session {session_id}")
+        return record
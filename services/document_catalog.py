@@ -0,0 +1,288 @@
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Delete, Select, Update, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.logging_config import logger
+from db import models
+from db.database import AsyncSessionLocal, SessionLocal
+
+
+def file_fingerprint(path: str) -> Tuple[int, str]:
+    """Byte size and sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+class DocumentCatalog:
+    """
+    One row per indexed document, kept in step with Qdrant at ingest and
+    delete time so listings never have to scroll the vector store.
+
+    Statements are built by static methods so AsyncDocumentCatalog runs
+    the same queries on async sessions.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def record_statement(collection: str, source: str, values: dict) -> Update:
+        return (
+            update(models.Document)
+            .where(
+                models.Document.collection == collection,
+                models.Document.source == source,
+            )
+            .values(**values)
+        )
+
+    def record(
+        self,
+        collection: str,
+        source: str,
+        chunk_count: int,
+        byte_size: int,
+        content_hash: str,
+    ) -> models.Document:
+        """
+        Creates or refreshes the entry of an ingested document. Concurrent
+        ingests of the same document both succeed; the last one wins.
+        """
+        values = {
+            "chunk_count": chunk_count,
+            "byte_size": byte_size,
+            "content_hash": content_hash,
+            "ingested_at": datetime.utcnow(),
+        }
+        statement = self.record_statement(collection, source, values)
+        try:
+            if self.db.execute(statement).rowcount == 0:
+                self.db.add(
+                    models.Document(collection=collection, source=source, **values)
+                )
+            self.db.commit()
+        except IntegrityError:
+            # Another process created the entry first
+            self.db.rollback()
+            self.db.execute(self.record_statement(collection, source, values))
+            self.db.commit()
+
+        document = self.db.scalar(
+            select(models.Document).where(
+                models.Document.collection == collection,
+                models.Document.source == source,
+            )
+        )
+        logger.info(f"Catalog updated: {source} in {collection} ({chunk_count} chunks)")
+        return document
+
+    @staticmethod
+    def remove_statement(collection: str, source: str) -> Delete:
+        return delete(models.Document).where(
+            models.Document.collection == collection,
+            models.Document.source == source,
+        )
+
+    def remove(self, collection: str, source: str) -> bool:
+        """Drops a document's entry; returns whether one existed."""
+        deleted = self.db.execute(self.remove_statement(collection, source)).rowcount
+        self.db.commit()
+        return bool(deleted)
+
+    @staticmethod
+    def list_query(collection: str, limit: int, offset: int) -> Select:
+        """
+        A page of the collection's documents ordered by source, with one
+        extra row to tell whether more follow. Uses the (collection, source)
+        index.
+        """
+        return (
+            select(models.Document)
+            .where(models.Document.collection == collection)
+            .order_by(models.Document.source)
+            .offset(offset)
+            .limit(limit + 1)
+        )
+
+    def list(
+        self, collection: str, limit: int = 50, offset: int = 0
+    ) -> Tuple[List[models.Document], bool]:
+        """A page of the collection's documents, plus whether more follow."""
+        rows = list(self.db.scalars(self.list_query(collection, limit, offset)))
+        return rows[:limit], len(rows) > limit
+
+    @staticmethod
+    def recent_sources_query(collection: str, limit: int = 5) -> Select:
+        """
+        Most recently ingested document names, used as topic suggestions.
+        A statement so async sessions can run it too.
+        """
+        return (
+            select(models.Document.source)
+            .where(models.Document.collection == collection)
+            .order_by(models.Document.ingested_at.desc())
+            .limit(limit)
+        )
+
+    def recent_sources(self, collection: str, limit: int = 5) -> List[str]:
+        """Most recently ingested document names, used as topic suggestions."""
+        return list(self.db.scalars(self.recent_sources_query(collection, limit)))
+
+    @staticmethod
+    def sources_query(collection: str) -> Select:
+        return select(models.Document.source).where(
+            models.Document.collection == collection
+        )
+
+    def backfill(self, collection: str, chunk_counts: Dict[str, int]) -> int:
+        """
+        Adds entries for sources indexed before the catalog existed, from
+        their chunk counts in Qdrant; file sizes and hashes stay unknown
+        until the next ingest. Returns how many entries were added.
+        """
+        known = set(self.db.scalars(self.sources_query(collection)))
+        added = 0
+        for source, chunk_count in chunk_counts.items():
+            if source in known:
+                continue
+            self.db.add(
+                models.Document(
+                    collection=collection,
+                    source=source,
+                    chunk_count=chunk_count,
+                    ingested_at=datetime.utcnow(),
+                )
+            )
+            try:
+                self.db.commit()
+                added += 1
+            except IntegrityError:
+                # Recorded meanwhile by an ingest or another process
+                self.db.rollback()
+        if added:
+            logger.info(f"Catalog backfilled: {added} documents in {collection}")
+        return added
+
+    @staticmethod
+    def generation_query(collection: str) -> Select:
+        """
+        The collection's content generation (no row means 0). A statement so
+        async sessions can run it too.
+        """
+        return select(models.CollectionGeneration.generation).where(
+            models.CollectionGeneration.collection == collection
+        )
+
+    def generation(self, collection: str) -> int:
+        """The collection's content generation."""
+        return self.db.scalar(self.generation_query(collection)) or 0
+
+    @staticmethod
+    def bump_statement(collection: str) -> Update:
+        return (
+            update(models.CollectionGeneration)
+            .where(models.CollectionGeneration.collection == collection)
+            .values(
+                generation=models.CollectionGeneration.generation + 1,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+    @staticmethod
+    def first_generation(collection: str) -> models.CollectionGeneration:
+        return models.CollectionGeneration(
+            collection=collection, generation=1, updated_at=datetime.utcnow()
+        )
+
+    def bump_generation(self, collection: str) -> None:
+        """
+        Records that the collection's documents changed, so answer caches in
+        every process drop what they cached for it.
+        """
+        try:
+            if self.db.execute(self.bump_statement(collection)).rowcount == 0:
+                self.db.add(self.first_generation(collection))
+            self.db.commit()
+        except IntegrityError:
+            # Another process created the row first
+            self.db.rollback()
+            self.db.execute(self.bump_statement(collection))
+            self.db.commit()
+
+
+class AsyncDocumentCatalog:
+    """DocumentCatalog reads and writes for request handlers, on async sessions."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def remove(self, collection: str, source: str) -> bool:
+        """Drops a document's entry; returns whether one existed."""
+        result = await self.db.execute(
+            DocumentCatalog.remove_statement(collection, source)
+        )
+        await self.db.commit()
+        return bool(result.rowcount)
+
+    async def list(
+        self, collection: str, limit: int = 50, offset: int = 0
+    ) -> Tuple[List[models.Document], bool]:
+        """A page of the collection's documents, plus whether more follow."""
+        rows = list(
+            await self.db.scalars(DocumentCatalog.list_query(collection, limit, offset))
+        )
+        return rows[:limit], len(rows) > limit
+
+    async def bump_generation(self, collection: str) -> None:
+        """See DocumentCatalog.bump_generation."""
+        try:
+            result = await self.db.execute(DocumentCatalog.bump_statement(collection))
+            if result.rowcount == 0:
+                self.db.add(DocumentCatalog.first_generation(collection))
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            await self.db.execute(DocumentCatalog.bump_statement(collection))
+            await self.db.commit()
+
+    async def is_empty(self, collection: str) -> bool:
+        """Whether the collection has no catalog entries."""
+        return (
+            await self.db.scalar(DocumentCatalog.sources_query(collection).limit(1))
+        ) is None
+
+
+def _record_backfill(collection: str, chunk_counts: Dict[str, int]) -> int:
+    db = SessionLocal()
+    try:
+        return DocumentCatalog(db).backfill(collection, chunk_counts)
+    finally:
+        db.close()
+
+
+async def backfill_if_empty(vector_service, collection: str) -> int:
+    """
+    Fills the catalog of a collection indexed before the catalog existed,
+    from the sources stored in Qdrant (an AsyncVectorService). Runs at
+    startup; does nothing once the collection has entries.
+    """
+    async with AsyncSessionLocal() as db:
+        if not await AsyncDocumentCatalog(db).is_empty(collection):
+            return 0
+    if not await vector_service.client.collection_exists(collection):
+        return 0
+
+    vector_service.collection_name = collection
+    chunk_counts = await vector_service.source_counts()
+    return await asyncio.to_thread(_record_backfill, collection, chunk_counts)
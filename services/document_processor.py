@@ -1,62 +1,232 @@
+import multiprocessing
+import os
+import threading
 import pdfplumber
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, List, Dict, Iterable, Iterator, Optional, Tuple
 import re
 
+from core.config import settings
+from core.logging_config import logger
+from services.tokenizer import count_tokens, split_by_tokens
+
+# Below this many pages per worker, process startup costs more than it saves
+MIN_PAGES_PER_WORKER = 8
+
+# Close a chunk at a paragraph end once it is at least this full
+PARAGRAPH_FILL = 0.75
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Extracts (page_number, text) for pages [start, end). Runs in worker processes."""
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in range(start, end):
+            page_text = pdf.pages[index].extract_text()
+            if page_text:
+                pages.append((index + 1, page_text))
+    return pages
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extraction_pool() -> ProcessPoolExecutor:
+    """
+    The extraction process pool, shared by every ingest job and created on
+    first use, so concurrent jobs never run more than PDF_EXTRACTION_WORKERS
+    processes. Workers come from a fork server (or are spawned) rather than
+    being forked from the multi-threaded server process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _pool
+
+
+def shutdown_extraction_pool():
+    """Stops the extraction processes; the next extraction starts new ones."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
 
 class DocumentProcessor:
-    """PDF document processor for chunking with automatic validation."""
+    """
+    PDF document processor for chunking with automatic validation.
+
+    chunk_size and overlap are measured in embedding-model tokens.
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        extraction_workers: Optional[int] = None,
+    ):
+        self.chunk_size = chunk_size or settings.CHUNK_TOKENS
+        self.overlap = settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+        self.max_length = ChunkValidator.max_length(self.chunk_size)
+        if extraction_workers is None:
+            extraction_workers = settings.PDF_EXTRACTION_WORKERS or os.cpu_count() or 1
+        self.extraction_workers = max(1, extraction_workers)
+
+    def extract_pages_from_pdf(self, pdf_path: str) -> List[Tuple[int, str]]:
+        """
+        Extracts text per page as (page_number, text), in page order.
+
+        Large PDFs are split into contiguous page ranges extracted in parallel
+        by the shared process pool; pages without text are omitted.
+        """
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+
+        workers = min(self.extraction_workers, page_count // MIN_PAGES_PER_WORKER)
+        if workers <= 1:
+            return _extract_page_range(pdf_path, 0, page_count)
+
+        step = -(-page_count // workers)  # ceil division
+        ranges = [(i, min(i + step, page_count)) for i in range(0, page_count, step)]
 
-    def __init__(self, chunk_size: int = 500, overlap: int = 50):
-        self.chunk_size = chunk_size
-        self.overlap = overlap
+        try:
+            # map() yields results in submission order, i.e. page order
+            results = _extraction_pool().map(
+                _extract_page_range,
+                [pdf_path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+            )
+            return [page for pages in results for page in pages]
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool for good; start fresh next time
+            shutdown_extraction_pool()
+            raise
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extracts all text from a PDF."""
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
+        return "".join(text + "\n" for _, text in self.extract_pages_from_pdf(pdf_path))
 
     def chunk_text(self, text: str) -> List[str]:
         """
-        Splits text into chunks with overlap.
+        Splits raw (uncleaned) text into chunks with overlap.
         Automatically discards invalid chunks.
         """
-        chunks = []
-        start = 0
-        text_length = len(text)
+        return [chunk for _, chunk in self.iter_chunks([(None, text)])]
+
+    def iter_chunks(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Yields (page, chunk) from raw page texts in a single pass.
+
+        Chunks are packed with whole sentences up to chunk_size tokens and
+        close early at a paragraph end once PARAGRAPH_FILL full. Each chunk
+        after the first starts with the trailing sentences of the previous
+        one, up to overlap tokens.
+        """
+        window: Deque[Tuple[Optional[int], str, int]] = deque()
+        window_tokens = 0
+        has_new = False  # window holds sentences not yet emitted
+
+        for page, sentence, tokens, ends_paragraph in self._sentences(pages):
+            if has_new and window_tokens + tokens > self.chunk_size:
+                yield from self._emit(window)
+                window, window_tokens = self._overlap_tail(window)
+                has_new = False
+
+            # Give up overlap rather than exceed the chunk size
+            while window and window_tokens + tokens > self.chunk_size:
+                window_tokens -= window.popleft()[2]
+
+            window.append((page, sentence, tokens))
+            window_tokens += tokens
+            has_new = True
+
+            if ends_paragraph and window_tokens >= self.chunk_size * PARAGRAPH_FILL:
+                yield from self._emit(window)
+                window, window_tokens = self._overlap_tail(window)
+                has_new = False
+
+        if has_new:
+            yield from self._emit(window)
+
+    def _sentences(
+        self, pages: Iterable[Tuple[Optional[int], str]]
+    ) -> Iterator[Tuple[Optional[int], str, int, bool]]:
+        """
+        Yields (page, sentence, tokens, ends_paragraph) from raw page texts.
 
-        while start < text_length:
-            end = min(start + self.chunk_size, text_length)
+        Paragraph and sentence breaks are found before whitespace is collapsed;
+        sentences longer than chunk_size are split on token boundaries.
+        """
+        for page, raw in pages:
+            for paragraph in PARAGRAPH_BREAK.split(raw):
+                sentences = [self.clean_text(s) for s in SENTENCE_END.split(paragraph)]
+                sentences = [s for s in sentences if s]
 
-            # Look for natural break points
-            if end < text_length:
-                # Try to find natural separators in order of preference
-                for sep in ["\n\n", "\n", ". ", " "]:
-                    pos = text.rfind(sep, start, end)
-                    if pos != -1 and pos > start:
-                        end = pos + len(sep)
-                        break
+                for i, sentence in enumerate(sentences):
+                    is_last = i == len(sentences) - 1
+                    tokens = count_tokens(sentence)
 
-            chunk = text[start:end].strip()
+                    if tokens <= self.chunk_size:
+                        yield page, sentence, tokens, is_last
+                        continue
 
-            # Validate chunk before adding - discard if invalid
-            if chunk and ChunkValidator.is_valid(chunk):
-                chunks.append(chunk)
+                    pieces = [
+                        p.strip() for p in split_by_tokens(sentence, self.chunk_size)
+                    ]
+                    pieces = [p for p in pieces if p]
+                    for j, piece in enumerate(pieces):
+                        yield page, piece, count_tokens(piece), is_last and j == len(
+                            pieces
+                        ) - 1
 
-            # Advance with overlap
-            start = end - self.overlap if end - self.overlap > start else end
+    def _emit(
+        self, window: Deque[Tuple[Optional[int], str, int]]
+    ) -> Iterator[Tuple[Optional[int], str]]:
+        chunk = " ".join(sentence for _, sentence, _ in window)
+        if len(chunk) > self.max_length:
+            logger.warning(
+                f"Discarding {len(chunk)}-character chunk, more than "
+                f"{self.max_length} for {self.chunk_size} tokens: {chunk[:80]!r}"
+            )
+        # Validate chunk before yielding - discard if invalid
+        if ChunkValidator.is_valid(chunk, self.max_length):
+            yield window[0][0], chunk
 
-        return chunks
+    def _overlap_tail(
+        self, window: Deque[Tuple[Optional[int], str, int]]
+    ) -> Tuple[Deque[Tuple[Optional[int], str, int]], int]:
+        """Trailing whole sentences of window fitting in overlap tokens."""
+        tail: Deque[Tuple[Optional[int], str, int]] = deque()
+        tokens = 0
+        for item in reversed(window):
+            if tokens + item[2] > self.overlap:
+                break
+            tail.appendleft(item)
+            tokens += item[2]
+        return tail, tokens
 
     def process_pdf(self, pdf_path: str, metadata: Dict = None) -> List[Dict]:
         """Processes a PDF and returns list of chunks with metadata."""
-        text = self.extract_text_from_pdf(pdf_path)
-        text = self.clean_text(text)  # Clean BEFORE chunking
-        chunks = self.chunk_text(text)
+        chunks = list(self.iter_chunks(self.extract_pages_from_pdf(pdf_path)))
 
         filename = pdf_path.split("/")[-1]
 
@@ -67,10 +237,11 @@ class DocumentProcessor:
                     "source": filename,
                     "chunk_index": i,
                     "total_chunks": len(chunks),
+                    "page": page,
                     **(metadata or {}),
                 },
             }
-            for i, chunk in enumerate(chunks)
+            for i, (page, chunk) in enumerate(chunks)
         ]
 
     def clean_text(self, text: str) -> str:
@@ -84,14 +255,21 @@ class ChunkValidator:
     """Validator for chunk quality."""
 
     MIN_LENGTH = 50
-    MAX_LENGTH = 2000
+    # Prose runs about 4-5 characters per token; a chunk with far more is
+    # mostly separators or repeated symbols
+    MAX_CHARS_PER_TOKEN = 8
+
+    @staticmethod
+    def max_length(chunk_tokens: Optional[int] = None) -> int:
+        """Longest valid chunk, in characters, for chunks of chunk_tokens."""
+        return (chunk_tokens or settings.CHUNK_TOKENS) * ChunkValidator.MAX_CHARS_PER_TOKEN
 
     @staticmethod
-    def is_valid(chunk: str) -> bool:
-        """Checks if a chunk is valid."""
+    def is_valid(chunk: str, max_length: Optional[int] = None) -> bool:
+        """Checks if a chunk is valid (max_length defaults to CHUNK_TOKENS chunks)."""
         if not chunk or len(chunk) < ChunkValidator.MIN_LENGTH:
             return False
-        if len(chunk) > ChunkValidator.MAX_LENGTH:
+        if len(chunk) > (max_length or ChunkValidator.max_length()):
             return False
         alpha_ratio = sum(c.isalpha() for c in chunk) / len(chunk)
         return alpha_ratio > 0.3
@@ -0,0 +1,266 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.logging_config import logger
+from core.metrics import CACHE_LOOKUPS
+from services.embedding_providers import embedding_model_id
+
+# Disk recency updates are batched: written with the next put, or by the
+# first lookup this many seconds after the last write
+ACCESS_FLUSH_SECONDS = 30
+
+
+class EmbeddingCache:
+    """
+    Two-tier content-addressed embedding cache.
+
+    An in-process LRU sits in front of a SQLite store on disk. Entries are
+    keyed by a hash of (model, normalized text), so the same text embedded
+    with a different model never collides. When the configured model differs
+    from the one recorded in the store, the store is cleared on startup.
+
+    Lookups never wait on disk while holding the memory tier: SQLite access
+    has its own lock, and disk hits only record their access time in memory
+    until the next flush.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model: str,
+        memory_items: int = 10000,
+        max_items: int = 500000,
+    ):
+        self.path = path
+        self.model = model
+        self.memory_items = memory_items
+        self.max_items = max_items
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Guards the memory tier, the pending access times and the counters
+        self._lock = threading.Lock()
+        # Guards the SQLite connection; never taken while holding _lock
+        self._db_lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_embeddings_accessed_at "
+            "ON embeddings (accessed_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        stored_model = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'model'"
+        ).fetchone()
+        if stored_model is None or stored_model[0] != model:
+            if stored_model is not None:
+                logger.info(
+                    f"Embedding model changed ({stored_model[0]} -> {model}), "
+                    f"invalidating cache"
+                )
+            self.invalidate()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace so formatting differences share an entry."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    def make_key(self, text: str) -> str:
+        """Content address for a text under the current model."""
+        payload = f"{self.model}\0{self.normalize(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Returns cached vectors as {position in texts: vector}."""
+        found: Dict[int, List[float]] = {}
+        disk_lookups: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.make_key(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = vector
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+        if disk_lookups:
+            rows = self._read(list(disk_lookups))
+            now = time.time()
+            with self._lock:
+                for key, vector in rows:
+                    self._remember(key, vector)
+                    self._accessed[key] = now
+                    for i in disk_lookups[key]:
+                        found[i] = vector
+            if now - self._last_flush >= ACCESS_FLUSH_SECONDS:
+                self.flush()
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        CACHE_LOOKUPS.labels(cache="embedding", result="hit").inc(len(found))
+        CACHE_LOOKUPS.labels(cache="embedding", result="miss").inc(
+            len(texts) - len(found)
+        )
+
+        return found
+
+    def _read(self, keys: List[str]) -> List[Tuple[str, List[float]]]:
+        """Vectors stored on disk for the keys that have one."""
+        blobs = []
+        with self._db_lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                group = keys[start : start + 500]
+                placeholders = ",".join("?" * len(group))
+                blobs.extend(
+                    self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        group,
+                    ).fetchall()
+                )
+        return [(key, array("f", blob).tolist()) for key, blob in blobs]
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Returns the cached vector for a text, or None."""
+        return self.get_many([text]).get(0)
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Stores vectors for texts in both tiers."""
+        if not texts:
+            return
+
+        now = time.time()
+        rows = {}
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(text)
+                self._remember(key, vector)
+                rows[key] = (key, array("f", vector).tobytes(), now)
+
+        with self._db_lock:
+            # Recent disk hits must count before choosing what to evict
+            self._write_accessed()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, accessed_at) "
+                "VALUES (?, ?, ?)",
+                list(rows.values()),
+            )
+            self._count += self._conn.total_changes - before
+            self._evict_disk()
+            self._conn.commit()
+
+    def put(self, text: str, vector: List[float]) -> None:
+        """Stores the vector for a single text."""
+        self.put_many([text], [vector])
+
+    def flush(self) -> None:
+        """Writes the access times of recent disk hits to the store."""
+        with self._db_lock:
+            if self._write_accessed():
+                self._conn.commit()
+
+    def _write_accessed(self) -> int:
+        """Updates pending access times; the caller holds _db_lock and commits."""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._last_flush = time.time()
+        if accessed:
+            self._conn.executemany(
+                "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in accessed.items()],
+            )
+        return len(accessed)
+
+    def invalidate(self) -> None:
+        """Drops every entry and records the current model."""
+        with self._lock:
+            self._memory.clear()
+            self._accessed.clear()
+        with self._db_lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)",
+                (self.model,),
+            )
+            self._conn.commit()
+            self._count = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes."""
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "memory_items": len(self._memory),
+            "disk_items": self._count,
+        }
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        """Inserts into the memory tier, evicting least recently used."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        """Trims the disk tier to max_items, least recently accessed first."""
+        excess = self._count - self.max_items
+        if excess <= 0:
+            return
+        # Evict an extra 10% so we don't trim on every insert
+        excess += self.max_items // 10
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Evicted embeddings from disk cache, {self._count} remain")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Returns the process-wide embedding cache, or None if disabled."""
+    global _cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    path=settings.EMBEDDING_CACHE_PATH,
+                    # Vectors of different models or sizes must not share entries
+                    model=embedding_model_id(),
+                    memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                    max_items=settings.EMBEDDING_CACHE_MAX_ITEMS,
+                )
+    return _cache
@@ -0,0 +1,285 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Optional
+
+import httpx
+import numpy as np
+import requests
+import urllib3
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from core.config import settings
+from core.logging_config import logger
+from core.metrics import count_retry
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover - only needed for EMBEDDING_PROVIDER=local
+    onnxruntime = None
+    Tokenizer = None
+
+# Disable SSL warnings for development (remove in production)
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+OPENROUTER_EMBEDDINGS_URL = "https://openrouter.ai/api/v1/embeddings"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(matrix: np.ndarray) -> List[List[float]]:
+    """L2-normalizes each row, so cosine and dot product agree."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1, norms)).tolist()
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns a batch of texts into vectors of EMBEDDING_DIMENSIONS.
+
+    Vector services handle caching, batching and concurrency; providers
+    only embed one batch. embed() blocks; aembed() is its event-loop
+    friendly counterpart and by default runs embed() in a worker thread.
+    """
+
+    # Batches embedded at once by the vector services
+    max_concurrency = 1
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embeds one batch, in input order."""
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed, texts)
+
+
+class OpenRouterEmbeddingProvider(EmbeddingProvider):
+    """
+    EMBEDDING_MODEL through OpenRouter's OpenAI-compatible embeddings API.
+
+    embed() uses its own requests session; aembed() needs the app-wide
+    httpx.AsyncClient so connections are shared with chat completions.
+    """
+
+    def __init__(self, http: Optional[httpx.AsyncClient] = None):
+        self.api_key = settings.OPENROUTER_API_KEY
+        self.http = http
+        self.max_concurrency = settings.EMBEDDING_MAX_CONCURRENCY
+
+        # Create session with SSL adapter for better connection handling
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=settings.OPENROUTER_POOL_SIZE,
+            max_retries=3,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _headers(self) -> dict:
+        if not self.api_key:
+            raise Exception("OPENROUTER_API_KEY not configured")
+
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:8000",
+            "X-Title": "Document ChatBot",
+        }
+
+    @staticmethod
+    def _payload(texts: List[str]) -> dict:
+        return {
+            "model": settings.EMBEDDING_MODEL,
+            "input": texts,
+            "dimensions": settings.EMBEDDING_DIMENSIONS,
+        }
+
+    @staticmethod
+    def _parse(body: dict, expected: int) -> List[List[float]]:
+        # The API may return items out of order; "index" maps them back
+        data = sorted(body["data"], key=lambda d: d["index"])
+        if len(data) != expected:
+            raise Exception(
+                f"OpenRouter returned {len(data)} embeddings for {expected} inputs"
+            )
+        return [d["embedding"] for d in data]
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=2, min=4, max=30),
+        before_sleep=count_retry("embedding"),
+        reraise=True,
+    )
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Requests embeddings for several texts in one OpenRouter call."""
+        headers = self._headers()
+        payload = self._payload(texts)
+
+        try:
+            response = self.session.post(
+                OPENROUTER_EMBEDDINGS_URL,
+                headers=headers,
+                json=payload,
+                timeout=60,
+                verify=True,
+            )
+            response.raise_for_status()
+        except requests.exceptions.SSLError as e:
+            logger.warning(f"SSL Error, retrying with verify=False: {str(e)}")
+            # Fallback without SSL verification (development only)
+            response = self.session.post(
+                OPENROUTER_EMBEDDINGS_URL,
+                headers=headers,
+                json=payload,
+                timeout=60,
+                verify=False,
+            )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"OpenRouter request failed: {str(e)}")
+            raise Exception(f"OpenRouter error: {str(e)}")
+
+        return self._parse(response.json(), len(texts))
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=2, min=4, max=30),
+        before_sleep=count_retry("embedding"),
+        reraise=True,
+    )
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Requests embeddings for several texts in one OpenRouter call."""
+        if self.http is None:
+            raise Exception("OpenRouter provider created without an async HTTP client")
+
+        try:
+            response = await self.http.post(
+                OPENROUTER_EMBEDDINGS_URL,
+                headers=self._headers(),
+                json=self._payload(texts),
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.error(f"OpenRouter request failed: {str(e)}")
+            raise Exception(f"OpenRouter error: {str(e)}")
+
+        return self._parse(response.json(), len(texts))
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    A sentence-embedding model exported to ONNX, run on the CPU in-process.
+
+    EMBEDDING_LOCAL_MODEL_DIR must hold model.onnx and tokenizer.json (e.g.
+    an ONNX export of a sentence-transformers model). Token embeddings are
+    mean-pooled over the attention mask and L2-normalized. Needs the
+    optional onnxruntime and tokenizers packages.
+    """
+
+    def __init__(self, model_dir: str):
+        if onnxruntime is None:
+            raise RuntimeError(
+                "EMBEDDING_PROVIDER=local needs onnxruntime and tokenizers installed"
+            )
+
+        options = onnxruntime.SessionOptions()
+        if settings.EMBEDDING_LOCAL_THREADS:
+            options.intra_op_num_threads = settings.EMBEDDING_LOCAL_THREADS
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=settings.EMBEDDING_LOCAL_MAX_TOKENS)
+        self.tokenizer.enable_padding()
+
+        # onnxruntime already spreads one batch over every core
+        self.max_concurrency = 1
+        size = len(self.embed(["dimension probe"])[0])
+        if size != settings.EMBEDDING_DIMENSIONS:
+            raise ValueError(
+                f"Local embedding model outputs {size} dimensions, "
+                f"set EMBEDDING_DIMENSIONS={size}"
+            )
+        logger.info(f"Loaded local embedding model from {model_dir} ({size} dimensions)")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self.input_names}
+
+        output = self.session.run(None, inputs)[0]
+        if output.ndim == 2:
+            # Exports that already include the pooling layer
+            return _normalize(output)
+
+        # Token embeddings (batch, tokens, hidden)
+        tokens = output
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalize(pooled)
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic embeddings with no model and no network, for tests.
+
+    Each word maps to a fixed pseudo-random vector and a text embeds as the
+    normalized sum of its words, so texts sharing words are close.
+    """
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    @lru_cache(maxsize=50000)
+    def _word_vector(self, word: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(word.encode("utf-8")))
+        return rng.standard_normal(self.dimensions).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in _WORD_RE.findall(text.lower()):
+                matrix[i] += self._word_vector(word)
+        return _normalize(matrix)
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+def embedding_model_id() -> str:
+    """Identity of the configured model and size, used to key cached vectors."""
+    if settings.EMBEDDING_PROVIDER == "local":
+        model = f"local:{os.path.basename(os.path.normpath(settings.EMBEDDING_LOCAL_MODEL_DIR))}"
+    elif settings.EMBEDDING_PROVIDER == "fake":
+        model = "fake"
+    else:
+        model = settings.EMBEDDING_MODEL
+    return f"{model}@{settings.EMBEDDING_DIMENSIONS}"
+
+
+def create_embedding_provider(http: Optional[httpx.AsyncClient] = None) -> EmbeddingProvider:
+    """Builds the provider selected by EMBEDDING_PROVIDER."""
+    if settings.EMBEDDING_PROVIDER == "local":
+        return LocalEmbeddingProvider(settings.EMBEDDING_LOCAL_MODEL_DIR)
+    if settings.EMBEDDING_PROVIDER == "fake":
+        return FakeEmbeddingProvider(settings.EMBEDDING_DIMENSIONS)
+    if settings.EMBEDDING_PROVIDER != "openrouter":
+        logger.warning(
+            f"Unknown EMBEDDING_PROVIDER '{settings.EMBEDDING_PROVIDER}', using openrouter"
+        )
+    return OpenRouterEmbeddingProvider(http)
@@ -0,0 +1,400 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, or_
+
+from core.config import settings
+from core.logging_config import logger
+from core.metrics import (
+    INGEST_CHUNKS,
+    INGEST_JOBS,
+    INGEST_JOBS_IN_PROGRESS,
+    INGEST_STAGE_SECONDS,
+)
+from db import models
+from db.database import SessionLocal
+from services.answer_cache import get_answer_cache
+from services.clients import SharedClients
+from services.document_catalog import DocumentCatalog, file_fingerprint
+from services.document_processor import DocumentProcessor, ChunkValidator
+from services.vector_service import AsyncVectorService
+
+JOB_QUEUED = "queued"
+JOB_EXTRACTING = "extracting"
+JOB_EMBEDDING = "embedding"
+JOB_INDEXED = "indexed"
+JOB_FAILED = "failed"
+
+RUNNING_STATUSES = (JOB_EXTRACTING, JOB_EMBEDDING)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another process claimed it."""
+
+
+class IngestQueue:
+    """
+    Bounded worker pool that indexes uploaded PDFs in the background.
+
+    Job state lives in the ingest_jobs table, so progress survives the
+    request that created the job. Every server process runs its own
+    queue: a job runs only in the process that claims it, and a running
+    job keeps updated_at fresh as a lease. Queued jobs and jobs whose
+    lease expired (their process died) are picked up by any process.
+
+    Each claim stores a new lease token in claimed_by, and every later
+    write of the job is conditional on it: a process that stalled past its
+    lease stops at its next write instead of overwriting the new owner's.
+    """
+
+    def __init__(self, workers: int = 2, lease_seconds: int = 120):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._pending: Set[str] = set()
+        # Lease token of each job running here
+        self._running: Dict[str, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.clients: Optional[SharedClients] = None
+
+    async def start(self, clients: SharedClients):
+        """Starts the workers and the sweep for unclaimed or stale jobs."""
+        self.clients = clients
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+        logger.info(f"Ingest queue started with {self.workers} workers")
+
+    async def stop(self):
+        """Cancels the workers and hands their in-flight jobs back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id, lease in self._running.items():
+            await asyncio.to_thread(self._release_job, job_id, lease)
+        self._running.clear()
+
+    async def submit(
+        self, user_id: int, filename: str, file_path: str, collection: str
+    ) -> models.IngestJob:
+        """Persists a new queued job and hands it to the workers."""
+        job = models.IngestJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            collection=collection,
+            status=JOB_QUEUED,
+            created_at=datetime.utcnow(),
+        )
+        job = await asyncio.to_thread(self._insert_job, job)
+        self._enqueue(job.id)
+        logger.info(f"Queued ingest job {job.id} for {filename}")
+        return job
+
+    def _enqueue(self, job_id: str) -> bool:
+        if job_id in self._pending or job_id in self._running:
+            return False
+        self._pending.add(job_id)
+        self._queue.put_nowait(job_id)
+        return True
+
+    async def _sweeper(self):
+        """
+        Periodically enqueues jobs no process is running: queued jobs left
+        by a process that stopped, and jobs whose lease expired.
+        """
+        while True:
+            try:
+                for job_id in await asyncio.to_thread(self._claimable_job_ids):
+                    if self._enqueue(job_id):
+                        logger.info(f"Picking up ingest job {job_id}")
+            except Exception as e:
+                logger.error(f"Error looking for unfinished ingest jobs: {str(e)}")
+            await asyncio.sleep(self.lease_seconds / 2)
+
+    async def _heartbeat(self, job_id: str, lease: str):
+        """Renews the lease of a running job."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                await self._update_job(job_id, lease)
+            except LeaseLost:
+                # The job stops at its own next write
+                return
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            lease = None
+            try:
+                # Another process may have claimed it first
+                lease = await asyncio.to_thread(self._claim_job, job_id)
+                if lease is None:
+                    continue
+                self._running[job_id] = lease
+                heartbeat = asyncio.create_task(self._heartbeat(job_id, lease))
+                try:
+                    with INGEST_JOBS_IN_PROGRESS.track_inprogress():
+                        with INGEST_STAGE_SECONDS.labels(stage="total").time():
+                            await self._run_job(job_id, lease)
+                finally:
+                    heartbeat.cancel()
+                self._running.pop(job_id, None)
+            except asyncio.CancelledError:
+                raise
+            except LeaseLost:
+                self._running.pop(job_id, None)
+                logger.warning(f"Ingest job {job_id} was taken over by another process")
+            except Exception as e:
+                self._running.pop(job_id, None)
+                INGEST_JOBS.labels(status=JOB_FAILED).inc()
+                logger.error(f"Ingest job {job_id} failed: {str(e)}")
+                if lease is not None:
+                    try:
+                        await self._update_job(
+                            job_id, lease, status=JOB_FAILED, error=str(e)
+                        )
+                    except LeaseLost:
+                        pass
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str, lease: str):
+        job = await asyncio.to_thread(self._get_job, job_id)
+        if job is None:
+            logger.warning(f"Ingest job {job_id} not found, skipping")
+            return
+
+        # 1. Extract and chunk (CPU-bound, off the event loop); the claim
+        # already set the status to extracting
+        processor = DocumentProcessor()
+        with INGEST_STAGE_SECONDS.labels(stage="extract").time():
+            chunks_data = await asyncio.to_thread(processor.process_pdf, job.file_path)
+
+        with INGEST_STAGE_SECONDS.labels(stage="validate").time():
+            valid_chunks = [
+                {"text": processor.clean_text(c["text"]), "metadata": c["metadata"]}
+                for c in chunks_data
+                if ChunkValidator.is_valid(c["text"], processor.max_length)
+            ]
+
+        if not valid_chunks:
+            raise Exception("No valid chunks could be extracted from the document")
+
+        # 2. Embed only the chunks that changed since the last ingest
+        await self._update_job(
+            job_id,
+            lease,
+            status=JOB_EMBEDDING,
+            chunks_total=len(valid_chunks),
+            chunks_embedded=0,
+        )
+
+        async def report_progress(embedded: int, to_embed: int):
+            await self._update_job(
+                job_id, lease, chunks_embedded=embedded, chunks_added=to_embed
+            )
+
+        vector_service = AsyncVectorService(self.clients)
+        vector_service.collection_name = job.collection
+        try:
+            await vector_service.create_collection_if_not_exists()
+            # Embedding and Qdrant time within it are in their own histograms
+            with INGEST_STAGE_SECONDS.labels(stage="index").time():
+                counts = await vector_service.sync_source(
+                    job.filename, valid_chunks, on_progress=report_progress
+                )
+        finally:
+            # Cached answers may no longer reflect the collection, here or
+            # in other processes
+            await asyncio.to_thread(self._bump_generation, job.collection)
+            answer_cache = get_answer_cache()
+            if answer_cache:
+                answer_cache.invalidate(job.collection)
+
+        with INGEST_STAGE_SECONDS.labels(stage="catalog").time():
+            await asyncio.to_thread(
+                self._record_document, job, counts["added"] + counts["kept"]
+            )
+        await self._update_job(
+            job_id,
+            lease,
+            status=JOB_INDEXED,
+            chunks_added=counts["added"],
+            chunks_kept=counts["kept"],
+            chunks_removed=counts["removed"],
+        )
+        INGEST_JOBS.labels(status=JOB_INDEXED).inc()
+        for result in ("added", "kept", "removed"):
+            INGEST_CHUNKS.labels(result=result).inc(counts[result])
+        logger.info(
+            f"Document indexed successfully: {job.filename} "
+            f"({counts['added']} added, {counts['kept']} kept, "
+            f"{counts['removed']} removed)"
+        )
+
+    async def _update_job(self, job_id: str, lease: str, **fields):
+        # With no fields, only renews updated_at (the lease)
+        if not await asyncio.to_thread(self._write_job, job_id, lease, fields):
+            raise LeaseLost(job_id)
+
+    @staticmethod
+    def _insert_job(job: models.IngestJob) -> models.IngestJob:
+        db = SessionLocal()
+        try:
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    @staticmethod
+    def _get_job(job_id: str) -> Optional[models.IngestJob]:
+        db = SessionLocal()
+        try:
+            job = db.query(models.IngestJob).filter(models.IngestJob.id == job_id).first()
+            if job:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _claimable(self):
+        """Queued jobs, and running jobs whose lease expired."""
+        stale = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        return or_(
+            models.IngestJob.status == JOB_QUEUED,
+            and_(
+                models.IngestJob.status.in_(RUNNING_STATUSES),
+                or_(
+                    models.IngestJob.updated_at.is_(None),
+                    models.IngestJob.updated_at < stale,
+                ),
+            ),
+        )
+
+    def _claim_job(self, job_id: str) -> Optional[str]:
+        """
+        Atomically moves a claimable job to extracting under a new lease
+        token, returned on success. Only one process gets a row count of 1,
+        so a job never runs twice at once.
+        """
+        lease = uuid.uuid4().hex
+        db = SessionLocal()
+        try:
+            claimed = (
+                db.query(models.IngestJob)
+                .filter(models.IngestJob.id == job_id, self._claimable())
+                .update(
+                    {
+                        "status": JOB_EXTRACTING,
+                        "claimed_by": lease,
+                        "updated_at": datetime.utcnow(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return lease if claimed == 1 else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _release_job(job_id: str, lease: str):
+        """Puts a job interrupted by shutdown back in the queue."""
+        db = SessionLocal()
+        try:
+            db.query(models.IngestJob).filter(
+                models.IngestJob.id == job_id,
+                models.IngestJob.claimed_by == lease,
+                models.IngestJob.status.in_(RUNNING_STATUSES),
+            ).update(
+                {
+                    "status": JOB_QUEUED,
+                    "claimed_by": None,
+                    "updated_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error releasing ingest job {job_id}: {str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write_job(job_id: str, lease: str, fields: dict) -> bool:
+        """
+        Updates a job while this claim still holds its lease. Returns False
+        when another process took it over; database errors are logged and
+        leave the job to the next write.
+        """
+        db = SessionLocal()
+        try:
+            updated = (
+                db.query(models.IngestJob)
+                .filter(
+                    models.IngestJob.id == job_id,
+                    models.IngestJob.claimed_by == lease,
+                )
+                .update(
+                    {**fields, "updated_at": datetime.utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            return updated == 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error updating ingest job {job_id}: {str(e)}")
+            return True
+        finally:
+            db.close()
+
+    @staticmethod
+    def _bump_generation(collection: str):
+        db = SessionLocal()
+        try:
+            DocumentCatalog(db).bump_generation(collection)
+        except Exception as e:
+            logger.error(f"Error bumping generation of {collection}: {str(e)}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _record_document(job: models.IngestJob, chunk_count: int):
+        byte_size, content_hash = file_fingerprint(job.file_path)
+        db = SessionLocal()
+        try:
+            DocumentCatalog(db).record(
+                job.collection, job.filename, chunk_count, byte_size, content_hash
+            )
+        finally:
+            db.close()
+
+    def _claimable_job_ids(self) -> List[str]:
+        db = SessionLocal()
+        try:
+            jobs = (
+                db.query(models.IngestJob.id)
+                .filter(self._claimable())
+                .order_by(models.IngestJob.created_at.asc())
+                .all()
+            )
+            return [job.id for job in jobs]
+        finally:
+            db.close()
+
+
+ingest_queue = IngestQueue(
+    workers=settings.INGEST_WORKERS, lease_seconds=settings.INGEST_JOB_LEASE_SECONDS
+)
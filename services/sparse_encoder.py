@@ -0,0 +1,56 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client.models import SparseVector
+
+# Keeps part numbers, versions and acronyms such as "XJ-200" or "v1.2" whole
+TERM_PATTERN = re.compile(r"\w[\w\-./]*\w|\w")
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical chunk length in terms, used in place of the corpus average
+AVERAGE_DOC_TERMS = 150
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased terms of a text."""
+    return TERM_PATTERN.findall(text.lower())
+
+
+def _term_index(term: str) -> int:
+    # Stable across processes, unlike hash()
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: dict) -> SparseVector:
+    # Hash collisions are rare; merge them rather than send duplicate indices
+    merged: dict = {}
+    for term, weight in weights.items():
+        index = _term_index(term)
+        merged[index] = merged.get(index, 0.0) + weight
+    return SparseVector(indices=list(merged), values=list(merged.values()))
+
+
+def encode_document(text: str) -> SparseVector:
+    """
+    BM25 term-frequency weights of a chunk.
+
+    IDF is applied by Qdrant at query time (the sparse vector is created with
+    the IDF modifier), so only the TF part is computed here.
+    """
+    counts = Counter(terms(text))
+    length_norm = 1 - BM25_B + BM25_B * sum(counts.values()) / AVERAGE_DOC_TERMS
+    return _to_sparse(
+        {
+            term: tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+            for term, tf in counts.items()
+        }
+    )
+
+
+def encode_query(text: str) -> SparseVector:
+    """Query terms with unit weight; Qdrant multiplies in each term's IDF."""
+    return _to_sparse({term: 1.0 for term in set(terms(text))})
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from typing import List
+
+from core.config import settings
+from core.logging_config import logger
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is in requirements.txt
+    tiktoken = None
+
+# EMBEDDING_TOKENIZER value that counts tokens from the text length
+ESTIMATE = "estimate"
+
+# Rough ratio for English/Spanish text, used by the estimate
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """
+    Loads the embedding model's tokenizer, or None when EMBEDDING_TOKENIZER
+    is "estimate".
+
+    A tokenizer that fails to load is an error, not a silent switch to
+    estimates: token counts decide chunk boundaries, and with content-derived
+    point IDs new boundaries mean re-embedding every document.
+    """
+    if settings.EMBEDDING_TOKENIZER == ESTIMATE:
+        return None
+    if tiktoken is None:
+        raise RuntimeError(
+            "tiktoken is not installed; install it or set EMBEDDING_TOKENIZER=estimate"
+        )
+    try:
+        return tiktoken.get_encoding(settings.EMBEDDING_TOKENIZER)
+    except Exception as e:
+        # tiktoken downloads encodings on first use and caches them in
+        # TIKTOKEN_CACHE_DIR; offline hosts need that directory pre-filled
+        raise RuntimeError(
+            f"Could not load tokenizer '{settings.EMBEDDING_TOKENIZER}': {e}. "
+            "On offline hosts, point TIKTOKEN_CACHE_DIR at a directory where it "
+            "was downloaded before, or set EMBEDDING_TOKENIZER=estimate."
+        ) from e
+
+
+def load_tokenizer() -> str:
+    """Loads the tokenizer at startup, so a missing one fails fast."""
+    encoding = _encoding()
+    name = encoding.name if encoding is not None else ESTIMATE
+    logger.info(f"Tokenizer: {name}")
+    return name
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens as the embedding model sees them."""
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int) -> List[str]:
+    """Splits text into consecutive pieces of at most max_tokens tokens."""
+    encoding = _encoding()
+    if encoding is None:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [text[i : i + size] for i in range(0, len(text), size)]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    return [
+        encoding.decode(tokens[i : i + max_tokens])
+        for i in range(0, len(tokens), max_tokens)
+    ]
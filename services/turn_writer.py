@@ -0,0 +1,166 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.logging_config import logger
+from db import models
+from db.database import AsyncSessionLocal
+
+
+@dataclass
+class ChatTurn:
+    """A question and its answer, written together at the end of the turn."""
+
+    user_id: int
+    session_id: Optional[int]
+    question: str
+    asked_at: datetime
+    answer: str
+    answered_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def _stage(
+    db: AsyncSession, turn: ChatTurn
+) -> Tuple[Optional[models.ChatSession], models.Message, models.Message]:
+    session = None
+    if turn.session_id is None:
+        session = models.ChatSession(user_id=turn.user_id, started_at=turn.asked_at)
+        db.add(session)
+
+    messages = (
+        models.Message(
+            content=turn.question,
+            is_bot=False,
+            created_at=turn.asked_at,
+            user_id=turn.user_id,
+            session_id=turn.session_id,
+        ),
+        models.Message(
+            content=turn.answer,
+            is_bot=True,
+            created_at=turn.answered_at,
+            user_id=turn.user_id,
+            session_id=turn.session_id,
+        ),
+    )
+    return session, *messages
+
+
+async def write_turns(db: AsyncSession, turns: List[ChatTurn]) -> List[models.Message]:
+    """
+    Writes the turns in one transaction and returns their bot messages.
+
+    New sessions are flushed first so their messages can reference them;
+    everything is committed at once, so a turn is stored whole or not at all.
+    """
+    staged = [_stage(db, turn) for turn in turns]
+    if any(session is not None for session, _, _ in staged):
+        await db.flush()
+
+    for session, user_message, bot_message in staged:
+        if session is not None:
+            user_message.session_id = session.id
+            bot_message.session_id = session.id
+            logger.info(f"Created new session {session.id} for user {session.user_id}")
+        db.add_all([user_message, bot_message])
+
+    await db.commit()
+    return [bot_message for _, _, bot_message in staged]
+
+
+class TurnWriter:
+    """
+    Write-behind buffer for chat turns (group commit).
+
+    Turns from concurrent requests are collected for up to max_delay seconds
+    (or max_batch turns) and committed in one transaction. Each request still
+    waits for its own commit before answering, so nothing acknowledged is
+    lost on a crash and responses keep their database IDs.
+    """
+
+    def __init__(self, max_batch: int = 50, max_delay: float = 0.01):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        # Items are (turn, future); None stops the writer
+        self._queue: "asyncio.Queue[Optional[Tuple[ChatTurn, asyncio.Future]]]" = (
+            asyncio.Queue()
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Turn writer started (batch {self.max_batch}, delay {self.max_delay}s)"
+        )
+
+    async def stop(self):
+        """Commits the turns already queued, then stops the writer."""
+        if self._task is None:
+            return
+        # Queued after every pending turn, so those are committed first
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def write(self, turn: ChatTurn) -> models.Message:
+        """Queues a turn and returns its bot message once committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((turn, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[ChatTurn, asyncio.Future]]):
+        try:
+            async with AsyncSessionLocal() as db:
+                messages = await write_turns(db, [turn for turn, _ in batch])
+            for (_, future), message in zip(batch, messages):
+                if not future.done():
+                    future.set_result(message)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Error writing chat turn: {str(e)}")
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            logger.warning(f"Batched turn write failed, retrying one by one: {str(e)}")
+
+        # One bad turn must not fail the others
+        for item in batch:
+            await self._commit([item])
+
+
+turn_writer = TurnWriter(
+    max_batch=settings.CHAT_WRITE_BATCH_SIZE,
+    max_delay=settings.CHAT_WRITE_DELAY_MS / 1000,
+)
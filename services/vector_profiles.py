@@ -0,0 +1,235 @@
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CollectionParamsDiff,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from core.config import settings
+from core.logging_config import logger
+
+# Bytes per HNSW link (point id) and Qdrant's default max links per node
+HNSW_LINK_BYTES = 4
+DEFAULT_HNSW_M = 16
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """How a collection stores and searches its dense vectors."""
+
+    # none | scalar (int8, 4x smaller) | binary (1 bit per dimension, 32x smaller)
+    quantization: str = "none"
+    # Keep quantized vectors in RAM even when the originals are on disk
+    quantization_always_ram: bool = True
+    # Candidates fetched with quantized vectors, as a multiple of the limit,
+    # then rescored with the original vectors
+    oversampling: float = 2.0
+    rescore: bool = True
+    hnsw_m: int = DEFAULT_HNSW_M
+    hnsw_ef_construct: int = 100
+    # Per-query search breadth; None uses Qdrant's default
+    hnsw_ef: Optional[int] = None
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    # Qdrant defaults: full-precision vectors and payloads in RAM
+    "default": CollectionProfile(),
+    # int8 vectors in RAM, originals on disk for rescoring: ~4x less vector RAM
+    "balanced": CollectionProfile(quantization="scalar", on_disk_vectors=True),
+    # Binary vectors in RAM, everything else on disk: ~32x less vector RAM.
+    # Works well for high-dimensional OpenAI-style embeddings.
+    "compact": CollectionProfile(
+        quantization="binary",
+        oversampling=3.0,
+        hnsw_m=12,
+        on_disk_vectors=True,
+        on_disk_payload=True,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    """
+    The named profile (QDRANT_PROFILE by default), with the search-time
+    overrides from Settings applied.
+    """
+    name = name or settings.QDRANT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown vector profile '{name}', expected one of {list(PROFILES)}")
+
+    profile = PROFILES[name]
+    if settings.QDRANT_HNSW_EF:
+        profile = replace(profile, hnsw_ef=settings.QDRANT_HNSW_EF)
+    if settings.QDRANT_OVERSAMPLING:
+        profile = replace(profile, oversampling=settings.QDRANT_OVERSAMPLING)
+    return profile
+
+
+@lru_cache(maxsize=1)
+def active_profile() -> CollectionProfile:
+    """The profile configured for this process."""
+    profile = get_profile()
+    logger.info(f"Vector profile '{settings.QDRANT_PROFILE}': {profile}")
+    return profile
+
+
+def _quantization_config(profile: CollectionProfile):
+    if profile.quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=profile.quantization_always_ram,
+            )
+        )
+    if profile.quantization == "binary":
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=profile.quantization_always_ram)
+        )
+    return None
+
+
+def dense_vector_params(profile: CollectionProfile, size: int) -> VectorParams:
+    return VectorParams(size=size, distance=Distance.COSINE, on_disk=profile.on_disk_vectors)
+
+
+def collection_options(profile: CollectionProfile) -> dict:
+    """create_collection arguments besides the vectors themselves."""
+    return {
+        "hnsw_config": HnswConfigDiff(
+            m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct
+        ),
+        "quantization_config": _quantization_config(profile),
+        "on_disk_payload": profile.on_disk_payload,
+    }
+
+
+def update_options(profile: CollectionProfile, vector_name: str) -> dict:
+    """
+    update_collection arguments that move an existing collection to profile.
+    vector_name is "" for collections with a single unnamed vector.
+    """
+    return {
+        "vectors_config": {
+            vector_name: VectorParamsDiff(on_disk=profile.on_disk_vectors)
+        },
+        "hnsw_config": HnswConfigDiff(
+            m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct
+        ),
+        "quantization_config": _quantization_config(profile) or Disabled.DISABLED,
+        "collection_params": CollectionParamsDiff(on_disk_payload=profile.on_disk_payload),
+    }
+
+
+def search_params(profile: CollectionProfile) -> Optional[SearchParams]:
+    """Per-query parameters for dense searches, or None for Qdrant defaults."""
+    quantization = None
+    if profile.quantization != "none":
+        quantization = QuantizationSearchParams(
+            rescore=profile.rescore, oversampling=profile.oversampling
+        )
+    if quantization is None and profile.hnsw_ef is None:
+        return None
+    return SearchParams(hnsw_ef=profile.hnsw_ef, quantization=quantization)
+
+
+def estimate_memory(points: int, dimensions: int, profile: CollectionProfile) -> dict:
+    """
+    Rough RAM estimate, in bytes, of a collection's dense vectors and HNSW
+    graph under profile. Payloads and sparse vectors are not included.
+    """
+    original = points * dimensions * 4
+    quantized = 0
+    if profile.quantization == "scalar":
+        quantized = points * dimensions
+    elif profile.quantization == "binary":
+        quantized = points * dimensions // 8
+
+    vectors_ram = 0 if profile.on_disk_vectors else original
+    if profile.quantization_always_ram or not profile.on_disk_vectors:
+        vectors_ram += quantized
+    # Level 0 holds up to 2*m links per point; upper levels add little
+    graph = points * profile.hnsw_m * 2 * HNSW_LINK_BYTES
+
+    return {
+        "vectors_ram": vectors_ram,
+        "vectors_disk": original if profile.on_disk_vectors else 0,
+        "hnsw_ram": graph,
+        "total_ram": vectors_ram + graph,
+    }
+
+
+def dense_vector_config(info, vector_name: str) -> Optional[VectorParams]:
+    """
+    The dense vector parameters of an existing collection. vector_name is
+    ignored for collections with a single unnamed vector.
+    """
+    vectors = info.config.params.vectors
+    return vectors.get(vector_name) if isinstance(vectors, dict) else vectors
+
+
+def profile_from_collection(info, vector_name: str) -> CollectionProfile:
+    """Reads the profile an existing collection is actually using."""
+    params = info.config.params
+    dense = dense_vector_config(info, vector_name)
+
+    quantization = "none"
+    always_ram = True
+    config = info.config.quantization_config
+    if isinstance(config, ScalarQuantization):
+        quantization = "scalar"
+        always_ram = bool(config.scalar.always_ram)
+    elif isinstance(config, BinaryQuantization):
+        quantization = "binary"
+        always_ram = bool(config.binary.always_ram)
+
+    hnsw = dense.hnsw_config if dense and dense.hnsw_config else info.config.hnsw_config
+    return CollectionProfile(
+        quantization=quantization,
+        quantization_always_ram=always_ram,
+        hnsw_m=hnsw.m if hnsw.m is not None else DEFAULT_HNSW_M,
+        hnsw_ef_construct=hnsw.ef_construct,
+        on_disk_vectors=bool(dense.on_disk) if dense else False,
+        on_disk_payload=bool(params.on_disk_payload),
+    )
+
+
+def measured_memory(telemetry, collection: str) -> Optional[dict]:
+    """
+    RAM and disk use, in bytes, that Qdrant reports for a collection's
+    segments in its telemetry (details_level 3 or more), summed over the
+    shards of the node that answered. None when the collection or the
+    figures are missing, as with servers that don't report them.
+    """
+    collections = getattr(telemetry.collections, "collections", None) or []
+    found = next((c for c in collections if getattr(c, "id", None) == collection), None)
+    if found is None:
+        return None
+
+    totals = {"ram": 0, "disk": 0, "vectors": 0}
+    reported = False
+    for shard in found.shards or []:
+        for segment in (shard.local.segments if shard.local else None) or []:
+            info = segment.info
+            if info.ram_usage_bytes is None or info.disk_usage_bytes is None:
+                continue
+            reported = True
+            totals["ram"] += info.ram_usage_bytes
+            totals["disk"] += info.disk_usage_bytes
+            totals["vectors"] += info.vectors_size_bytes or 0
+    return totals if reported else None
@@ -1,157 +1,590 @@
+import asyncio
+import hashlib
 import uuid
-from typing import List, Optional
-import requests
-import urllib3
-from tenacity import retry, stop_after_attempt, wait_exponential
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import numpy as np
+from fastapi import Depends
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
-    Distance,
-    VectorParams,
     PointStruct,
     Filter,
     FieldCondition,
     MatchValue,
+    Modifier,
+    PayloadSchemaType,
+    PayloadSelectorExclude,
+    PointIdsList,
+    QueryRequest,
+    SetPayload,
+    SetPayloadOperation,
+    SparseVectorParams,
 )
 
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import EMBEDDING_SECONDS, QDRANT_SECONDS
+from services.clients import SharedClients, get_clients
+from services.embedding_cache import get_embedding_cache
+from services.embedding_providers import EmbeddingProvider, create_embedding_provider
+from services.sparse_encoder import encode_document, encode_query
+from services.vector_profiles import (
+    active_profile,
+    collection_options,
+    dense_vector_config,
+    dense_vector_params,
+    search_params,
+)
+
+# Namespace of the deterministic point IDs
+POINT_ID_NAMESPACE = uuid.UUID("5b0f3c9e-2d4a-4f7e-9c1b-8a6d2e4f1c3a")
+
+# Named vectors of hybrid collections
+DENSE_VECTOR = "dense"
+SPARSE_VECTOR = "sparse"
+
+# Payload fields used in filters; each gets a payload index
+INDEXED_PAYLOAD_FIELDS = {"source": PayloadSchemaType.KEYWORD}
+
+# Points per page when scrolling payloads only
+SCROLL_PAGE_SIZE = 1000
+
+T = TypeVar("T")
+
 
-# Disable SSL warnings for development (remove in production)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+class _VectorServiceBase:
+    """I/O-free helpers shared by the sync and async vector services."""
 
+    # Whether each collection stores sparse vectors, read from its schema.
+    # reindex_collection.py can swap the collection behind a name for one
+    # with another schema: operations failing under the cached value read
+    # it again (see _with_schema).
+    _hybrid_collections: Dict[str, bool] = {}
 
-class VectorService:
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.openrouter_api_key = settings.OPENROUTER_API_KEY
+    def __init__(self, embedder: EmbeddingProvider):
+        self.embedder = embedder
         self.collection_name = settings.QDRANT_COLLECTION
+        self.embedding_cache = get_embedding_cache()
 
-        # Create session with SSL adapter for better connection handling
-        self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10, pool_maxsize=10, max_retries=3
-        )
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        with EMBEDDING_SECONDS.labels(provider=settings.EMBEDDING_PROVIDER).time():
+            return self.embedder.embed(batch)
+
+    async def _aembed_batch(self, batch: List[str]) -> List[List[float]]:
+        with EMBEDDING_SECONDS.labels(provider=settings.EMBEDDING_PROVIDER).time():
+            return await self.embedder.aembed(batch)
+
+    @staticmethod
+    def _batches(texts: List[str]) -> List[List[str]]:
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        return [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    @staticmethod
+    def _log_embedding_request(texts: List[str], batches: int, workers: int):
+        if len(texts) == 1:
+            logger.info(f"Generating embedding for text: {texts[0][:50]}...")
+        else:
+            logger.info(
+                f"Generating {len(texts)} embeddings in {batches} requests "
+                f"({workers} concurrent)"
+            )
+
+    @staticmethod
+    def _missing_texts(texts: List[str], cached: Dict[int, List[float]]) -> List[str]:
+        # Deduplicate misses so repeated chunks are embedded once
+        return list(dict.fromkeys(t for i, t in enumerate(texts) if i not in cached))
+
+    @staticmethod
+    def _merge_embeddings(
+        texts: List[str], cached: Dict[int, List[float]], fresh: Dict[str, List[float]]
+    ) -> List[List[float]]:
+        return [
+            cached[i] if i in cached else fresh[text] for i, text in enumerate(texts)
+        ]
+
+    @staticmethod
+    def collection_config() -> dict:
+        """create_collection arguments for a new collection (QDRANT_PROFILE)."""
+        profile = active_profile()
+        dense = dense_vector_params(profile, settings.EMBEDDING_DIMENSIONS)
+        options = collection_options(profile)
+        if not settings.HYBRID_SEARCH:
+            return {"vectors_config": dense, **options}
+
+        # Qdrant applies IDF to the sparse vectors, completing BM25 scoring
+        return {
+            **options,
+            "vectors_config": {DENSE_VECTOR: dense},
+            "sparse_vectors_config": {
+                SPARSE_VECTOR: SparseVectorParams(modifier=Modifier.IDF)
+            },
+        }
+
+    @staticmethod
+    def is_hybrid_collection(info) -> bool:
+        """Whether a collection, given its info, stores sparse vectors."""
+        return SPARSE_VECTOR in (info.config.params.sparse_vectors or {})
+
+    def _check_dimensions(self, info):
+        """Warns when the collection was built for another embedding size."""
+        dense = dense_vector_config(info, DENSE_VECTOR)
+        if dense is not None and dense.size != settings.EMBEDDING_DIMENSIONS:
+            logger.warning(
+                f"Collection '{self.collection_name}' stores {dense.size}-dimensional "
+                f"vectors but EMBEDDING_DIMENSIONS is {settings.EMBEDDING_DIMENSIONS}; "
+                f"run reindex_collection.py to migrate it"
+            )
+
+    @staticmethod
+    def _missing_payload_indexes(info) -> Dict[str, PayloadSchemaType]:
+        indexed = info.payload_schema or {}
+        return {
+            field: schema
+            for field, schema in INDEXED_PAYLOAD_FIELDS.items()
+            if field not in indexed
+        }
+
+    @staticmethod
+    def _point_id(doc: dict) -> str:
+        """
+        Deterministic ID from (source, content hash), so re-ingesting an
+        unchanged chunk maps onto the point that already holds it.
+        """
+        source = doc.get("metadata", {}).get("source")
+        if source is None:
+            return str(uuid.uuid4())
+        content_hash = hashlib.sha256(doc["text"].encode("utf-8")).hexdigest()
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source}\0{content_hash}"))
+
+    @classmethod
+    def _build_points(
+        cls, documents: List[dict], vectors: List[List[float]], hybrid: bool
+    ) -> List[PointStruct]:
+        return [
+            PointStruct(
+                id=cls._point_id(doc),
+                vector=(
+                    {DENSE_VECTOR: vector, SPARSE_VECTOR: encode_document(doc["text"])}
+                    if hybrid
+                    else vector
+                ),
+                payload={"text": doc["text"], **doc.get("metadata", {})},
+            )
+            for doc, vector in zip(documents, vectors)
+        ]
+
+    @staticmethod
+    def _source_filter(source: str) -> Filter:
+        return Filter(must=[FieldCondition(key="source", match=MatchValue(value=source))])
+
+    @classmethod
+    def _diff_source(
+        cls, documents: List[dict], existing: Dict[str, dict]
+    ) -> Tuple[List[dict], Dict[str, dict], List[str]]:
+        """
+        Compares a document's chunks with the points already stored for it.
+
+        Returns (chunks to embed, new metadata of kept points whose position
+        changed, IDs of points whose chunk no longer exists).
+        """
+        desired: Dict[str, dict] = {}
+        for doc in documents:
+            desired.setdefault(cls._point_id(doc), doc)
+
+        new_docs = [doc for point_id, doc in desired.items() if point_id not in existing]
+        moved = {
+            point_id: doc.get("metadata", {})
+            for point_id, doc in desired.items()
+            if point_id in existing and existing[point_id] != doc.get("metadata", {})
+        }
+        removed = [point_id for point_id in existing if point_id not in desired]
+        return new_docs, moved, removed
+
+    @staticmethod
+    def _payload_updates(moved: Dict[str, dict]) -> List[SetPayloadOperation]:
+        return [
+            SetPayloadOperation(set_payload=SetPayload(payload=metadata, points=[point_id]))
+            for point_id, metadata in moved.items()
+        ]
+
+    @staticmethod
+    def _query_requests(
+        vectors: List[List[float]],
+        texts: List[Optional[str]],
+        limit: int,
+        hybrid: bool,
+    ) -> List[QueryRequest]:
+        """
+        Builds the batched Qdrant requests for several queries.
+
+        On hybrid collections a query with text gets a dense and a sparse
+        request, each fetching HYBRID_PREFETCH times the limit for fusion.
+        Dense requests carry the profile's HNSW and quantization parameters.
+        """
+        params = search_params(active_profile())
+        if not hybrid:
+            return [
+                QueryRequest(query=vector, limit=limit, params=params, with_payload=True)
+                for vector in vectors
+            ]
+
+        prefetch = limit * settings.HYBRID_PREFETCH
+        requests = []
+        for vector, text in zip(vectors, texts):
+            if not text:
+                requests.append(
+                    QueryRequest(
+                        query=vector,
+                        using=DENSE_VECTOR,
+                        limit=limit,
+                        params=params,
+                        with_payload=True,
+                    )
+                )
+                continue
+            requests.append(
+                QueryRequest(
+                    query=vector,
+                    using=DENSE_VECTOR,
+                    limit=prefetch,
+                    params=params,
+                    with_payload=True,
+                )
+            )
+            # Dense vectors of sparse hits give them a comparable cosine score
+            requests.append(
+                QueryRequest(
+                    query=encode_query(text),
+                    using=SPARSE_VECTOR,
+                    limit=prefetch,
+                    with_payload=True,
+                    with_vector=[DENSE_VECTOR],
+                )
+            )
+        return requests
+
+    def _query_results(
+        self,
+        responses: list,
+        vectors: List[List[float]],
+        texts: List[Optional[str]],
+        limit: int,
+        hybrid: bool,
+    ) -> List[List[dict]]:
+        """Maps batched responses back to one result list per query."""
+        if not hybrid:
+            return [[self._search_result(p) for p in r.points] for r in responses]
+
+        results = []
+        position = 0
+        for vector, text in zip(vectors, texts):
+            if not text:
+                results.append(
+                    [self._search_result(p) for p in responses[position].points]
+                )
+                position += 1
+                continue
+            results.append(
+                self._fuse(
+                    responses[position].points,
+                    responses[position + 1].points,
+                    vector,
+                    limit,
+                )
+            )
+            position += 2
+        return results
+
+    @classmethod
+    def _fuse(
+        cls, dense_points: list, sparse_points: list, query_vector: List[float], limit: int
+    ) -> List[dict]:
+        """
+        Reciprocal rank fusion of the dense and sparse rankings.
+
+        Results are ordered by rrf_score; score stays the dense cosine
+        similarity so relevance thresholds keep their meaning.
+        """
+        k = settings.HYBRID_RRF_K
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        fused: Dict = {}
+
+        for rank, point in enumerate(dense_points, start=1):
+            entry = fused.setdefault(
+                point.id, {"point": point, "score": point.score, "rrf_score": 0.0}
+            )
+            entry["rrf_score"] += 1.0 / (k + rank)
+
+        for rank, point in enumerate(sparse_points, start=1):
+            entry = fused.get(point.id)
+            if entry is None:
+                dense = (point.vector or {}).get(DENSE_VECTOR)
+                score = 0.0
+                if dense:
+                    dense = np.asarray(dense, dtype=np.float32)
+                    score = float(
+                        query @ dense / (query_norm * (np.linalg.norm(dense) or 1.0))
+                    )
+                entry = fused[point.id] = {
+                    "point": point,
+                    "score": score,
+                    "rrf_score": 0.0,
+                }
+            entry["rrf_score"] += 1.0 / (k + rank)
+
+        ranked = sorted(fused.values(), key=lambda e: e["rrf_score"], reverse=True)
+        return [
+            {
+                **cls._search_result(entry["point"]),
+                "score": entry["score"],
+                "rrf_score": entry["rrf_score"],
+            }
+            for entry in ranked[:limit]
+        ]
+
+    @staticmethod
+    def _search_result(point) -> dict:
+        return {
+            "id": point.id,
+            "score": point.score,
+            "text": point.payload.get("text"),
+            "metadata": {k: v for k, v in point.payload.items() if k != "text"},
+        }
+
+    @staticmethod
+    def _document_result(point) -> dict:
+        return {
+            "id": point.id,
+            "text": point.payload.get("text"),
+            "metadata": {k: v for k, v in point.payload.items() if k != "text"},
+        }
+
+
+class VectorService(_VectorServiceBase):
+    """Blocking vector service, used by scripts such as ingest_document.py."""
+
+    def __init__(self, client: Optional[QdrantClient] = None):
+        super().__init__(create_embedding_provider())
+        # Benchmarks pass an in-memory QdrantClient(":memory:")
+        self.client = client or QdrantClient(url=settings.QDRANT_URL)
 
     def create_collection_if_not_exists(self):
         """Creates collection if it doesn't exist."""
         collections = self.client.get_collections().collections
         collection_names = [c.name for c in collections]
+        # reindex_collection.py serves the collection through an alias
+        collection_names += [a.alias_name for a in self.client.get_aliases().aliases]
 
         if self.collection_name not in collection_names:
             self.client.create_collection(
-                self.collection_name,
-                vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
+                self.collection_name, **self.collection_config()
             )
+            self._hybrid_collections[self.collection_name] = settings.HYBRID_SEARCH
             logger.info(f"Collection '{self.collection_name}' created")
         else:
             logger.info(f"Collection '{self.collection_name}' already exists")
 
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=2, min=4, max=30),
-        reraise=True,
-    )
-    def get_embedding(self, text: str) -> List[float]:
-        """Generates embedding using OpenRouter with retry logic."""
-        if not self.openrouter_api_key:
-            raise Exception("OPENROUTER_API_KEY not configured")
+        self.ensure_payload_indexes()
 
-        logger.info(f"Generating embedding for text: {text[:50]}...")
+    def ensure_payload_indexes(self):
+        """Indexes filtered payload fields so filters don't scan every point."""
+        info = self.client.get_collection(self.collection_name)
+        self._check_dimensions(info)
+        for field, schema in self._missing_payload_indexes(info).items():
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema,
+            )
+            logger.info(f"Created payload index on '{field}' in '{self.collection_name}'")
 
-        headers = {
-            "Authorization": f"Bearer {self.openrouter_api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8000",
-            "X-Title": "Document ChatBot",
-        }
+    def _is_hybrid(self) -> bool:
+        """Whether the current collection stores sparse vectors."""
+        if self.collection_name not in self._hybrid_collections:
+            info = self.client.get_collection(self.collection_name)
+            self._hybrid_collections[self.collection_name] = (
+                self.is_hybrid_collection(info)
+            )
+        return self._hybrid_collections[self.collection_name]
 
-        payload = {"model": "openai/text-embedding-3-small", "input": text}
+    def refresh_hybrid(self) -> bool:
+        """Reads the current collection's schema again, e.g. after an alias swap."""
+        self._hybrid_collections.pop(self.collection_name, None)
+        return self._is_hybrid()
 
+    def _with_schema(self, operation: Callable[[bool], T]) -> T:
+        """
+        Runs operation(hybrid) for the current collection. When it fails and
+        the schema changed since it was cached, retries once with the new one.
+        """
+        hybrid = self._is_hybrid()
         try:
-            response = self.session.post(
-                "https://openrouter.ai/api/v1/embeddings",
-                headers=headers,
-                json=payload,
-                timeout=60,
-                verify=True,
-            )
-            response.raise_for_status()
-        except requests.exceptions.SSLError as e:
-            logger.warning(f"SSL Error, retrying with verify=False: {str(e)}")
-            # Fallback without SSL verification (development only)
-            response = self.session.post(
-                "https://openrouter.ai/api/v1/embeddings",
-                headers=headers,
-                json=payload,
-                timeout=60,
-                verify=False,
-            )
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"OpenRouter request failed: {str(e)}")
-            raise Exception(f"OpenRouter error: {str(e)}")
-
-        return response.json()["data"][0]["embedding"]
+            return operation(hybrid)
+        except Exception:
+            if self.refresh_hybrid() == hybrid:
+                raise
+            logger.info(f"Collection '{self.collection_name}' changed schema, retrying")
+            return operation(not hybrid)
+
+    def get_embedding(self, text: str) -> List[float]:
+        """Embeds a text with the configured provider, served from cache when possible."""
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generates embeddings for many texts, preserving input order.
+
+        Cached texts are served from the embedding cache. The rest are grouped
+        into batches of EMBEDDING_BATCH_SIZE, with at most the provider's
+        max_concurrency batches in flight.
+        """
+        if not texts:
+            return []
+
+        cached = self.embedding_cache.get_many(texts) if self.embedding_cache else {}
+        missing = self._missing_texts(texts, cached)
+
+        fresh = {}
+        if missing:
+            fresh = dict(zip(missing, self._embed_uncached(missing)))
+            if self.embedding_cache:
+                self.embedding_cache.put_many(missing, [fresh[t] for t in missing])
+
+        return self._merge_embeddings(texts, cached, fresh)
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Calls the embedding provider for texts, batched and bounded in concurrency."""
+        batches = self._batches(texts)
+        workers = max(1, min(self.embedder.max_concurrency, len(batches)))
+        self._log_embedding_request(texts, len(batches), workers)
+
+        if workers == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() yields results in submission order
+                results = list(executor.map(self._embed_batch, batches))
+
+        return [vector for batch in results for vector in batch]
 
     def add_document(self, text: str, metadata: dict) -> str:
         """Adds a single document to the collection."""
+        documents = [{"text": text, "metadata": metadata}]
         vector = self.get_embedding(text)
 
-        # Use UUID instead of timestamp to avoid collisions
-        point_id = str(uuid.uuid4())
+        def upsert(hybrid: bool) -> PointStruct:
+            point = self._build_points(documents, [vector], hybrid)[0]
+            self.client.upsert(collection_name=self.collection_name, points=[point])
+            return point
 
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[
-                PointStruct(
-                    id=point_id, vector=vector, payload={"text": text, **metadata}
-                )
-            ],
-        )
+        point = self._with_schema(upsert)
 
-        logger.info(f"Added document with ID: {point_id}")
-        return point_id
+        logger.info(f"Added document with ID: {point.id}")
+        return str(point.id)
 
     def add_documents_batch(self, documents: List[dict]) -> List[str]:
         """Adds multiple documents to the collection."""
-        points = []
+        if not documents:
+            return []
+        vectors = self.get_embeddings([doc["text"] for doc in documents])
 
-        for doc in documents:
-            vector = self.get_embedding(doc["text"])
-            point_id = str(uuid.uuid4())  # Unique UUID per document
-            points.append(
-                PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload={"text": doc["text"], **doc.get("metadata", {})},
-                )
-            )
+        def upsert(hybrid: bool) -> List[PointStruct]:
+            points = self._build_points(documents, vectors, hybrid)
+            with QDRANT_SECONDS.labels(operation="upsert").time():
+                self.client.upsert(collection_name=self.collection_name, points=points)
+            return points
 
-        if points:
-            self.client.upsert(collection_name=self.collection_name, points=points)
-            logger.info(f"Indexed {len(points)} documents in batch")
+        points = self._with_schema(upsert)
+        logger.info(f"Indexed {len(points)} documents in batch")
 
         return [str(p.id) for p in points]
 
+    def _source_points(self, source: str) -> Dict[str, dict]:
+        """Metadata (payload without text) of every point of a source, by ID."""
+        points: Dict[str, dict] = {}
+        offset = None
+        while True:
+            results, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._source_filter(source),
+                limit=1000,
+                offset=offset,
+                with_payload=PayloadSelectorExclude(exclude=["text"]),
+                with_vectors=False,
+            )
+            points.update({str(r.id): r.payload or {} for r in results})
+            if offset is None:
+                return points
+
+    def sync_source(self, source: str, documents: List[dict]) -> dict:
+        """
+        Brings the points of a source in line with its current chunks.
+
+        Only new chunks are embedded and upserted, and only chunks that
+        vanished are deleted, after the upsert so the document is never
+        missing from the collection. Returns added/kept/removed counts.
+        """
+        existing = self._source_points(source)
+        new_docs, moved, removed = self._diff_source(documents, existing)
+
+        self.add_documents_batch(new_docs)
+        if moved:
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=self._payload_updates(moved),
+            )
+        if removed:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=removed),
+            )
+
+        counts = {
+            "added": len(new_docs),
+            "kept": len(existing) - len(removed),
+            "removed": len(removed),
+        }
+        logger.info(f"Synced source {source}: {counts}")
+        return counts
+
     def search(self, query: str, limit: int = 5) -> List[dict]:
         """Searches for similar documents."""
-        query_vector = self.get_embedding(query)
+        return self.search_vector(self.get_embedding(query), limit=limit, query_text=query)
 
-        results = self.client.query_points(
-            collection_name=self.collection_name, query=query_vector, limit=limit
-        ).points
+    def search_vector(
+        self, query_vector: List[float], limit: int = 5, query_text: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Searches for documents similar to an already embedded query.
 
-        return [
-            {
-                "id": r.id,
-                "score": r.score,
-                "text": r.payload.get("text"),
-                "metadata": {k: v for k, v in r.payload.items() if k != "text"},
-            }
-            for r in results
-        ]
+        With query_text on a hybrid collection, dense and sparse rankings are
+        fused; otherwise the search is dense-only.
+        """
+        return self._search_many([query_vector], [query_text], limit)[0]
+
+    def search_batch(self, queries: List[str], limit: int = 5) -> List[List[dict]]:
+        """
+        Searches several queries at once: one embeddings request and one
+        batched Qdrant query. Returns one result list per query, in order.
+        """
+        if not queries:
+            return []
+
+        return self._search_many(self.get_embeddings(queries), queries, limit)
+
+    def _search_many(
+        self, vectors: List[List[float]], texts: List[Optional[str]], limit: int
+    ) -> List[List[dict]]:
+        def query(hybrid: bool) -> List[List[dict]]:
+            with QDRANT_SECONDS.labels(operation="search").time():
+                responses = self.client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._query_requests(vectors, texts, limit, hybrid),
+                )
+            return self._query_results(responses, vectors, texts, limit, hybrid)
+
+        return self._with_schema(query)
 
     def get_all_documents(self, limit: int = 100, offset: str = None) -> List[dict]:
         """Gets all documents with optional pagination."""
@@ -159,34 +592,374 @@ class VectorService:
             collection_name=self.collection_name, limit=limit, offset=offset
         )[0]
 
-        return [
-            {
-                "id": r.id,
-                "text": r.payload.get("text"),
-                "metadata": {k: v for k, v in r.payload.items() if k != "text"},
-            }
-            for r in results
-        ]
+        return [self._document_result(r) for r in results]
+
+    def source_counts(self) -> Dict[str, int]:
+        """
+        Chunk count of every source in the collection: one scroll reading
+        only the source field, then an exact indexed count per source.
+        """
+        sources = set()
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["source"],
+                with_vectors=False,
+            )
+            sources.update(r.payload.get("source") for r in records)
+            if offset is None:
+                break
+        sources.discard(None)
+
+        return {
+            source: self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self._source_filter(source),
+                exact=True,
+            ).count
+            for source in sorted(sources)
+        }
 
     def delete_by_source(self, source: str) -> int:
         """Deletes documents by source filename using Qdrant filters."""
-        filter_condition = Filter(
-            must=[FieldCondition(key="source", match=MatchValue(value=source))]
-        )
+        filter_condition = self._source_filter(source)
 
-        # First count how many documents match
-        results = self.client.scroll(
+        # Exact count from the payload index; the filtered delete has no cap
+        count = self.client.count(
             collection_name=self.collection_name,
-            scroll_filter=filter_condition,
-            limit=10000,
+            count_filter=filter_condition,
+            exact=True,
+        ).count
+
+        if count > 0:
+            self.client.delete(
+                collection_name=self.collection_name, points_selector=filter_condition
+            )
+            logger.info(f"Deleted {count} documents from source: {source}")
+
+        return count
+
+
+class AsyncVectorService(_VectorServiceBase):
+    """
+    Non-blocking vector service for request handlers.
+
+    Mirrors VectorService on top of the app-wide httpx.AsyncClient and
+    AsyncQdrantClient, so waiting on OpenRouter or Qdrant yields the event
+    loop and connections are reused across requests.
+    """
+
+    def __init__(self, clients: SharedClients):
+        super().__init__(clients.embeddings)
+        self.client = clients.qdrant
+
+    async def create_collection_if_not_exists(self):
+        """Creates collection if it doesn't exist."""
+        collections = (await self.client.get_collections()).collections
+        collection_names = [c.name for c in collections]
+        # reindex_collection.py serves the collection through an alias
+        aliases = (await self.client.get_aliases()).aliases
+        collection_names += [a.alias_name for a in aliases]
+
+        if self.collection_name not in collection_names:
+            await self.client.create_collection(
+                self.collection_name, **self.collection_config()
+            )
+            self._hybrid_collections[self.collection_name] = settings.HYBRID_SEARCH
+            logger.info(f"Collection '{self.collection_name}' created")
+        else:
+            logger.info(f"Collection '{self.collection_name}' already exists")
+
+        await self.ensure_payload_indexes()
+
+    async def ensure_payload_indexes(self):
+        """Indexes filtered payload fields so filters don't scan every point."""
+        info = await self.client.get_collection(self.collection_name)
+        self._check_dimensions(info)
+        for field, schema in self._missing_payload_indexes(info).items():
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema,
+            )
+            logger.info(f"Created payload index on '{field}' in '{self.collection_name}'")
+
+    async def _is_hybrid(self) -> bool:
+        """Whether the current collection stores sparse vectors."""
+        if self.collection_name not in self._hybrid_collections:
+            info = await self.client.get_collection(self.collection_name)
+            self._hybrid_collections[self.collection_name] = (
+                self.is_hybrid_collection(info)
+            )
+        return self._hybrid_collections[self.collection_name]
+
+    async def refresh_hybrid(self) -> bool:
+        """Reads the current collection's schema again, e.g. after an alias swap."""
+        self._hybrid_collections.pop(self.collection_name, None)
+        return await self._is_hybrid()
+
+    async def _with_schema(self, operation: Callable[[bool], Awaitable[T]]) -> T:
+        """See VectorService._with_schema."""
+        hybrid = await self._is_hybrid()
+        try:
+            return await operation(hybrid)
+        except Exception:
+            if await self.refresh_hybrid() == hybrid:
+                raise
+            logger.info(f"Collection '{self.collection_name}' changed schema, retrying")
+            return await operation(not hybrid)
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Embeds a text with the configured provider, served from cache when possible."""
+        return (await self.get_embeddings([text]))[0]
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generates embeddings for many texts, preserving input order."""
+        if not texts:
+            return []
+
+        # The cache is backed by SQLite; keep its disk reads off the event loop
+        cached = (
+            await asyncio.to_thread(self.embedding_cache.get_many, texts)
+            if self.embedding_cache
+            else {}
+        )
+        missing = self._missing_texts(texts, cached)
+
+        fresh = {}
+        if missing:
+            fresh = dict(zip(missing, await self._embed_uncached(missing)))
+            if self.embedding_cache:
+                await asyncio.to_thread(
+                    self.embedding_cache.put_many, missing, [fresh[t] for t in missing]
+                )
+
+        return self._merge_embeddings(texts, cached, fresh)
+
+    async def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Calls the embedding provider for texts, batched and bounded in concurrency."""
+        batches = self._batches(texts)
+        workers = max(1, min(self.embedder.max_concurrency, len(batches)))
+        self._log_embedding_request(texts, len(batches), workers)
+
+        semaphore = asyncio.Semaphore(workers)
+
+        async def request(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        # gather() returns results in submission order
+        results = await asyncio.gather(*(request(batch) for batch in batches))
+
+        return [vector for batch in results for vector in batch]
+
+    async def add_document(self, text: str, metadata: dict) -> str:
+        """Adds a single document to the collection."""
+        documents = [{"text": text, "metadata": metadata}]
+        vector = await self.get_embedding(text)
+
+        async def upsert(hybrid: bool) -> PointStruct:
+            point = self._build_points(documents, [vector], hybrid)[0]
+            await self.client.upsert(
+                collection_name=self.collection_name, points=[point]
+            )
+            return point
+
+        point = await self._with_schema(upsert)
+
+        logger.info(f"Added document with ID: {point.id}")
+        return str(point.id)
+
+    async def add_documents_batch(self, documents: List[dict]) -> List[str]:
+        """Adds multiple documents to the collection."""
+        if not documents:
+            return []
+        vectors = await self.get_embeddings([doc["text"] for doc in documents])
+
+        async def upsert(hybrid: bool) -> List[PointStruct]:
+            points = self._build_points(documents, vectors, hybrid)
+            with QDRANT_SECONDS.labels(operation="upsert").time():
+                await self.client.upsert(
+                    collection_name=self.collection_name, points=points
+                )
+            return points
+
+        points = await self._with_schema(upsert)
+        logger.info(f"Indexed {len(points)} documents in batch")
+
+        return [str(p.id) for p in points]
+
+    async def _source_points(self, source: str) -> Dict[str, dict]:
+        """Metadata (payload without text) of every point of a source, by ID."""
+        points: Dict[str, dict] = {}
+        offset = None
+        while True:
+            results, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._source_filter(source),
+                limit=1000,
+                offset=offset,
+                with_payload=PayloadSelectorExclude(exclude=["text"]),
+                with_vectors=False,
+            )
+            points.update({str(r.id): r.payload or {} for r in results})
+            if offset is None:
+                return points
+
+    async def sync_source(
+        self,
+        source: str,
+        documents: List[dict],
+        on_progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> dict:
+        """
+        Brings the points of a source in line with its current chunks.
+
+        Only new chunks are embedded and upserted, and only chunks that
+        vanished are deleted, after the upsert so the document is never
+        missing from the collection. on_progress(embedded, to_embed) is
+        awaited after each slice of new chunks. Returns added/kept/removed
+        counts.
+        """
+        existing = await self._source_points(source)
+        new_docs, moved, removed = self._diff_source(documents, existing)
+
+        step = max(1, settings.EMBEDDING_BATCH_SIZE * self.embedder.max_concurrency)
+        embedded = 0
+        if on_progress:
+            await on_progress(embedded, len(new_docs))
+        for start in range(0, len(new_docs), step):
+            embedded += len(await self.add_documents_batch(new_docs[start : start + step]))
+            if on_progress:
+                await on_progress(embedded, len(new_docs))
+
+        if moved:
+            await self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=self._payload_updates(moved),
+            )
+        if removed:
+            await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=removed),
+            )
+
+        counts = {
+            "added": len(new_docs),
+            "kept": len(existing) - len(removed),
+            "removed": len(removed),
+        }
+        logger.info(f"Synced source {source}: {counts}")
+        return counts
+
+    async def search(self, query: str, limit: int = 5) -> List[dict]:
+        """Searches for similar documents."""
+        return await self.search_vector(
+            await self.get_embedding(query), limit=limit, query_text=query
+        )
+
+    async def search_vector(
+        self, query_vector: List[float], limit: int = 5, query_text: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Searches for documents similar to an already embedded query.
+
+        With query_text on a hybrid collection, dense and sparse rankings are
+        fused; otherwise the search is dense-only.
+        """
+        return (await self._search_many([query_vector], [query_text], limit))[0]
+
+    async def search_batch(self, queries: List[str], limit: int = 5) -> List[List[dict]]:
+        """
+        Searches several queries at once: one embeddings request and one
+        batched Qdrant query. Returns one result list per query, in order.
+        """
+        if not queries:
+            return []
+
+        return await self._search_many(await self.get_embeddings(queries), queries, limit)
+
+    async def _search_many(
+        self, vectors: List[List[float]], texts: List[Optional[str]], limit: int
+    ) -> List[List[dict]]:
+        async def query(hybrid: bool) -> List[List[dict]]:
+            with QDRANT_SECONDS.labels(operation="search").time():
+                responses = await self.client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=self._query_requests(vectors, texts, limit, hybrid),
+                )
+            return self._query_results(responses, vectors, texts, limit, hybrid)
+
+        return await self._with_schema(query)
+
+    async def get_all_documents(
+        self, limit: int = 100, offset: Optional[str] = None
+    ) -> List[dict]:
+        """Gets all documents with optional pagination."""
+        results = (
+            await self.client.scroll(
+                collection_name=self.collection_name, limit=limit, offset=offset
+            )
         )[0]
 
-        count = len(results)
+        return [self._document_result(r) for r in results]
+
+    async def source_counts(self) -> Dict[str, int]:
+        """
+        Chunk count of every source in the collection: one scroll reading
+        only the source field, then an exact indexed count per source.
+        """
+        sources = set()
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                limit=SCROLL_PAGE_SIZE,
+                offset=offset,
+                with_payload=["source"],
+                with_vectors=False,
+            )
+            sources.update(r.payload.get("source") for r in records)
+            if offset is None:
+                break
+        sources.discard(None)
+
+        counts = {}
+        for source in sorted(sources):
+            counts[source] = (
+                await self.client.count(
+                    collection_name=self.collection_name,
+                    count_filter=self._source_filter(source),
+                    exact=True,
+                )
+            ).count
+        return counts
+
+    async def delete_by_source(self, source: str) -> int:
+        """Deletes documents by source filename using Qdrant filters."""
+        filter_condition = self._source_filter(source)
+
+        # Exact count from the payload index; the filtered delete has no cap
+        count = (
+            await self.client.count(
+                collection_name=self.collection_name,
+                count_filter=filter_condition,
+                exact=True,
+            )
+        ).count
 
         if count > 0:
-            self.client.delete(
+            await self.client.delete(
                 collection_name=self.collection_name, points_selector=filter_condition
             )
             logger.info(f"Deleted {count} documents from source: {source}")
 
         return count
+
+
+def get_vector_service(clients: SharedClients = Depends(get_clients)) -> AsyncVectorService:
+    """FastAPI dependency returning an AsyncVectorService over the shared clients."""
+    return AsyncVectorService(clients)
@@ -0,0 +1,199 @@
+"""
+Shared fixtures. Tests run offline: embeddings come from the fake provider,
+token counts are estimated from text length instead of a downloaded
+tokenizer, Qdrant runs in memory and the database is a throwaway SQLite file.
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+import warnings
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List, Optional
+
+# Before anything reads the settings
+_DATA_DIR = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ["EMBEDDING_PROVIDER"] = "fake"
+os.environ["EMBEDDING_TOKENIZER"] = "estimate"
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_DATA_DIR}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from db import models
+from db.database import SessionLocal, async_engine, engine
+from services.answer_cache import SemanticAnswerCache
+from services.document_processor import DocumentProcessor
+from services.embedding_cache import EmbeddingCache
+from services.embedding_providers import create_embedding_provider
+from services.ingest_service import JOB_QUEUED, IngestQueue
+from services.turn_writer import ChatTurn
+from services.vector_service import AsyncVectorService, VectorService
+
+# The in-memory Qdrant warns that payload indexes have no effect
+warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    """A database session, closed after the test."""
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def collection() -> str:
+    """A collection name no other test uses."""
+    return f"test_{uuid.uuid4().hex}"
+
+
+@pytest.fixture
+def run_async():
+    """Runs a coroutine on a new event loop; async connections don't outlive it."""
+
+    def run(coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await async_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def user_id() -> int:
+    """ID of a new user."""
+    db = SessionLocal()
+    try:
+        name = uuid.uuid4().hex
+        user = models.User(email=f"{name}@example.com", username=name, hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def make_turn(user_id):
+    """Builds a chat turn of the user_id user."""
+
+    def make(question: str, session_id: Optional[int] = None) -> ChatTurn:
+        return ChatTurn(
+            user_id=user_id,
+            session_id=session_id,
+            question=question,
+            asked_at=datetime.utcnow(),
+            answer=f"answer to {question}",
+        )
+
+    return make
+
+
+@pytest.fixture
+def ingest_job(user_id) -> str:
+    """ID of a new queued ingest job of the user_id user."""
+    job = IngestQueue._insert_job(
+        models.IngestJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            filename="doc.pdf",
+            file_path="documents/doc.pdf",
+            collection="test",
+            status=JOB_QUEUED,
+            created_at=datetime.utcnow(),
+        )
+    )
+    return job.id
+
+
+@pytest.fixture
+def processor() -> DocumentProcessor:
+    """Small chunks, so a few sentences span several of them."""
+    return DocumentProcessor(chunk_size=64, overlap=20, extraction_workers=1)
+
+
+@pytest.fixture
+def answer_cache() -> SemanticAnswerCache:
+    """Room for two answers per collection, to exercise eviction."""
+    return SemanticAnswerCache(max_distance=0.05, ttl=3600, max_entries=2)
+
+
+@pytest.fixture
+def make_embedding_cache(tmp_path):
+    """Builds EmbeddingCaches on one SQLite file, as restarts would reopen it."""
+
+    def make(model: str = "model-a", **limits) -> EmbeddingCache:
+        return EmbeddingCache(path=str(tmp_path / "embeddings.db"), model=model, **limits)
+
+    return make
+
+
+@pytest.fixture
+def make_point():
+    """Builds a scored point as Qdrant queries return them."""
+
+    def make(point_id: str, score: float = 0.0, vector=None):
+        payload = {"text": point_id, "source": "a.pdf"}
+        return SimpleNamespace(id=point_id, score=score, vector=vector, payload=payload)
+
+    return make
+
+
+@pytest.fixture
+def make_chunk():
+    """Builds a search result as the context packer receives them."""
+
+    def make(text: str, source: str, index: int, score: float) -> dict:
+        metadata = {"source": source, "chunk_index": index}
+        return {"text": text, "metadata": metadata, "score": score}
+
+    return make
+
+
+@pytest.fixture
+def make_docs():
+    """Builds a source's chunks as the document processor yields them."""
+
+    def make(source: str, texts: List[str]) -> List[dict]:
+        return [
+            {"text": text, "metadata": {"source": source, "chunk_index": i}}
+            for i, text in enumerate(texts)
+        ]
+
+    return make
+
+
+@pytest.fixture
+def vector_service(collection) -> VectorService:
+    """A VectorService on a fresh in-memory collection."""
+    service = VectorService(client=QdrantClient(":memory:"))
+    service.collection_name = collection
+    service.create_collection_if_not_exists()
+    return service
+
+
+@pytest.fixture
+def async_vector_service(collection) -> AsyncVectorService:
+    """An AsyncVectorService on the same fresh collection name, in memory."""
+    clients = SimpleNamespace(
+        qdrant=AsyncQdrantClient(":memory:"), embeddings=create_embedding_provider()
+    )
+    service = AsyncVectorService(clients)
+    service.collection_name = collection
+    return service
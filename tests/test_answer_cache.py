@@ -0,0 +1,42 @@
+def test_serves_answers_to_similar_queries_only(answer_cache):
+    answer_cache.store("docs", [1.0, 0.0], "cached")
+
+    assert answer_cache.lookup("docs", [0.99, 0.01]) == "cached"
+    assert answer_cache.lookup("docs", [0.0, 1.0]) is None
+    assert answer_cache.lookup("other", [1.0, 0.0]) is None
+
+
+def test_invalidate_drops_a_collection(answer_cache):
+    answer_cache.store("docs", [1.0, 0.0], "cached")
+    answer_cache.store("other", [1.0, 0.0], "kept")
+    answer_cache.invalidate("docs")
+
+    assert answer_cache.lookup("docs", [1.0, 0.0]) is None
+    assert answer_cache.lookup("other", [1.0, 0.0]) == "kept"
+
+
+def test_newer_generation_drops_cached_answers(answer_cache):
+    answer_cache.store("docs", [1.0, 0.0], "old", generation=1)
+
+    assert answer_cache.lookup("docs", [1.0, 0.0], generation=1) == "old"
+    assert answer_cache.lookup("docs", [1.0, 0.0], generation=2) is None
+    # Gone for lookups of any generation once dropped
+    assert answer_cache.lookup("docs", [1.0, 0.0], generation=1) is None
+
+
+def test_answers_from_an_older_generation_are_not_stored(answer_cache):
+    answer_cache.store("docs", [1.0, 0.0], "new", generation=3)
+    answer_cache.store("docs", [0.0, 1.0], "stale", generation=2)
+
+    assert answer_cache.lookup("docs", [0.0, 1.0], generation=3) is None
+    assert answer_cache.lookup("docs", [1.0, 0.0], generation=3) == "new"
+
+
+def test_least_recently_used_answers_are_evicted(answer_cache):
+    answer_cache.store("docs", [1.0, 0.0, 0.0], "a")
+    answer_cache.store("docs", [0.0, 1.0, 0.0], "b")
+    answer_cache.lookup("docs", [1.0, 0.0, 0.0])
+    answer_cache.store("docs", [0.0, 0.0, 1.0], "c")
+
+    assert answer_cache.lookup("docs", [1.0, 0.0, 0.0]) == "a"
+    assert answer_cache.lookup("docs", [0.0, 1.0, 0.0]) is None
@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks.run import compare, spread, tolerance
+
+
+def test_spread_is_relative_to_the_median():
+    assert spread([1.0, 1.0, 1.0]) == 0.0
+    assert spread([0.9, 1.0, 1.1]) == pytest.approx(0.14826)
+
+
+def test_noisy_benchmarks_get_more_tolerance():
+    baseline = {"throughput": 100.0, "peak_bytes": 1000, "spread": 0.06}
+    result = {"throughput": 75.0, "peak_bytes": 1000, "spread": 0.08}
+
+    assert tolerance(result, baseline, 0.2) == pytest.approx(0.4)
+    assert compare({"pdf": result}, {"pdf": baseline}, 0.2) == []
+    steady = {**result, "spread": 0.0}
+    assert compare({"pdf": steady}, {"pdf": {**baseline, "spread": 0.0}}, 0.2) == [
+        "pdf"
+    ]
@@ -0,0 +1,59 @@
+from services.context_packer import ContextPacker
+from services.tokenizer import count_tokens
+
+FIRST = "Vector databases store embeddings. They answer nearest neighbour queries quickly."
+# Starts with the last sentence of FIRST, as overlapping chunks do
+SECOND = "They answer nearest neighbour queries quickly. Filters narrow the candidates."
+OTHER = "Rate limits protect the API from clients sending too many requests at once."
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap(make_chunk):
+    passages, stats = ContextPacker(token_budget=1000).pack(
+        [make_chunk(SECOND, "a.pdf", 1, 0.9), make_chunk(FIRST, "a.pdf", 0, 0.8)]
+    )
+
+    assert len(passages) == 1
+    assert passages[0]["text"] == (
+        "Vector databases store embeddings. They answer nearest neighbour queries "
+        "quickly. Filters narrow the candidates."
+    )
+    assert passages[0]["score"] == 0.9
+    assert stats["tokens_saved"] > 0
+
+
+def test_passages_follow_document_order(make_chunk):
+    passages, _ = ContextPacker(token_budget=1000).pack(
+        [
+            make_chunk(OTHER, "b.pdf", 0, 0.95),
+            make_chunk(SECOND, "a.pdf", 3, 0.9),
+            make_chunk(FIRST, "a.pdf", 0, 0.8),
+        ]
+    )
+    # Not adjacent (0 and 3), so not merged
+    assert [(p["source"], p["last_index"]) for p in passages] == [
+        ("a.pdf", 0),
+        ("a.pdf", 3),
+        ("b.pdf", 0),
+    ]
+
+
+def test_near_duplicates_are_dropped(make_chunk):
+    passages, stats = ContextPacker(token_budget=1000, duplicate_similarity=0.9).pack(
+        [make_chunk(FIRST, "a.pdf", 0, 0.9), make_chunk(FIRST + " ", "copy.pdf", 5, 0.7)]
+    )
+    assert [p["source"] for p in passages] == ["a.pdf"]
+    assert stats["duplicates_dropped"] == 1
+
+
+def test_best_chunks_are_kept_within_the_budget(make_chunk):
+    budget = count_tokens(OTHER) + count_tokens(FIRST)
+    passages, stats = ContextPacker(token_budget=budget).pack(
+        [
+            make_chunk(FIRST, "a.pdf", 0, 0.5),
+            make_chunk(SECOND, "c.pdf", 7, 0.6),
+            make_chunk(OTHER, "b.pdf", 0, 0.9),
+        ]
+    )
+    assert [p["source"] for p in passages] == ["b.pdf", "c.pdf"]
+    assert stats["over_budget_dropped"] == 1
+    assert stats["tokens_out"] <= budget
@@ -0,0 +1,98 @@
+from db.database import SessionLocal
+from services.document_catalog import DocumentCatalog, backfill_if_empty
+
+
+def test_generation_starts_at_zero_and_counts_bumps(db, collection):
+    catalog = DocumentCatalog(db)
+    assert catalog.generation(collection) == 0
+
+    catalog.bump_generation(collection)
+    catalog.bump_generation(collection)
+    assert catalog.generation(collection) == 2
+
+
+def test_generations_are_per_collection(db, collection):
+    catalog = DocumentCatalog(db)
+    catalog.bump_generation(collection)
+    assert catalog.generation(f"{collection}_other") == 0
+
+
+def test_bumps_are_seen_by_other_sessions(db, collection):
+    DocumentCatalog(db).bump_generation(collection)
+    other = SessionLocal()
+    try:
+        assert DocumentCatalog(other).generation(collection) == 1
+    finally:
+        other.close()
+
+
+def test_record_creates_then_refreshes_one_entry(db, collection):
+    catalog = DocumentCatalog(db)
+    first = catalog.record(collection, "a.pdf", 3, byte_size=10, content_hash="h1")
+    second = catalog.record(collection, "a.pdf", 5, byte_size=20, content_hash="h2")
+
+    assert second.id == first.id
+    documents, _ = catalog.list(collection)
+    assert [(d.chunk_count, d.content_hash) for d in documents] == [(5, "h2")]
+
+
+def test_record_updates_an_entry_created_by_a_concurrent_ingest(
+    monkeypatch, db, collection
+):
+    rival = SessionLocal()
+    try:
+        DocumentCatalog(rival).record(collection, "a.pdf", 1, 1, "rival")
+    finally:
+        rival.close()
+    # Our update ran before the rival's insert committed and matched nothing
+    record_statement = DocumentCatalog.record_statement
+    calls = []
+
+    def racing_statement(collection_, source, values):
+        calls.append(source)
+        return record_statement(
+            collection_, source if len(calls) > 1 else "missing.pdf", values
+        )
+
+    monkeypatch.setattr(
+        DocumentCatalog, "record_statement", staticmethod(racing_statement)
+    )
+
+    document = DocumentCatalog(db).record(collection, "a.pdf", 4, 8, "ours")
+
+    assert len(calls) == 2
+    assert (document.chunk_count, document.content_hash) == (4, "ours")
+    assert DocumentCatalog(db).list(collection)[0] == [document]
+
+
+def test_backfill_adds_unknown_sources_only(db, collection):
+    catalog = DocumentCatalog(db)
+    catalog.record(collection, "a.pdf", chunk_count=3, byte_size=10, content_hash="h")
+
+    assert catalog.backfill(collection, {"a.pdf": 7, "b.pdf": 2}) == 1
+    documents, _ = catalog.list(collection)
+    assert {(d.source, d.chunk_count) for d in documents} == {("a.pdf", 3), ("b.pdf", 2)}
+    assert catalog.backfill(collection, {"b.pdf": 2}) == 0
+
+
+def test_backfill_if_empty_fills_the_catalog_from_qdrant(
+    run_async, db, collection, async_vector_service, make_docs
+):
+    async def scenario():
+        await async_vector_service.create_collection_if_not_exists()
+        await async_vector_service.sync_source("a.pdf", make_docs("a.pdf", ["one", "two"]))
+        await async_vector_service.sync_source("b.pdf", make_docs("b.pdf", ["three"]))
+        return (
+            await backfill_if_empty(async_vector_service, collection),
+            await backfill_if_empty(async_vector_service, collection),
+        )
+
+    assert run_async(scenario()) == (2, 0)
+    documents, _ = DocumentCatalog(db).list(collection)
+    assert {(d.source, d.chunk_count) for d in documents} == {("a.pdf", 2), ("b.pdf", 1)}
+
+
+def test_backfill_if_empty_skips_a_missing_collection(
+    run_async, collection, async_vector_service
+):
+    assert run_async(backfill_if_empty(async_vector_service, collection)) == 0
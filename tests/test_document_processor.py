@@ -0,0 +1,77 @@
+from services.document_processor import ChunkValidator, DocumentProcessor
+from services.tokenizer import count_tokens
+
+SENTENCES = [
+    f"Sentence number {i} explains how retrieval finds the relevant passages."
+    for i in range(40)
+]
+
+
+def test_chunks_fit_the_token_size_and_keep_whole_sentences(processor):
+    chunks = processor.chunk_text(" ".join(SENTENCES))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_tokens(chunk) <= processor.chunk_size
+        assert chunk.startswith("Sentence number ")
+        assert chunk.endswith("passages.")
+
+
+def test_every_sentence_is_kept(processor):
+    text = " ".join(processor.chunk_text(" ".join(SENTENCES)))
+    for sentence in SENTENCES:
+        assert sentence in text
+
+
+def test_chunks_overlap_by_trailing_sentences(processor):
+    chunks = processor.chunk_text(" ".join(SENTENCES))
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.rsplit("Sentence number ", 1)[1]
+        assert current.startswith("Sentence number " + last_sentence)
+
+
+def test_no_overlap_when_disabled():
+    chunks = DocumentProcessor(chunk_size=64, overlap=0).chunk_text(" ".join(SENTENCES))
+    text = " ".join(chunks)
+    for sentence in SENTENCES:
+        assert text.count(sentence) == 1
+
+
+def test_chunks_close_at_paragraph_ends():
+    paragraphs = [" ".join(SENTENCES[i : i + 4]) for i in range(0, 12, 4)]
+    processor = DocumentProcessor(chunk_size=96, overlap=0)
+    chunks = processor.chunk_text("\n\n".join(paragraphs))
+    # Four sentences fill PARAGRAPH_FILL of a chunk; a fifth would still fit
+    assert chunks == paragraphs
+
+
+def test_chunks_report_the_page_they_start_on(processor):
+    pages = [(1, " ".join(SENTENCES[:10])), (2, " ".join(SENTENCES[10:20]))]
+    chunks = list(processor.iter_chunks(pages))
+
+    assert chunks[0][0] == 1
+    assert chunks[-1][0] == 2
+    for page, chunk in chunks:
+        first = int(chunk.split()[2])
+        assert page == (1 if first < 10 else 2)
+
+
+def test_long_sentences_are_split_on_token_boundaries(processor):
+    chunks = processor.chunk_text("word " * 400)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= processor.chunk_size for chunk in chunks)
+
+
+def test_validator_rejects_short_long_and_symbol_chunks():
+    max_length = ChunkValidator.max_length(64)
+    assert max_length == 64 * ChunkValidator.MAX_CHARS_PER_TOKEN
+
+    assert ChunkValidator.is_valid(SENTENCES[0], max_length)
+    assert not ChunkValidator.is_valid("Too short.", max_length)
+    assert not ChunkValidator.is_valid("-=" * 40, max_length)
+    assert not ChunkValidator.is_valid("a" * (max_length + 1), max_length)
+
+
+def test_processor_caps_chunk_length_from_its_token_size(processor):
+    assert processor.max_length == ChunkValidator.max_length(processor.chunk_size)
+    assert DocumentProcessor(chunk_size=600).max_length > ChunkValidator.max_length(256)
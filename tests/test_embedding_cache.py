@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import embedding_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable time seen by the cache."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_hits_survive_a_restart_with_the_same_model(make_embedding_cache):
+    make_embedding_cache().put_many(["a  text", "b"], [[1.0, 0.5], [2.0, 0.5]])
+
+    cache = make_embedding_cache()
+    assert cache.get_many(["a text", "b", "c"]) == {0: [1.0, 0.5], 1: [2.0, 0.5]}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_a_model_change_invalidates_the_store(make_embedding_cache):
+    make_embedding_cache("model-a").put("text", [1.0, 0.5])
+
+    cache = make_embedding_cache("model-b")
+    assert cache.get("text") is None
+    assert cache.stats()["disk_items"] == 0
+    # Switching back doesn't resurrect the old vectors either
+    assert make_embedding_cache("model-a").get("text") is None
+
+
+def test_memory_tier_evicts_the_least_recently_used(make_embedding_cache):
+    cache = make_embedding_cache(memory_items=2)
+    cache.put_many(["a", "b"], [[1.0], [2.0]])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert list(cache._memory) == [cache.make_key("a"), cache.make_key("c")]
+    # Still on disk
+    assert cache.get("b") == [2.0]
+
+
+def test_disk_tier_evicts_the_least_recently_accessed(make_embedding_cache, clock):
+    cache = make_embedding_cache(memory_items=1, max_items=10)
+    for i in range(10):
+        clock.value += 1
+        cache.put(f"text {i}", [float(i)])
+    clock.value += 1
+    assert cache.get("text 0") == [0.0]
+
+    # Over the limit: the two oldest accesses go (one extra for headroom)
+    clock.value += 1
+    cache.put("text 10", [10.0])
+
+    assert cache.stats()["disk_items"] == 9
+    assert cache.get_many([f"text {i}" for i in range(11)]).keys() == (
+        {0} | set(range(3, 11))
+    )
+
+
+def test_disk_hits_update_recency_without_writing_until_flushed(
+    make_embedding_cache, clock
+):
+    cache = make_embedding_cache(memory_items=1)
+    cache.put_many(["a", "b"], [[1.0], [2.0]])
+    changes = cache._conn.total_changes
+
+    clock.value += 1
+    assert cache.get("a") == [1.0]
+    assert cache._conn.total_changes == changes
+
+    clock.value += embedding_cache.ACCESS_FLUSH_SECONDS
+    assert cache.get("b") == [2.0]
+    assert cache._conn.total_changes == changes + 2
+    accessed = dict(cache._conn.execute("SELECT key, accessed_at FROM embeddings"))
+    assert accessed[cache.make_key("a")] == 1001.0
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from services.embedding_providers import EmbeddingProvider, FakeEmbeddingProvider
+
+
+def test_fake_embeddings_are_deterministic_unit_vectors():
+    provider = FakeEmbeddingProvider(dimensions=32)
+    first, second = provider.embed(["dense vectors", "dense vectors"])
+
+    assert len(first) == 32
+    assert first == second
+    assert np.linalg.norm(first) == pytest.approx(1.0)
+    assert FakeEmbeddingProvider(dimensions=32).embed(["dense vectors"])[0] == first
+
+
+def test_fake_embeddings_of_texts_sharing_words_are_close():
+    provider = FakeEmbeddingProvider(dimensions=64)
+    query, related, unrelated = np.asarray(
+        provider.embed(["hash passwords", "bcrypt hashes passwords", "sparse vectors"])
+    )
+    assert query @ related > query @ unrelated
+
+
+def test_providers_must_implement_embed():
+    class Incomplete(EmbeddingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import models
+from services.ingest_service import (
+    JOB_EMBEDDING,
+    JOB_EXTRACTING,
+    JOB_QUEUED,
+    IngestQueue,
+    LeaseLost,
+)
+
+LEASE_SECONDS = 60
+
+
+def _job(db, job_id: str) -> models.IngestJob:
+    return db.get(models.IngestJob, job_id, populate_existing=True)
+
+
+def _expire_lease(db, job_id: str):
+    job = _job(db, job_id)
+    job.updated_at = datetime.utcnow() - timedelta(seconds=LEASE_SECONDS + 1)
+    db.commit()
+
+
+def test_a_job_is_claimed_by_one_process_only(db, ingest_job):
+    first = IngestQueue(lease_seconds=LEASE_SECONDS)
+    second = IngestQueue(lease_seconds=LEASE_SECONDS)
+
+    lease = first._claim_job(ingest_job)
+    assert lease is not None
+    assert second._claim_job(ingest_job) is None
+    job = _job(db, ingest_job)
+    assert (job.status, job.claimed_by) == (JOB_EXTRACTING, lease)
+    # A running job with a fresh lease isn't offered to the sweep
+    assert ingest_job not in second._claimable_job_ids()
+
+
+def test_an_expired_lease_is_reclaimed_and_the_old_owner_stops(
+    run_async, db, ingest_job
+):
+    stalled = IngestQueue(lease_seconds=LEASE_SECONDS)
+    other = IngestQueue(lease_seconds=LEASE_SECONDS)
+    old_lease = stalled._claim_job(ingest_job)
+
+    _expire_lease(db, ingest_job)
+    assert ingest_job in other._claimable_job_ids()
+    new_lease = other._claim_job(ingest_job)
+    assert new_lease not in (None, old_lease)
+
+    # The stalled process wakes up: its writes match no row
+    with pytest.raises(LeaseLost):
+        run_async(stalled._update_job(ingest_job, old_lease, status=JOB_EMBEDDING))
+    stalled._release_job(ingest_job, old_lease)
+    run_async(other._update_job(ingest_job, new_lease, chunks_total=3))
+
+    job = _job(db, ingest_job)
+    assert (job.status, job.claimed_by, job.chunks_total) == (
+        JOB_EXTRACTING,
+        new_lease,
+        3,
+    )
+
+
+def test_heartbeats_keep_the_lease(db, ingest_job):
+    queue = IngestQueue(lease_seconds=LEASE_SECONDS)
+    lease = queue._claim_job(ingest_job)
+    _expire_lease(db, ingest_job)
+
+    assert queue._write_job(ingest_job, lease, {})
+    assert ingest_job not in queue._claimable_job_ids()
+
+
+def test_a_released_job_can_be_claimed_again(db, ingest_job):
+    queue = IngestQueue(lease_seconds=LEASE_SECONDS)
+    lease = queue._claim_job(ingest_job)
+    queue._release_job(ingest_job, lease)
+
+    job = _job(db, ingest_job)
+    assert (job.status, job.claimed_by) == (JOB_QUEUED, None)
+    assert queue._claim_job(ingest_job) is not None
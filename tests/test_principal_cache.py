@@ -0,0 +1,46 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from core import security
+from core.principal_cache import PrincipalCache, principal_cache
+from db.database import AsyncSessionLocal
+from services.auth_service import AuthService
+
+
+def test_entries_from_an_older_revocation_generation_are_dropped(user_id):
+    cache = PrincipalCache()
+    principal = security.Principal(
+        id=user_id, email="a@b.c", username="u", is_active=True, created_at=None
+    )
+    cache.put("token", principal, time.time() + 60, generation=1)
+
+    assert cache.get(user_id, "token", generation=1) == principal
+    assert cache.get(user_id, "token", generation=2) is None
+    assert cache.get(user_id, "token", generation=1) is None
+
+
+def test_deactivation_reaches_caches_of_other_processes(
+    run_async, monkeypatch, user_id
+):
+    # Another worker's cache: deactivate_user can only clear this process's one
+    other_worker = PrincipalCache()
+    monkeypatch.setattr(security, "principal_cache", other_worker)
+    token = security.create_access_token({"user_id": user_id})
+
+    async def authenticate():
+        async with AsyncSessionLocal() as db:
+            return await security.get_current_user(token, db)
+
+    async def scenario():
+        principal = await authenticate()
+        assert other_worker.get(user_id, token, 0) == principal
+        async with AsyncSessionLocal() as db:
+            await AuthService(db).deactivate_user(user_id)
+        assert principal_cache is not other_worker
+        with pytest.raises(HTTPException) as error:
+            await authenticate()
+        return error.value.status_code
+
+    assert run_async(scenario()) == 401
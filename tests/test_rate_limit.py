@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import rate_limit
+from core.rate_limit import MemoryRateLimitBackend, RateLimitBackend
+
+WINDOW = 60
+LIMIT = 10
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable time seen by the rate limiter."""
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_allows_up_to_the_limit_within_a_window():
+    backend = MemoryRateLimitBackend(LIMIT, WINDOW, evict_interval=0)
+    state = None
+    remaining = []
+    for _ in range(LIMIT):
+        state, allowed, left = backend._decide(state, now=120.0)
+        assert allowed
+        remaining.append(left)
+
+    assert remaining == list(range(LIMIT - 1, -1, -1))
+    assert backend._decide(state, now=125.0)[1:] == (False, 0)
+
+
+def test_denied_requests_are_not_counted():
+    backend = MemoryRateLimitBackend(1, WINDOW, evict_interval=0)
+    state, allowed, _ = backend._decide(None, now=0.0)
+    assert allowed
+    denied_state, allowed, _ = backend._decide(state, now=1.0)
+    assert not allowed
+    assert denied_state == state
+
+
+def test_previous_window_is_weighted_by_its_overlap():
+    backend = MemoryRateLimitBackend(LIMIT, WINDOW, evict_interval=0)
+    # A full previous window, then halfway into the next one
+    state = (1, LIMIT, 0)
+    state, estimate = backend._slide(state, now=2 * WINDOW + WINDOW / 2)
+    assert state == (2, 0, LIMIT)
+    assert estimate == pytest.approx(LIMIT / 2)
+
+    allowed = 0
+    while True:
+        state, ok, _ = backend._decide(state, now=2 * WINDOW + WINDOW / 2)
+        if not ok:
+            break
+        allowed += 1
+    assert allowed == LIMIT // 2
+
+
+def test_counters_reset_after_an_idle_window():
+    backend = MemoryRateLimitBackend(LIMIT, WINDOW, evict_interval=0)
+    state, estimate = backend._slide((1, LIMIT, LIMIT), now=3 * WINDOW)
+    assert state == (3, 0, 0)
+    assert estimate == 0
+
+
+def test_hit_limits_each_key_separately(clock):
+    backend = MemoryRateLimitBackend(2, WINDOW, evict_interval=WINDOW)
+    assert backend.hit("a") == (True, 1)
+    assert backend.hit("a") == (True, 0)
+    assert backend.hit("a") == (False, 0)
+    assert backend.hit("b") == (True, 1)
+
+    clock.value = 2 * WINDOW
+    assert backend.hit("a") == (True, 1)
+
+
+def test_idle_keys_are_evicted(clock):
+    backend = MemoryRateLimitBackend(LIMIT, WINDOW, evict_interval=WINDOW)
+    backend.hit("idle")
+    clock.value = WINDOW + 1
+    backend.hit("active")
+    assert set(backend._states) == {"idle", "active"}
+
+    # "idle" has no requests in the current or previous window
+    clock.value = 2 * WINDOW + 2
+    backend.hit("active")
+    assert set(backend._states) == {"active"}
+
+
+def test_backends_must_implement_hit():
+    class Incomplete(RateLimitBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(LIMIT, WINDOW, evict_interval=0)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from core.config import settings
+from reindex_collection import (
+    copy_points,
+    live_collection,
+    point_count,
+    reconcile,
+    shorten,
+    switch_alias,
+)
+
+
+def test_shorten_truncates_and_renormalizes():
+    vectors = [[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]]
+    shortened = np.asarray(shorten(vectors, 2))
+
+    assert shortened.shape == (2, 2)
+    assert shortened[0] == pytest.approx([0.6, 0.8])
+    # Vectors with nothing left in the kept dimensions stay zero
+    assert shortened[1] == pytest.approx([0.0, 0.0])
+
+
+def _payloads(service, collection):
+    records, _ = service.client.scroll(collection, limit=100, with_payload=True)
+    return {r.id: r.payload for r in records}
+
+
+def test_reconcile_replays_changes_made_during_the_copy(vector_service, make_docs):
+    live = vector_service.collection_name
+    vector_service.sync_source("a.pdf", make_docs("a.pdf", ["one", "two"]))
+    vector_service.sync_source("b.pdf", make_docs("b.pdf", ["three"]))
+    staging = f"{live}_v1"
+    vector_service.client.create_collection(staging, **vector_service.collection_config())
+    assert copy_points(vector_service, live, staging, reembed=False) == 3
+
+    # Meanwhile a document is deleted and another re-ingested with its
+    # chunks in a new order
+    vector_service.delete_by_source("b.pdf")
+    vector_service.sync_source("a.pdf", make_docs("a.pdf", ["two", "one"]))
+
+    assert reconcile(vector_service, live, staging) == 3
+    assert _payloads(vector_service, staging) == _payloads(vector_service, live)
+    assert reconcile(vector_service, live, staging) == 0
+
+
+def test_swap_serves_the_rebuild_to_running_services(
+    monkeypatch, vector_service, make_docs
+):
+    name = vector_service.collection_name
+    vector_service.sync_source("a.pdf", make_docs("a.pdf", ["alpha", "beta"]))
+    # A running worker has cached the live collection's hybrid schema
+    assert vector_service.search("alpha", limit=1)[0]["text"] == "alpha"
+
+    # The rebuild drops the sparse vectors
+    monkeypatch.setattr(settings, "HYBRID_SEARCH", False)
+    staging = f"{name}_v1"
+    vector_service.client.create_collection(staging, **vector_service.collection_config())
+    copy_points(vector_service, name, staging, reembed=False)
+    switch_alias(vector_service, name, staging, live_collection(vector_service, name))
+
+    assert live_collection(vector_service, name) == staging
+    assert point_count(vector_service, name) == 2
+    assert vector_service.search("beta", limit=1)[0]["text"] == "beta"
+    assert vector_service._is_hybrid() is False
@@ -0,0 +1,119 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from db import models
+from db.database import AsyncSessionLocal
+from services import turn_writer as turn_writer_module
+from services.turn_writer import TurnWriter, write_turns
+
+
+async def _messages(user_id: int):
+    async with AsyncSessionLocal() as db:
+        return list(
+            await db.scalars(
+                select(models.Message)
+                .where(models.Message.user_id == user_id)
+                .order_by(models.Message.id)
+            )
+        )
+
+
+def test_write_turns_creates_sessions_and_stores_both_messages(
+    run_async, user_id, make_turn
+):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            first, second = await write_turns(db, [make_turn("first"), make_turn("second")])
+        async with AsyncSessionLocal() as db:
+            (third,) = await write_turns(
+                db, [make_turn("third", session_id=first.session_id)]
+            )
+        return first, second, third, await _messages(user_id)
+
+    first, second, third, messages = run_async(scenario())
+
+    assert first.is_bot and first.content == "answer to first"
+    assert first.session_id != second.session_id
+    assert third.session_id == first.session_id
+    assert [(m.content, m.is_bot) for m in messages] == [
+        ("first", False),
+        ("answer to first", True),
+        ("second", False),
+        ("answer to second", True),
+        ("third", False),
+        ("answer to third", True),
+    ]
+
+
+def test_concurrent_turns_share_one_commit(run_async, make_turn, monkeypatch):
+    batches = []
+
+    async def recording_write_turns(db, turns):
+        batches.append(len(turns))
+        return await write_turns(db, turns)
+
+    monkeypatch.setattr(turn_writer_module, "write_turns", recording_write_turns)
+
+    async def scenario():
+        writer = TurnWriter(max_batch=10, max_delay=0.05)
+        writer.start()
+        written = await asyncio.gather(*(writer.write(make_turn(f"q{i}")) for i in range(5)))
+        await writer.stop()
+        return written
+
+    written = run_async(scenario())
+
+    assert batches == [5]
+    assert [m.content for m in written] == [f"answer to q{i}" for i in range(5)]
+    assert all(m.id is not None for m in written)
+
+
+def test_a_failing_turn_does_not_fail_the_others(
+    run_async, user_id, make_turn, monkeypatch
+):
+    async def failing_write_turns(db, turns):
+        if any(t.question == "bad" for t in turns):
+            raise ValueError("bad turn")
+        return await write_turns(db, turns)
+
+    monkeypatch.setattr(turn_writer_module, "write_turns", failing_write_turns)
+
+    async def scenario():
+        writer = TurnWriter(max_batch=10, max_delay=0.05)
+        writer.start()
+        results = await asyncio.gather(
+            writer.write(make_turn("good")),
+            writer.write(make_turn("bad")),
+            writer.write(make_turn("also good")),
+            return_exceptions=True,
+        )
+        await writer.stop()
+        return results, await _messages(user_id)
+
+    (good, bad, also_good), messages = run_async(scenario())
+
+    assert good.content == "answer to good"
+    assert isinstance(bad, ValueError)
+    assert also_good.content == "answer to also good"
+    assert [m.content for m in messages if not m.is_bot] == ["good", "also good"]
+
+
+def test_stop_commits_the_queued_turns(run_async, user_id, make_turn):
+    async def scenario():
+        writer = TurnWriter(max_batch=100, max_delay=10)
+        writer.start()
+        pending = [
+            asyncio.create_task(writer.write(make_turn(f"q{i}"))) for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        await writer.stop()
+        await asyncio.gather(*pending)
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count(models.Message.id)).where(
+                    models.Message.user_id == user_id
+                )
+            )
+
+    assert run_async(scenario()) == 6
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from services.vector_profiles import measured_memory
+
+
+def _segment(ram, disk, vectors=0):
+    return SimpleNamespace(
+        info=SimpleNamespace(
+            ram_usage_bytes=ram, disk_usage_bytes=disk, vectors_size_bytes=vectors
+        )
+    )
+
+
+def _telemetry(**collections):
+    return SimpleNamespace(
+        collections=SimpleNamespace(
+            collections=[
+                SimpleNamespace(
+                    id=name,
+                    shards=[
+                        SimpleNamespace(local=SimpleNamespace(segments=segments))
+                        for segments in shards
+                    ],
+                )
+                for name, shards in collections.items()
+            ]
+        )
+    )
+
+
+def test_measured_memory_sums_the_segments_of_every_shard():
+    telemetry = _telemetry(
+        docs=[[_segment(100, 1000, 80), _segment(20, 200, 10)], [_segment(5, 50)]],
+        other=[[_segment(7, 7, 7)]],
+    )
+
+    assert measured_memory(telemetry, "docs") == {
+        "ram": 125,
+        "disk": 1250,
+        "vectors": 90,
+    }
+
+
+def test_measured_memory_is_none_without_figures():
+    telemetry = _telemetry(docs=[[_segment(None, None)]])
+
+    assert measured_memory(telemetry, "docs") is None
+    assert measured_memory(telemetry, "missing") is None
@@ -0,0 +1,99 @@
+import pytest
+
+from core.config import settings
+from services.vector_service import DENSE_VECTOR, VectorService
+
+
+def test_fuse_ranks_by_reciprocal_rank(make_point):
+    k = settings.HYBRID_RRF_K
+    dense = [make_point("both", 0.9), make_point("dense_only", 0.8)]
+    sparse = [
+        make_point("sparse_only", vector={DENSE_VECTOR: [1.0, 0.0]}),
+        make_point("both"),
+    ]
+
+    results = VectorService._fuse(dense, sparse, query_vector=[1.0, 0.0], limit=10)
+
+    assert [r["id"] for r in results] == ["both", "sparse_only", "dense_only"]
+    assert results[0]["rrf_score"] == pytest.approx(1 / (k + 1) + 1 / (k + 2))
+    assert results[1]["rrf_score"] == pytest.approx(1 / (k + 1))
+    # score stays the dense cosine similarity
+    assert results[0]["score"] == 0.9
+    assert results[1]["score"] == pytest.approx(1.0)
+
+
+def test_fuse_respects_the_limit(make_point):
+    dense = [make_point(f"p{i}", 1.0 - i / 10) for i in range(5)]
+    results = VectorService._fuse(dense, [], query_vector=[1.0], limit=3)
+    assert [r["id"] for r in results] == ["p0", "p1", "p2"]
+
+
+def test_diff_source_splits_new_moved_and_removed_chunks(make_docs):
+    old = make_docs("a.pdf", ["kept", "moved", "gone"])
+    existing = {VectorService._point_id(d): d["metadata"] for d in old}
+    new = make_docs("a.pdf", ["kept", "added", "moved"])
+
+    new_docs, moved, removed = VectorService._diff_source(new, existing)
+
+    assert [d["text"] for d in new_docs] == ["added"]
+    assert moved == {VectorService._point_id(new[2]): {"source": "a.pdf", "chunk_index": 2}}
+    assert removed == [VectorService._point_id(old[2])]
+
+
+def test_diff_source_ignores_repeated_chunks(make_docs):
+    new_docs, _, _ = VectorService._diff_source(make_docs("a.pdf", ["same", "same"]), {})
+    assert len(new_docs) == 1
+
+
+def test_point_ids_depend_on_source_and_text(make_docs):
+    (a,) = make_docs("a.pdf", ["text"])
+    (b,) = make_docs("b.pdf", ["text"])
+    assert VectorService._point_id(a) == VectorService._point_id(dict(a))
+    assert VectorService._point_id(a) != VectorService._point_id(b)
+
+
+def test_sync_source_only_writes_what_changed(vector_service, make_docs):
+    first = make_docs("a.pdf", ["alpha beta", "gamma delta", "epsilon zeta"])
+    assert vector_service.sync_source("a.pdf", first) == {
+        "added": 3,
+        "kept": 0,
+        "removed": 0,
+    }
+
+    second = make_docs("a.pdf", ["gamma delta", "alpha beta", "eta theta"])
+    assert vector_service.sync_source("a.pdf", second) == {
+        "added": 1,
+        "kept": 2,
+        "removed": 1,
+    }
+
+    stored = vector_service._source_points("a.pdf")
+    assert sorted(m["chunk_index"] for m in stored.values()) == [0, 1, 2]
+    assert stored[VectorService._point_id(second[0])]["chunk_index"] == 0
+
+
+def test_sync_source_leaves_other_sources_alone(vector_service, make_docs):
+    vector_service.sync_source("a.pdf", make_docs("a.pdf", ["alpha beta"]))
+    vector_service.sync_source("b.pdf", make_docs("b.pdf", ["gamma delta"]))
+    vector_service.sync_source("a.pdf", [])
+
+    assert vector_service._source_points("a.pdf") == {}
+    assert len(vector_service._source_points("b.pdf")) == 1
+    assert vector_service.source_counts() == {"b.pdf": 1}
+
+
+def test_search_finds_the_closest_chunk(vector_service, make_docs):
+    vector_service.sync_source(
+        "a.pdf",
+        make_docs(
+            "a.pdf",
+            [
+                "qdrant stores dense and sparse vectors",
+                "bcrypt hashes passwords slowly on purpose",
+                "the rate limiter counts requests per window",
+            ],
+        ),
+    )
+    results = vector_service.search("how are passwords hashed with bcrypt", limit=2)
+    assert results[0]["text"] == "bcrypt hashes passwords slowly on purpose"
+    assert results[0]["metadata"] == {"source": "a.pdf", "chunk_index": 1}